@@ -1,19 +1,44 @@
-from flask import Flask
-from flask_mysqldb import MySQL
+from flask import Flask, jsonify
 from flask_cors import CORS
 import logging
+import math
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+from .analytics import Analytics
+from .auth_cache import TokenCache
+from .cache import ResponseCache
+from .db import MySQL, PoolTimeout
+from .events import EventHub, TooManySubscribers
+from .frontend import FrontendAssets
+from .hashing import HasherBusy, PasswordHasher
+from .logs import LogQueue
+from .metrics import Metrics
+from .ratelimit import RateLimited, RateLimiter
+from .reminders import ReminderScheduler
+from .search import SearchIndex
+from .stats import Statistics
+from .sync import ChangeLog
+
+log_queue = LogQueue()
 mysql = MySQL()
+search_index = SearchIndex()
+token_cache = TokenCache()
+statistics = Statistics()
+response_cache = ResponseCache()
+password_hasher = PasswordHasher()
+metrics = Metrics()
+event_hub = EventHub()
+change_log = ChangeLog()
+reminders = ReminderScheduler()
+analytics = Analytics()
+frontend = FrontendAssets()
+rate_limiter = RateLimiter()
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
+    # Key order is fixed by the serializers; sorting every response is wasted work
+    app.json.sort_keys = False
     
     # Load config with debug logs
     app.config.update(
@@ -21,21 +46,131 @@ def create_app():
         MYSQL_USER='root',
         MYSQL_PASSWORD='',
         MYSQL_DB='task-tracker-db',  # Updated database name
-        JWT_SECRET_KEY='dev-key'
+        JWT_SECRET_KEY='dev-key',
+        # Root level plus per-logger overrides, e.g. {'app.routes': 'DEBUG'}
+        LOG_LEVEL='INFO',
+        LOG_LEVELS={},
+        LOG_FORMAT='text',  # or 'json'
+        # Keyset pagination for task/project listings
+        PAGE_SIZE_DEFAULT=50,
+        PAGE_SIZE_MAX=200,
+        BULK_MAX_OPERATIONS=500,
+        EXPORT_CHUNK_ROWS=500,
+        IMPORT_CHUNK_ROWS=500,
+        IMPORT_MAX_ERRORS=100,
+        STATS_RECONCILE_INTERVAL=900,
+        # Response cache: 'local' (per process), 'redis' (shared) or None
+        RESPONSE_CACHE_BACKEND='local',
+        RESPONSE_CACHE_MAX_ENTRIES=10000,
+        RESPONSE_CACHE_TTL=60,
+        # Password hashing runs on a bounded pool; 503 when saturated
+        PASSWORD_HASH_METHOD='scrypt:32768:8:1',
+        PASSWORD_HASH_WORKERS=4,
+        PASSWORD_HASH_QUEUE_DEPTH=32,
+        # Set to a number of seconds to log slow requests with their SQL
+        METRICS_SLOW_REQUEST_SECONDS=None,
+        # Bearer token for /api/metrics, which is off without one
+        METRICS_TOKEN=None,
+        # Change feed (/api/events): per-stream backlog and keepalive interval
+        EVENTS_QUEUE_SIZE=100,
+        EVENTS_HEARTBEAT_SECONDS=15,
+        EVENTS_MAX_SUBSCRIBERS=10000,
+        # 'redis' fans events out across worker processes (EVENTS_REDIS_URL)
+        EVENTS_BACKEND='local',
+        # Delta sync (/api/sync): log entries per response, tombstone retention
+        SYNC_MAX_CHANGES=500,
+        SYNC_RETENTION_DAYS=30,
+        SYNC_COMPACT_INTERVAL=3600,
+        # Due-date reminders on /api/events, this long before the deadline
+        REMINDERS_ENABLED=True,
+        REMINDERS_LEAD_SECONDS=900,
+        # Active-user sketches for /api/admin, merged into MySQL this often
+        ANALYTICS_ENABLED=True,
+        ANALYTICS_FLUSH_SECONDS=60,
+        ANALYTICS_RETENTION_DAYS=90,
+        # Directory of the frontend build to serve (index.html, asset-manifest.json)
+        FRONTEND_BUILD_DIR=None,
+        FRONTEND_PRECOMPRESS=True,
+        # Rate limits shared by the workers on a node: endpoint -> ('ip' or 'user', count, seconds)
+        RATELIMIT_ENABLED=True,
+        RATELIMITS={
+            'login': ('ip', 10, 60),
+            'signup': ('ip', 5, 600),
+            'search_tasks': ('user', 60, 60),
+        },
+        # Applied per user to authenticated endpoints without their own rule
+        RATELIMIT_DEFAULT=('user', 600, 60),
+        # Connection pool
+        DB_POOL_MIN_SIZE=2,
+        DB_POOL_MAX_SIZE=10,
+        DB_POOL_TIMEOUT=5.0,
+        DB_POOL_RECYCLE_USES=1000,
+        DB_POOL_RECYCLE_SECONDS=3600,
+        # Read replicas for @mysql.read_only views, e.g. [{'host': '127.0.0.1', 'port': 3307}]
+        MYSQL_REPLICAS=[],
+        DB_REPLICA_MAX_LAG=5,
+        DB_READ_YOUR_WRITES_SECONDS=5
     )
-    logger.debug(f"App config: {app.config}")
+    # Deployment overrides, e.g. TASK_TRACKER_RESPONSE_CACHE_BACKEND=redis
+    # (values are parsed as JSON where they can be)
+    app.config.from_prefixed_env('TASK_TRACKER')
+    if config:
+        app.config.update(config)
+    log_queue.init_app(app)
     
     CORS(app)
+    rate_limiter.init_app(app)
     mysql.init_app(app)
+    search_index.init_app(app)
+    token_cache.init_app(app)
+    statistics.init_app(app)
+    response_cache.init_app(app)
+    password_hasher.init_app(app)
+    event_hub.init_app(app)
+    change_log.init_app(app)
+    reminders.init_app(app)
+    analytics.init_app(app)
+    metrics.init_app(app)
+    mysql.wrap_connections(metrics.instrument)
+    metrics.collect('db_pool', mysql.pool.stats)
+    metrics.collect('db_replicas', mysql.replica_stats)
+    metrics.collect('token_cache', token_cache.stats)
+    metrics.collect('response_cache', response_cache.stats)
+    metrics.collect('password_hasher', password_hasher.stats)
+    metrics.collect('logging', log_queue.stats)
+    metrics.collect('events', event_hub.stats)
+    metrics.collect('reminders', reminders.stats)
+    metrics.collect('analytics', analytics.stats)
+    metrics.collect('ratelimit', rate_limiter.stats)
     
+    @app.errorhandler(PoolTimeout)
+    def pool_exhausted(e):
+        return jsonify({'error': 'Database busy, please retry'}), 503
+
+    @app.errorhandler(HasherBusy)
+    def hasher_busy(e):
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
+
+    @app.errorhandler(TooManySubscribers)
+    def too_many_streams(e):
+        return jsonify({'error': 'Too many open event streams'}), 503, {'Retry-After': '30'}
+
+    @app.errorhandler(RateLimited)
+    def rate_limited(e):
+        return jsonify({'error': 'Too many requests'}), 429, {'Retry-After': str(math.ceil(e.retry_after))}
+
     from .routes import api
     app.register_blueprint(api, url_prefix='/api')
+
+    from .migrate import db_cli
+    app.cli.add_command(db_cli)
+    frontend.init_app(app)
     
     logger.debug("API routes registered")
-    # Debug route registration
-    routes = [str(rule) for rule in app.url_map.iter_rules()]
-    logger.debug(f"Available routes:")
-    for route in routes:
-        logger.debug(f"  {route}")
+    # Debug route registration; skipped otherwise to keep worker startup fast
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Available routes:")
+        for rule in app.url_map.iter_rules():
+            logger.debug("  %s", rule)
 
     return app
\ No newline at end of file
@@ -0,0 +1,681 @@
+"""Async serving mode.
+
+The auth, task and project handlers run as coroutines on aiomysql with a
+pool of their own, so one process keeps hundreds of requests in flight
+while they wait on MySQL. Every other route falls through to the regular
+Flask app, run on a thread by asgiref's WSGI adapter, so both modes serve
+the same API.
+
+Change sets are applied with the same handlers as the sync routes: they run
+on a worker thread against ``BlockingCursor``, which forwards each call to
+the request's async connection, so the write and its side effects still
+share one transaction.
+
+    hypercorn asgi:app
+"""
+import asyncio
+import logging
+import math
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+
+import jwt
+from werkzeug.exceptions import HTTPException
+
+from . import (analytics, create_app, event_hub, password_hasher, rate_limiter, response_cache, stats,
+               token_cache, versions)
+from .changes import ChangeSet
+from .db import PoolTimeout
+from .events import HEARTBEAT, TooManySubscribers
+from .hashing import HasherBusy
+from .ratelimit import RateLimited
+from .importer import TASK_PRIORITIES, TASK_STATUSES, InvalidTask, parse_task
+from .pagination import InvalidCursor, keyset_clause, next_cursor, page_args
+from .routes import token_in_query
+from .serializers import serialize_projects, serialize_tasks, task_row, wants_columnar
+
+try:
+    import aiomysql
+    from asgiref.wsgi import WsgiToAsgi
+    from quart import Blueprint, Quart, Response, current_app, jsonify, make_response, request
+except ImportError as e:  # pragma: no cover - optional dependencies
+    raise ImportError('The async serving mode requires quart, aiomysql and asgiref') from e
+
+logger = logging.getLogger(__name__)
+
+CORS_ORIGINS = ('http://localhost:3000',)
+
+
+class AsyncMySQL:
+    def __init__(self):
+        self.pool = None
+
+    def init_app(self, app):
+        app.config.setdefault('ASYNC_DB_POOL_MIN_SIZE', 5)
+        app.config.setdefault('ASYNC_DB_POOL_MAX_SIZE', 50)
+        self.timeout = app.config['DB_POOL_TIMEOUT']
+        app.before_serving(self.open)
+        app.after_serving(self.close)
+
+    async def open(self):
+        config = current_app.config
+        self.pool = await aiomysql.create_pool(
+            host=config['MYSQL_HOST'],
+            port=config['MYSQL_PORT'],
+            charset=config['MYSQL_CHARSET'],
+            user=config['MYSQL_USER'],
+            password=config['MYSQL_PASSWORD'],
+            db=config['MYSQL_DB'],
+            minsize=config['ASYNC_DB_POOL_MIN_SIZE'],
+            maxsize=config['ASYNC_DB_POOL_MAX_SIZE'],
+            pool_recycle=config['DB_POOL_RECYCLE_SECONDS'],
+            autocommit=True,
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    @asynccontextmanager
+    async def cursor(self, transaction=False):
+        """Yield ``(conn, cur)``; with ``transaction`` the work is rolled
+        back unless the caller commits."""
+        try:
+            conn = await asyncio.wait_for(self.pool.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f'No database connection within {self.timeout}s')
+        try:
+            cur = await conn.cursor()
+            try:
+                if transaction:
+                    await conn.begin()
+                yield conn, cur
+            finally:
+                await cur.close()
+                if conn.get_transaction_status():
+                    await conn.rollback()
+        finally:
+            self.pool.release(conn)
+
+
+db = AsyncMySQL()
+
+
+class BlockingCursor:
+    """Synchronous facade over an aiomysql cursor, for use off the loop thread."""
+
+    def __init__(self, cur, loop):
+        self._cur = cur
+        self._loop = loop
+
+    def _call(self, name, *args):
+        async def call():
+            return await getattr(self._cur, name)(*args)
+        return asyncio.run_coroutine_threadsafe(call(), self._loop).result()
+
+    def execute(self, query, args=None):
+        return self._call('execute', query, args)
+
+    def executemany(self, query, args):
+        return self._call('executemany', query, args)
+
+    def fetchone(self):
+        return self._call('fetchone')
+
+    def fetchmany(self, size=None):
+        return self._call('fetchmany', size)
+
+    def fetchall(self):
+        return self._call('fetchall')
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    def close(self):
+        pass
+
+
+async def run_blocking(cur, fn, *args):
+    """Run ``fn(cursor, *args)`` on a worker thread against ``cur``."""
+    blocking = BlockingCursor(cur, asyncio.get_running_loop())
+    return await asyncio.to_thread(fn, blocking, *args)
+
+
+async def commit_changes(conn, cur, changes):
+    if changes:
+        await run_blocking(cur, changes.apply)
+    await conn.commit()
+    changes.committed()
+
+
+api = Blueprint('api_async', __name__)
+
+
+def token_required(f):
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        token = request.headers.get('Authorization')
+        if not token and getattr(f, 'token_in_query', False) and request.args.get('access_token'):
+            token = f"Bearer {request.args['access_token']}"
+
+        if not token:
+            return jsonify({'error': 'Token is missing'}), 401
+
+        try:
+            token = token.split(' ')[1]  # Remove 'Bearer ' prefix
+            data = token_cache.get(token)
+            if data is None:
+                data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+                token_cache.put(token, data)
+
+            request.user = {
+                'id': data['user_id'],
+                'email': data['email'],
+                'role': data['role']
+            }
+        except Exception as e:
+            logger.error(f"[AUTH] Token validation error: {e}")
+            return jsonify({'error': 'Token is invalid'}), 401
+        analytics.record(data['user_id'], f"{request.method} {request.url_rule.rule}")
+        rate_limiter.check_user(request.endpoint, data['user_id'])
+        return await f(*args, **kwargs)
+    return decorated
+
+
+async def cached_get(namespace, build, collection=None):
+    """Coroutine counterpart of ``ResponseCache.cached`` and
+    ``versions.conditional`` for the async listing and detail routes."""
+    user_id = request.user['id']
+    backend = response_cache.backend
+    path = request.full_path
+    generation = None
+    if backend is not None:
+        hit = backend.get(user_id, namespace, path)
+        if hit is not None:
+            response_cache.hits += 1
+            etag, body = hit
+            if etag and request.if_none_match.contains(etag):
+                response = Response('', status=304)
+            else:
+                response = Response(body, mimetype='application/json')
+            if etag:
+                response.set_etag(etag)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+        response_cache.misses += 1
+        generation = backend.generation(user_id)
+
+    tag = None
+    if collection is not None:
+        async with db.cursor() as (conn, cur):
+            await cur.execute("""
+                SELECT version FROM collection_versions
+                WHERE user_id = %s AND collection = %s""", (user_id, collection))
+            row = await cur.fetchone()
+        tag = versions.etag(user_id, collection, row[0] if row else 0, request.query_string)
+
+    if tag and request.if_none_match.contains(tag):
+        response = Response('', status=304)
+    else:
+        response = await make_response(await build())
+        if response.status_code == 200 and backend is not None:
+            backend.set(user_id, namespace, path, (tag or '', await response.get_data()),
+                        generation)
+    if tag and response.status_code in (200, 304):
+        response.set_etag(tag)
+    if backend is not None:
+        response.headers['X-Cache'] = 'MISS'
+    return response
+
+
+@api.route('/events', methods=['GET'])
+@token_required
+@token_in_query
+async def events():
+    subscription = event_hub.subscribe(request.user['id'], asyncio.get_running_loop())
+    heartbeat = event_hub.heartbeat
+
+    async def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                frames = await subscription.wait_async(heartbeat)
+                yield ''.join(frames) if frames else HEARTBEAT
+        finally:
+            subscription.close()
+
+    response = await make_response(stream(), {'Cache-Control': 'no-cache',
+                                               'X-Accel-Buffering': 'no'})
+    response.mimetype = 'text/event-stream'
+    response.timeout = None  # streams stay open until the client leaves
+    return response
+
+
+@api.route('/signup', methods=['POST'])
+async def signup():
+    try:
+        data = await request.get_json(silent=True)
+        if not data or not all(k in data for k in ['username', 'email', 'password']):
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        async with db.cursor() as (conn, cur):
+            await cur.execute("SELECT id FROM users WHERE email = %s", (data['email'],))
+            if await cur.fetchone():
+                return jsonify({'error': 'Email already exists'}), 400
+
+        hashed_password = await password_hasher.hash_async(data['password'])
+        async with db.cursor(transaction=True) as (conn, cur):
+            await cur.execute(
+                "INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
+                (data['username'], data['email'], hashed_password, 'student')
+            )
+            await run_blocking(cur, stats.bump_global, 'total_users', 1)
+            await conn.commit()
+        return jsonify({'message': 'User created successfully'}), 201
+    except (HasherBusy, PoolTimeout):
+        raise
+    except Exception as e:
+        logger.error(f"Signup error: {str(e)}")
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+@api.route('/login', methods=['POST'])
+async def login():
+    try:
+        data = await request.get_json()
+        async with db.cursor() as (conn, cur):
+            await cur.execute("SELECT * FROM users WHERE email = %s", (data['email'],))
+            user = await cur.fetchone()
+
+        if not user or not await password_hasher.verify_async(user[3], data['password']):
+            return jsonify({'error': 'Invalid credentials'}), 401
+
+        if password_hasher.needs_rehash(user[3]):
+            rehashed = await password_hasher.hash_async(data['password'])
+            async with db.cursor() as (conn, cur):
+                await cur.execute("UPDATE users SET password = %s WHERE id = %s",
+                                  (rehashed, user[0]))
+            logger.info(f"[LOGIN] Rehashed password for user {user[0]}")
+        token = jwt.encode({
+            'user_id': user[0],
+            'username': user[1],
+            'email': user[2],
+            'role': user[4],
+            'exp': datetime.utcnow() + timedelta(hours=24)
+        }, current_app.config['JWT_SECRET_KEY'])
+        return jsonify({
+            'token': token,
+            'user': {
+                'id': user[0],
+                'username': user[1],
+                'email': user[2],
+                'role': user[4]
+            }
+        })
+    except (HasherBusy, PoolTimeout):
+        raise
+    except Exception as e:
+        logger.error(f"[LOGIN] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/tasks', methods=['GET'])
+@token_required
+async def list_tasks():
+    try:
+        limit, after = page_args(request.args, current_app.config)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    async def build():
+        keyset_sql, keyset_params = keyset_clause(after)
+        async with db.cursor() as (conn, cur):
+            await cur.execute("""
+                SELECT id, title, description, status, priority,
+                       due_date, created_at, updated_at
+                FROM tasks
+                WHERE user_id = %s""" + keyset_sql + """
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s""", (request.user['id'], *keyset_params, limit + 1))
+            tasks, cursor = next_cursor(await cur.fetchall(), limit, 6)
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'tasks': serialize_tasks(tasks, wants_columnar(request.args)),
+                'count': len(tasks),
+                'next_cursor': cursor
+            }
+        })
+
+    return await cached_get('tasks', build, versions.TASKS)
+
+@api.route('/tasks', methods=['POST'])
+@token_required
+async def create_task():
+    try:
+        task = parse_task(await request.get_json(silent=True))
+    except InvalidTask as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        async with db.cursor(transaction=True) as (conn, cur):
+            # Orders this insert against a running import (see insert_tasks)
+            await cur.execute("SELECT id FROM users WHERE id = %s FOR UPDATE",
+                              (request.user['id'],))
+            await cur.fetchall()
+            await cur.execute("""
+                INSERT INTO tasks (user_id, title, description, status, priority, due_date)
+                VALUES (%s, %s, %s, %s, %s, %s)""",
+                (request.user['id'], task['title'], task['description'],
+                 task['status'], task['priority'], task['due_date']))
+            task_id = cur.lastrowid
+            changes = ChangeSet(request.user['id'])
+            changes.task(task_id, after=task)
+            await commit_changes(conn, cur, changes)
+        return jsonify({'message': 'Task created successfully', 'task_id': task_id}), 201
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        logger.error(f"[TASK-CREATE] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/tasks/<int:task_id>', methods=['GET'])
+@token_required
+async def get_task(task_id):
+    async def build():
+        async with db.cursor() as (conn, cur):
+            await cur.execute("""
+                SELECT id, title, description, status, priority,
+                       due_date, created_at, updated_at
+                FROM tasks
+                WHERE id = %s AND user_id = %s""",
+                (task_id, request.user['id']))
+            task = await cur.fetchone()
+        if not task:
+            return jsonify({'error': 'Task not found'}), 404
+        return jsonify({
+            'status': 'success',
+            'data': task_row(task)
+        })
+
+    return await cached_get(f'task:{task_id}', build)
+
+@api.route('/tasks/<int:task_id>', methods=['PUT'])
+@token_required
+async def update_task(task_id):
+    data = await request.get_json()
+    try:
+        async with db.cursor(transaction=True) as (conn, cur):
+            await cur.execute("""
+                SELECT status FROM tasks
+                WHERE id = %s AND user_id = %s
+                FOR UPDATE""", (task_id, request.user['id']))
+            task = await cur.fetchone()
+            if not task:
+                return jsonify({'error': 'Task not found'}), 404
+
+            await cur.execute("""
+                UPDATE tasks
+                SET title = %s, description = %s, status = %s,
+                    priority = %s, due_date = %s
+                WHERE id = %s AND user_id = %s""",
+                (data['title'], data['description'], data['status'],
+                 data.get('priority', 'medium'), data['due_date'], task_id,
+                 request.user['id']))
+            changes = ChangeSet(request.user['id'])
+            changes.task(task_id, before={'status': task[0]}, after=data)
+            await commit_changes(conn, cur, changes)
+        return jsonify({'message': 'Task updated successfully'})
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        logger.error(f"[TASK-UPDATE] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/tasks/<int:task_id>', methods=['DELETE'])
+@token_required
+async def delete_task(task_id):
+    try:
+        async with db.cursor(transaction=True) as (conn, cur):
+            await cur.execute("""
+                SELECT status FROM tasks
+                WHERE id = %s AND user_id = %s
+                FOR UPDATE""", (task_id, request.user['id']))
+            task = await cur.fetchone()
+            if not task:
+                return jsonify({'error': 'Task not found'}), 404
+
+            await cur.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s",
+                              (task_id, request.user['id']))
+            changes = ChangeSet(request.user['id'])
+            changes.task(task_id, before={'status': task[0]})
+            await commit_changes(conn, cur, changes)
+        return jsonify({'message': 'Task deleted successfully'})
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        logger.error(f"[TASK-DELETE] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+async def _update_task_field(task_id, field, value):
+    async with db.cursor(transaction=True) as (conn, cur):
+        await cur.execute(f"""
+            SELECT {field} FROM tasks
+            WHERE id = %s AND user_id = %s
+            FOR UPDATE""", (task_id, request.user['id']))
+        task = await cur.fetchone()
+        if not task:
+            return None
+
+        await cur.execute(f"""
+            UPDATE tasks
+            SET {field} = %s,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s AND user_id = %s""",
+            (value, task_id, request.user['id']))
+        changes = ChangeSet(request.user['id'])
+        changes.task(task_id, before={field: task[0]}, after={field: value})
+        await commit_changes(conn, cur, changes)
+        return task[0]
+
+@api.route('/tasks/<int:task_id>/status', methods=['PUT'])
+@token_required
+async def update_task_status(task_id):
+    data = await request.get_json()
+    new_status = data.get('status')
+    if not new_status or new_status not in TASK_STATUSES:
+        return jsonify({'error': 'Invalid status'}), 400
+
+    try:
+        previous = await _update_task_field(task_id, 'status', new_status)
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        logger.error(f"[STATUS-UPDATE] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    if previous is None:
+        return jsonify({'error': 'Task not found'}), 404
+    return jsonify({
+        'message': 'Status updated successfully',
+        'task_id': task_id,
+        'status': new_status,
+        'previous_status': previous
+    })
+
+@api.route('/tasks/<int:task_id>/priority', methods=['PUT'])
+@token_required
+async def update_task_priority(task_id):
+    data = await request.get_json()
+    new_priority = data.get('priority')
+    if not new_priority or new_priority not in TASK_PRIORITIES:
+        return jsonify({'error': 'Invalid priority'}), 400
+
+    try:
+        previous = await _update_task_field(task_id, 'priority', new_priority)
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        logger.error(f"[PRIORITY-UPDATE] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    if previous is None:
+        return jsonify({'error': 'Task not found'}), 404
+    return jsonify({
+        'message': 'Priority updated successfully',
+        'task_id': task_id,
+        'priority': new_priority
+    })
+
+@api.route('/projects', methods=['GET'])
+@token_required
+async def list_projects():
+    try:
+        limit, after = page_args(request.args, current_app.config)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    async def build():
+        keyset_sql, keyset_params = keyset_clause(after)
+        async with db.cursor() as (conn, cur):
+            await cur.execute("""
+                SELECT id, title, description, is_completed, created_at, updated_at
+                FROM projects
+                WHERE user_id = %s""" + keyset_sql + """
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s""", (request.user['id'], *keyset_params, limit + 1))
+            projects, cursor = next_cursor(await cur.fetchall(), limit, 4)
+        return jsonify({
+            'status': 'success',
+            'data': serialize_projects(projects, wants_columnar(request.args)),
+            'next_cursor': cursor
+        })
+
+    return await cached_get('projects', build, versions.PROJECTS)
+
+@api.route('/projects', methods=['POST'])
+@token_required
+async def create_project():
+    data = await request.get_json()
+    async with db.cursor(transaction=True) as (conn, cur):
+        await cur.execute("""
+            INSERT INTO projects (title, description, user_id)
+            VALUES (%s, %s, %s)""",
+            (data['title'], data['description'], request.user['id']))
+        changes = ChangeSet(request.user['id'])
+        changes.project(cur.lastrowid, 'create')
+        await commit_changes(conn, cur, changes)
+    return jsonify({'message': 'Project created successfully'}), 201
+
+@api.route('/projects/<int:project_id>', methods=['PUT'])
+@token_required
+async def update_project(project_id):
+    data = await request.get_json()
+    async with db.cursor(transaction=True) as (conn, cur):
+        await cur.execute("""
+            UPDATE projects
+            SET is_completed = %s, updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s AND user_id = %s""",
+            (data['is_completed'], project_id, request.user['id']))
+        changes = ChangeSet(request.user['id'])
+        if cur.rowcount > 0:
+            changes.project(project_id, 'update')
+        await commit_changes(conn, cur, changes)
+    return jsonify({'message': 'Project updated successfully'})
+
+@api.route('/projects/<int:project_id>', methods=['DELETE'])
+@token_required
+async def delete_project(project_id):
+    try:
+        async with db.cursor(transaction=True) as (conn, cur):
+            await cur.execute("DELETE FROM projects WHERE id = %s AND user_id = %s",
+                              (project_id, request.user['id']))
+            deleted = cur.rowcount
+            changes = ChangeSet(request.user['id'])
+            if deleted > 0:
+                changes.project(project_id, 'delete')
+            await commit_changes(conn, cur, changes)
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        logger.error(f"[PROJECT-DELETE] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    if deleted > 0:
+        return jsonify({
+            'status': 'success',
+            'message': 'Project deleted successfully',
+            'project_id': project_id
+        }), 200
+    return jsonify({'error': 'Project not found'}), 404
+
+
+class Dispatcher:
+    """ASGI entry point: routes the async blueprint handles go to Quart,
+    everything else (and CORS preflights) to the sync Flask app."""
+
+    def __init__(self, async_app, sync_app):
+        self.async_app = async_app
+        self.sync_app = sync_app
+        self._fallback = WsgiToAsgi(sync_app)
+        self._adapter = async_app.url_map.bind('localhost')
+
+    def handles(self, path, method):
+        if method == 'OPTIONS':
+            return False
+        try:
+            self._adapter.match(path, method=method)
+        except HTTPException:
+            return False
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and not self.handles(scope['path'], scope['method']):
+            return await self._fallback(scope, receive, send)
+        return await self.async_app(scope, receive, send)
+
+
+def create_async_app(config=None):
+    sync_app = create_app(config)
+    app = Quart(__name__)
+    app.json.sort_keys = False
+    app.config.update(sync_app.config)
+    db.init_app(app)
+
+    @app.errorhandler(PoolTimeout)
+    async def pool_exhausted(e):
+        return jsonify({'error': 'Database busy, please retry'}), 503
+
+    @app.errorhandler(HasherBusy)
+    async def hasher_busy(e):
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
+
+    @app.errorhandler(TooManySubscribers)
+    async def too_many_streams(e):
+        return jsonify({'error': 'Too many open event streams'}), 503, {'Retry-After': '30'}
+
+    @app.errorhandler(RateLimited)
+    async def rate_limited(e):
+        return jsonify({'error': 'Too many requests'}), 429, {'Retry-After': str(math.ceil(e.retry_after))}
+
+    if rate_limiter.enabled:
+        @app.before_request
+        async def rate_limit_ip():
+            rate_limiter.check_ip(request.endpoint, request.headers, request.remote_addr)
+
+    @app.after_request
+    async def cors_headers(response):
+        origin = request.headers.get('Origin')
+        if origin in CORS_ORIGINS:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+            response.headers['Access-Control-Expose-Headers'] = 'Authorization'
+            response.vary.add('Origin')
+        return response
+
+    app.register_blueprint(api, url_prefix='/api')
+    return Dispatcher(app, sync_app)
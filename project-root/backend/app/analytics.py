@@ -0,0 +1,264 @@
+"""Approximate distinct-user analytics for the admin dashboard.
+
+``token_required`` records every authenticated request here. Each UTC day
+has a HyperLogLog sketch of distinct users overall and one per endpoint
+(``METHOD /api/rule``). At ``ANALYTICS_PRECISION=12`` a sketch is 4 KB and
+counts within about 1.6% however many users it sees. Sketches merge by
+register-wise max, so every worker flushes its own into
+``activity_sketches`` every ``ANALYTICS_FLUSH_SECONDS`` and the rows hold
+the union. DAU, WAU and MAU are the merges of 1, 7 and 30 daily sketches.
+"""
+import atexit
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+ALL = ''
+_64_BITS = (1 << 64) - 1
+
+
+class HyperLogLog:
+    __slots__ = ('p', 'm', 'registers')
+
+    def __init__(self, p=12, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value):
+        x = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        index = x >> (64 - self.p)
+        rest = x & (_64_BITS >> self.p)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if isinstance(other, HyperLogLog):
+            other = other.registers
+        self.registers = bytearray(map(max, self.registers, other))
+        return self
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class DaySketch:
+    __slots__ = ('users', 'requests')
+
+    def __init__(self, p):
+        self.users = HyperLogLog(p)
+        self.requests = 0  # since the last flush
+
+
+def utc_today():
+    return datetime.now(timezone.utc).date()
+
+
+class Analytics:
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._day = None
+        self._day_ends = 0.0
+        self._sketches = {}  # name -> DaySketch for self._day
+        self._pending = []  # (day, sketches) left behind by a day rollover
+        self._lock = threading.Lock()
+        self._worker_pid = None
+        self.flushes = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ANALYTICS_ENABLED', True)
+        app.config.setdefault('ANALYTICS_PRECISION', 12)
+        app.config.setdefault('ANALYTICS_FLUSH_SECONDS', 60)
+        app.config.setdefault('ANALYTICS_RETENTION_DAYS', 90)
+
+        self.app = app
+        self.enabled = app.config['ANALYTICS_ENABLED']
+        self.precision = app.config['ANALYTICS_PRECISION']
+        self.flush_seconds = app.config['ANALYTICS_FLUSH_SECONDS']
+        self.retention_days = app.config['ANALYTICS_RETENTION_DAYS']
+
+    def record(self, user_id, endpoint):
+        if not self.enabled:
+            return
+        if self._worker_pid != os.getpid() and self.flush_seconds:
+            # Started lazily so forked workers each get their own thread; here
+            # rather than in before_request so async views start it too
+            self._ensure_worker()
+        with self._lock:
+            if time.time() >= self._day_ends:
+                self._roll_day()
+            for name in (ALL, endpoint):
+                sketch = self._sketches.get(name)
+                if sketch is None:
+                    sketch = self._sketches[name] = DaySketch(self.precision)
+                sketch.users.add(user_id)
+                sketch.requests += 1
+
+    def _roll_day(self):
+        """Start a new day's sketches; the caller holds ``_lock``."""
+        today = utc_today()
+        if self._day is not None and self._day != today:
+            self._pending.append((self._day, self._sketches))
+            self._sketches = {}
+        self._day = today
+        midnight = datetime.combine(today + timedelta(days=1), datetime.min.time(), timezone.utc)
+        self._day_ends = midnight.timestamp()
+
+    def _take(self):
+        """Snapshot ``(day, {name: (registers, requests)})`` and reset request counts."""
+        with self._lock:
+            days, self._pending = self._pending, []
+            if self._day is not None:
+                days.append((self._day, self._sketches))
+            batches = [(day, {name: (bytes(s.users.registers), s.requests)
+                              for name, s in sketches.items()})
+                       for day, sketches in days]
+            for sketch in self._sketches.values():
+                sketch.requests = 0
+        return batches
+
+    def flush(self, cur, commit):
+        """Merge this process's sketches into ``activity_sketches``."""
+        batches = self._take()
+        written = 0  # batches committed, which a retry must not count again
+        try:
+            for day, sketches in batches:
+                if not sketches:
+                    written += 1
+                    continue
+                names = list(sketches)
+                cur.execute(f"""
+                    SELECT name, registers FROM activity_sketches
+                    WHERE day = %s AND name IN ({', '.join(['%s'] * len(names))})
+                    FOR UPDATE""", (day, *names))
+                stored = dict(cur.fetchall())
+                rows = []
+                for name, (registers, requests) in sketches.items():
+                    merged = HyperLogLog(self.precision, registers)
+                    if name in stored and len(stored[name]) == len(registers):
+                        merged.merge(stored[name])
+                    rows.append((day, name, bytes(merged.registers), requests))
+                cur.executemany("""
+                    INSERT INTO activity_sketches (day, name, registers, requests)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        registers = VALUES(registers),
+                        requests = requests + VALUES(requests)""", rows)
+                commit()
+                written += 1
+            if len(batches) > 1:
+                # A day rolled over; drop sketches past retention
+                cur.execute("DELETE FROM activity_sketches WHERE day < %s",
+                            (utc_today() - timedelta(days=self.retention_days),))
+                commit()
+        except Exception:
+            self._restore(batches[written:])
+            raise
+        self.flushes += 1
+
+    def _restore(self, batches):
+        """Put back what a failed flush took, to retry on the next one."""
+        with self._lock:
+            for day, sketches in batches:
+                if day == self._day:
+                    # Registers are still in memory; only the counts were reset
+                    for name, (_, requests) in sketches.items():
+                        self._sketches[name].requests += requests
+                    continue
+                restored = {}
+                for name, (registers, requests) in sketches.items():
+                    sketch = restored[name] = DaySketch(self.precision)
+                    sketch.users.registers[:] = registers
+                    sketch.requests = requests
+                self._pending.append((day, restored))
+
+    def summary(self, cur, today=None):
+        """DAU/WAU/MAU and today's per-endpoint usage, including unflushed data."""
+        today = today or utc_today()
+        first = today - timedelta(days=29)
+        cur.execute("""
+            SELECT day, name, registers, requests FROM activity_sketches
+            WHERE day >= %s AND day <= %s""", (first, today))
+        daily = {}
+        endpoints = {}
+        for day, name, registers, requests in cur.fetchall():
+            if isinstance(day, datetime):
+                day = day.date()
+            if name == ALL:
+                daily[day] = HyperLogLog(self.precision, registers)
+            elif day == today:
+                endpoints[name] = [HyperLogLog(self.precision, registers), requests]
+
+        with self._lock:
+            if self._day == today:
+                for name, sketch in self._sketches.items():
+                    if name == ALL:
+                        daily.setdefault(today, HyperLogLog(self.precision)).merge(sketch.users)
+                    else:
+                        entry = endpoints.setdefault(name, [HyperLogLog(self.precision), 0])
+                        entry[0].merge(sketch.users)
+                        entry[1] += sketch.requests
+
+        def distinct(days):
+            merged = HyperLogLog(self.precision)
+            for day in days:
+                if day in daily:
+                    merged.merge(daily[day])
+            return merged.count()
+
+        return {
+            'dau': distinct([today]),
+            'wau': distinct([today - timedelta(days=i) for i in range(7)]),
+            'mau': distinct([today - timedelta(days=i) for i in range(30)]),
+            'endpoints': {
+                name: {'users': sketch.count(), 'requests': requests}
+                for name, (sketch, requests) in sorted(endpoints.items())
+            },
+        }
+
+    def _ensure_worker(self):
+        if self._worker_pid == os.getpid():
+            return
+        self._worker_pid = os.getpid()
+        threading.Thread(target=self._run, name='analytics-flush', daemon=True).start()
+        atexit.register(self._flush_now)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self._flush_now()
+
+    def _flush_now(self):
+        with self.app.app_context():
+            from . import mysql
+
+            cur = mysql.connection.cursor()
+            try:
+                self.flush(cur, mysql.connection.commit)
+            except Exception as e:
+                mysql.connection.rollback()
+                logger.error(f"[ANALYTICS] Flush failed: {e}")
+            finally:
+                cur.close()
+
+    def stats(self):
+        with self._lock:
+            sketches = len(self._sketches)
+        return {'sketches': sketches, 'flushes': self.flushes}
@@ -0,0 +1,79 @@
+"""LRU cache of verified JWTs.
+
+Entries are keyed by a SHA-256 digest of the raw token and hold the claims
+returned by ``jwt.decode``. Only tokens that passed signature and expiry
+verification are stored, and an entry is dropped once its ``exp`` passes,
+so a hit is never more permissive than decoding again.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    def __init__(self, app=None):
+        self.maxsize = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TOKEN_CACHE_SIZE', 4096)
+        self.maxsize = app.config['TOKEN_CACHE_SIZE']
+        self.clear()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, token, claims):
+        if self.maxsize <= 0:
+            return
+        key = self._key(token)
+        expires_at = claims.get('exp')
+        if expires_at is not None:
+            # jwt.decode truncates a fractional exp before comparing it.
+            expires_at = int(expires_at)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,269 @@
+"""Per-user read-through cache of serialized GET responses.
+
+Entries are grouped by ``(user_id, namespace)`` where the namespace names
+what the body was built from (``tasks``, ``task:<id>``, ``projects``), and
+keyed within the group by the full request path. Committed change sets
+drop exactly the groups they affect, so a write never has to guess which
+pages or filters it made stale.
+
+``LocalBackend`` is an in-process LRU bounded by entry count and TTL. With
+several worker processes use ``RedisBackend`` so invalidations are seen by
+every worker; any local ``redis-server`` can stand in for a shared one.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from . import changes
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+
+class LocalBackend:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (user, ns, path) -> (expires_at, value)
+        self._groups = {}  # (user, ns) -> {path}
+        self._generations = {}  # user -> invalidation count
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_writes = 0
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        group = self._groups.get(key[:2])
+        if group is not None:
+            group.discard(key[2])
+            if not group:
+                del self._groups[key[:2]]
+
+    def get(self, user_id, namespace, path):
+        key = (user_id, namespace, path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def generation(self, user_id):
+        return self._generations.get(user_id, 0)
+
+    def set(self, user_id, namespace, path, value, generation=None):
+        key = (user_id, namespace, path)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(user_id, 0):
+                # A write for this user committed while the body was being
+                # built; it may already be stale.
+                self.stale_writes += 1
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._groups.setdefault(key[:2], set()).add(path)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, user_id, namespaces):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for namespace in namespaces:
+                for path in list(self._groups.get((user_id, namespace), ())):
+                    self._drop((user_id, namespace, path))
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'stale_writes': self.stale_writes,
+        }
+
+
+# Store the entry only if no invalidation happened since the body was built
+SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+
+
+class RedisBackend:
+    """One Redis hash per ``(user, namespace)``; invalidation deletes the hash
+    and bumps the user's generation key. The ``{user}`` hash tag keeps a
+    user's keys in one cluster slot for the script."""
+
+    # Outlives any request, so a generation read before it expired can't
+    # match a counter restarted after
+    GENERATION_TTL = 24 * 3600
+
+    def __init__(self, url, ttl):
+        if redis is None:
+            raise RuntimeError('RESPONSE_CACHE_BACKEND=redis requires the redis package')
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self._set_if_generation = self.client.register_script(SET_IF_GENERATION)
+        self.writes = 0
+        self.stale_writes = 0
+        self.deleted_groups = 0
+
+    @staticmethod
+    def _hash(user_id, namespace):
+        return f'response-cache:{{{user_id}}}:{namespace}'
+
+    @staticmethod
+    def _generation_key(user_id):
+        return f'response-cache:{{{user_id}}}#generation'
+
+    def get(self, user_id, namespace, path):
+        raw = self.client.hget(self._hash(user_id, namespace), path)
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b'\n')
+        return etag.decode(), body
+
+    def generation(self, user_id):
+        return int(self.client.get(self._generation_key(user_id)) or 0)
+
+    def set(self, user_id, namespace, path, value, generation=None):
+        etag, body = value
+        name = self._hash(user_id, namespace)
+        entry = etag.encode() + b'\n' + body
+        if generation is None:
+            pipe = self.client.pipeline()
+            pipe.hset(name, path, entry)
+            pipe.expire(name, self.ttl)
+            pipe.execute()
+        elif not self._set_if_generation(keys=[self._generation_key(user_id), name],
+                                         args=[generation, path, entry, self.ttl]):
+            self.stale_writes += 1
+            return
+        self.writes += 1
+
+    def invalidate(self, user_id, namespaces):
+        key = self._generation_key(user_id)
+        pipe = self.client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, self.GENERATION_TTL)
+        if namespaces:
+            pipe.delete(*(self._hash(user_id, ns) for ns in namespaces))
+        results = pipe.execute()
+        if namespaces:
+            self.deleted_groups += results[-1]
+
+    def stats(self):
+        return {
+            'writes': self.writes,
+            'stale_writes': self.stale_writes,
+            'deleted_groups': self.deleted_groups,
+        }
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_BACKEND', 'local')
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 10000)
+        app.config.setdefault('RESPONSE_CACHE_TTL', 60)
+        app.config.setdefault('RESPONSE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+        backend = app.config['RESPONSE_CACHE_BACKEND']
+        ttl = app.config['RESPONSE_CACHE_TTL']
+        if backend == 'local':
+            self.backend = LocalBackend(app.config['RESPONSE_CACHE_MAX_ENTRIES'], ttl)
+        elif backend == 'redis':
+            self.backend = RedisBackend(app.config['RESPONSE_CACHE_REDIS_URL'], ttl)
+        else:
+            self.backend = None
+        changes.on_commit(self.apply_changes)
+
+    def apply_changes(self, changeset):
+        if self.backend is None:
+            return
+        namespaces = set()
+        if changeset.tasks:
+            namespaces.add('tasks')
+            # New tasks cannot have a cached single-task body yet
+            namespaces.update(f'task:{change.task_id}' for change in changeset.tasks
+                              if not change.created)
+        if changeset.projects:
+            namespaces.add('projects')
+        self.backend.invalidate(changeset.user_id, namespaces)
+        self.invalidations += len(namespaces)
+
+    def cached(self, namespace, key_arg=None):
+        """Serve GETs of the decorated view from the cache.
+
+        Apply below ``token_required``. ``key_arg`` names a view argument
+        appended to the namespace, e.g. ``cached('task', 'task_id')``.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if request.method != 'GET' or self.backend is None:
+                    return f(*args, **kwargs)
+
+                ns = f'{namespace}:{kwargs[key_arg]}' if key_arg else namespace
+                user_id = request.user['id']
+                path = request.full_path
+                hit = self.backend.get(user_id, ns, path)
+                if hit is not None:
+                    self.hits += 1
+                    etag, body = hit
+                    if etag and request.if_none_match.contains(etag):
+                        response = Response(status=304)
+                    else:
+                        response = Response(body, mimetype='application/json')
+                    if etag:
+                        response.set_etag(etag)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self.misses += 1
+                generation = self.backend.generation(user_id)
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    etag, _ = response.get_etag()
+                    self.backend.set(user_id, ns, path, (etag or '', response.get_data()),
+                                     generation)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return decorated
+        return decorator
+
+    def stats(self):
+        total = self.hits + self.misses
+        values = {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'invalidations': self.invalidations,
+        }
+        if self.backend is not None:
+            values.update(self.backend.stats())
+        return values
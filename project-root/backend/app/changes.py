@@ -0,0 +1,84 @@
+"""Fan-out of task and project writes to the subsystems that derive state from them.
+
+Write routes describe what they changed in a ``ChangeSet`` and call
+``changes.commit(cur)`` instead of committing directly. Handlers registered
+with ``on_apply`` run on the route's cursor inside the same transaction
+(search postings, collection versions, statistics); handlers registered
+with ``on_commit`` run only once the transaction is durable.
+
+A task change carries ``before``/``after`` dicts holding whichever task
+columns the route knows (``after`` is None for a delete, ``before`` is None
+for a create).
+"""
+_apply_handlers = []
+_commit_handlers = []
+
+
+def on_apply(handler):
+    if handler not in _apply_handlers:
+        _apply_handlers.append(handler)
+    return handler
+
+
+def on_commit(handler):
+    if handler not in _commit_handlers:
+        _commit_handlers.append(handler)
+    return handler
+
+
+class TaskChange:
+    __slots__ = ('task_id', 'before', 'after')
+
+    def __init__(self, task_id, before, after):
+        self.task_id = task_id
+        self.before = before
+        self.after = after
+
+    @property
+    def created(self):
+        return self.before is None
+
+    @property
+    def deleted(self):
+        return self.after is None
+
+
+class ProjectChange:
+    __slots__ = ('project_id', 'op')
+
+    def __init__(self, project_id, op):
+        self.project_id = project_id
+        self.op = op
+
+
+class ChangeSet:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.tasks = []
+        self.projects = []
+
+    def __bool__(self):
+        return bool(self.tasks or self.projects)
+
+    def task(self, task_id, before=None, after=None):
+        self.tasks.append(TaskChange(task_id, before, after))
+
+    def project(self, project_id, op):
+        self.projects.append(ProjectChange(project_id, op))
+
+    def apply(self, cur):
+        if self:
+            for handler in _apply_handlers:
+                handler(cur, self)
+
+    def committed(self):
+        if self:
+            for handler in _commit_handlers:
+                handler(self)
+
+    def commit(self, cur):
+        from . import mysql
+
+        self.apply(cur)
+        mysql.connection.commit()
+        self.committed()
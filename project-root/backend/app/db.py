@@ -0,0 +1,514 @@
+"""Pooled MySQL connections.
+
+``MySQL`` is a drop-in replacement for ``flask_mysqldb.MySQL``: routes keep
+using ``mysql.connection``, but the connection is checked out of a shared
+pool on first use in an app context and returned on teardown instead of
+being opened and closed per request.
+
+With ``MYSQL_REPLICAS`` configured, GET requests to views marked
+``@mysql.read_only`` get a replica connection instead, round-robin over the
+replicas that are reachable and no more than ``DB_REPLICA_MAX_LAG`` seconds
+behind. A background thread re-checks them every
+``DB_REPLICA_CHECK_INTERVAL`` seconds. Users who committed a change in the
+last ``DB_READ_YOUR_WRITES_SECONDS`` keep reading from the primary, and so
+does everyone when no replica qualifies. Recent writers are marked in a
+shared memory table made in ``init_app``, so a write on one worker keeps
+the user's reads on every worker forked from the app on the primary.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from flask import g, has_request_context, request
+
+from . import changes
+
+try:
+    import MySQLdb
+    from MySQLdb.cursors import SSCursor
+except ImportError:  # pragma: no cover - depends on the installed driver
+    import pymysql as MySQLdb
+    from pymysql.cursors import SSCursor
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection:
+    __slots__ = ('raw', 'created_at', 'last_used', 'uses')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = self.last_used = time.monotonic()
+        self.uses = 0
+
+
+class ConnectionPool:
+    def __init__(self, connect, min_size=1, max_size=10, timeout=5.0,
+                 recycle_uses=0, recycle_seconds=0, pre_ping=True, ping_interval=0):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle_uses = recycle_uses
+        self.recycle_seconds = recycle_seconds
+        self.pre_ping = pre_ping
+        self.ping_interval = ping_interval
+
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        self.created = 0
+        self.recycled = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def fill(self):
+        """Open connections until ``min_size`` are available."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def _open(self):
+        conn = PooledConnection(self.connect())
+        self.created += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+
+    def _expired(self, conn):
+        if self.recycle_uses and conn.uses >= self.recycle_uses:
+            return True
+        if self.recycle_seconds and time.monotonic() - conn.created_at >= self.recycle_seconds:
+            return True
+        return False
+
+    def _healthy(self, conn):
+        # Connections that were in use moments ago are trusted without a round trip
+        if not self.pre_ping or time.monotonic() - conn.last_used < self.ping_interval:
+            return True
+        try:
+            conn.raw.ping()
+            return True
+        except Exception as e:
+            self.ping_failures += 1
+            logger.warning(f"[DB-POOL] Dropping dead connection: {e}")
+            return False
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    self.waits += 1
+                    self.wait_time_total += self.timeout
+                    self.wait_time_max = max(self.wait_time_max, self.timeout)
+                    raise PoolTimeout(
+                        f'No database connection available after {self.timeout}s')
+                self._cond.wait(remaining)
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = None
+                self._size += 1
+            self._in_use += 1
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                self.waits += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+
+        try:
+            if conn is not None:
+                if self._expired(conn):
+                    self.recycled += 1
+                    self._discard(conn)
+                    conn = None
+                elif not self._healthy(conn):
+                    self._discard(conn)
+                    conn = None
+            if conn is None:
+                conn = self._open()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        conn.uses += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                # End whatever transaction the request left open so the next
+                # borrower starts from a fresh snapshot.
+                conn.raw.rollback()
+            except Exception:
+                discard = True
+        conn.last_used = time.monotonic()
+        recycle = not discard and self._expired(conn)
+        with self._cond:
+            self._in_use -= 1
+            if discard or recycle:
+                self._size -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+        if recycle:
+            self.recycled += 1
+        if discard or recycle:
+            self._discard(conn)
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'created': self.created,
+                'recycled': self.recycled,
+                'ping_failures': self.ping_failures,
+                'timeouts': self.timeouts,
+                'waits': self.waits,
+                'wait_time_total': self.wait_time_total,
+                'wait_time_max': self.wait_time_max,
+            }
+
+
+class Replica:
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = None  # unknown until the first check
+        self.lag = None
+        self.reads = 0
+        self.failures = 0
+
+
+def replica_lag(cur):
+    """Seconds the server is behind its source; 0 if it is not replicating,
+    None if replication is configured but stopped."""
+    for statement, column in (('SHOW REPLICA STATUS', 'Seconds_Behind_Source'),
+                              ('SHOW SLAVE STATUS', 'Seconds_Behind_Master')):
+        try:
+            cur.execute(statement)
+        except Exception:
+            continue  # servers before MySQL 8.0.22 only know the second form
+        row = cur.fetchone()
+        if row is None:
+            return 0
+        return dict(zip((column[0] for column in cur.description), row)).get(column)
+    raise RuntimeError('Could not read replication status')
+
+
+class WriteMarks:
+    """Time of each user's last commit, in a direct-mapped table of doubles.
+
+    The anonymous mapping is shared with processes forked after it is made.
+    Users whose ids share a slot see each other's writes, which only sends a
+    few more reads to the primary. Slots are single aligned 8-byte writes,
+    so no lock is taken.
+    """
+    SLOT = struct.Struct('<d')
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.buffer = mmap.mmap(-1, slots * self.SLOT.size)
+
+    def _offset(self, user_id):
+        digest = hashlib.blake2b(str(user_id).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') % self.slots * self.SLOT.size
+
+    def mark(self, user_id, at):
+        self.SLOT.pack_into(self.buffer, self._offset(user_id), at)
+
+    def last(self, user_id):
+        return self.SLOT.unpack_from(self.buffer, self._offset(user_id))[0]
+
+
+class MySQL:
+    def __init__(self, app=None):
+        self.pool = None
+        self.replicas = []
+        self.fallbacks = 0
+        self._wrappers = []
+        self._next_replica = 0
+        self._write_marks = None
+        self._checker_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MYSQL_HOST', 'localhost')
+        app.config.setdefault('MYSQL_PORT', 3306)
+        app.config.setdefault('MYSQL_USER', None)
+        app.config.setdefault('MYSQL_PASSWORD', None)
+        app.config.setdefault('MYSQL_DB', None)
+        app.config.setdefault('MYSQL_CHARSET', 'utf8mb4')
+        # Callable returning a DB-API connection; lets tests and local runs
+        # point the pool at an embedded stand-in instead of a MySQL server.
+        app.config.setdefault('DB_CONNECTION_FACTORY', None)
+        app.config.setdefault('DB_POOL_MIN_SIZE', 1)
+        app.config.setdefault('DB_POOL_MAX_SIZE', 10)
+        app.config.setdefault('DB_POOL_TIMEOUT', 5.0)
+        app.config.setdefault('DB_POOL_RECYCLE_USES', 1000)
+        app.config.setdefault('DB_POOL_RECYCLE_SECONDS', 3600)
+        app.config.setdefault('DB_POOL_PRE_PING', True)
+        app.config.setdefault('DB_POOL_PING_INTERVAL', 5.0)
+        # Connection kwargs overriding the primary's per replica, e.g.
+        # [{'host': 'replica1', 'port': 3306}]; or factories, like DB_CONNECTION_FACTORY
+        app.config.setdefault('MYSQL_REPLICAS', [])
+        app.config.setdefault('DB_REPLICA_CONNECTION_FACTORIES', [])
+        app.config.setdefault('DB_REPLICA_MAX_LAG', 5)
+        app.config.setdefault('DB_REPLICA_CHECK_INTERVAL', 5)
+        app.config.setdefault('DB_READ_YOUR_WRITES_SECONDS', 5)
+        app.config.setdefault('DB_WRITE_MARK_SLOTS', 65536)
+
+        self.pool = self.create_pool(app.config)
+        app.teardown_appcontext(self.teardown)
+        try:
+            self.pool.fill()
+        except Exception as e:
+            logger.warning(f"[DB-POOL] Could not pre-open connections: {e}")
+
+        for replica in self.replicas:
+            replica.pool.close()
+        self.replicas = [
+            Replica(f'replica{i}', self.create_pool(app.config, **params))
+            for i, params in enumerate(app.config['MYSQL_REPLICAS'])
+        ]
+        self.replicas += [
+            Replica(f'replica{len(self.replicas) + i}', self.create_pool(app.config, connect))
+            for i, connect in enumerate(app.config['DB_REPLICA_CONNECTION_FACTORIES'])
+        ]
+        self.max_lag = app.config['DB_REPLICA_MAX_LAG']
+        self.check_interval = app.config['DB_REPLICA_CHECK_INTERVAL']
+        self.read_your_writes = app.config['DB_READ_YOUR_WRITES_SECONDS']
+        if self.replicas:
+            self._write_marks = WriteMarks(app.config['DB_WRITE_MARK_SLOTS'])
+            self.check_replicas()
+            changes.on_commit(self._record_write)
+            # Started lazily so forked workers each get their own thread
+            app.before_request(self._ensure_checker)
+
+    @staticmethod
+    def create_pool(config, connect=None, **overrides):
+        """Pool for the primary, or for a replica given its ``connect``
+        factory or connection kwargs overriding the primary's."""
+        connect = connect or (None if overrides else config['DB_CONNECTION_FACTORY'])
+        if connect is None:
+            kwargs = {
+                'host': config['MYSQL_HOST'],
+                'port': config['MYSQL_PORT'],
+                'charset': config['MYSQL_CHARSET'],
+                'use_unicode': True,
+            }
+            if config['MYSQL_USER']:
+                kwargs['user'] = config['MYSQL_USER']
+            if config['MYSQL_PASSWORD']:
+                kwargs['passwd'] = config['MYSQL_PASSWORD']
+            if config['MYSQL_DB']:
+                kwargs['db'] = config['MYSQL_DB']
+            kwargs.update(overrides)
+
+            def connect():
+                return MySQLdb.connect(**kwargs)
+
+        return ConnectionPool(
+            connect,
+            min_size=config['DB_POOL_MIN_SIZE'],
+            max_size=config['DB_POOL_MAX_SIZE'],
+            timeout=config['DB_POOL_TIMEOUT'],
+            recycle_uses=config['DB_POOL_RECYCLE_USES'],
+            recycle_seconds=config['DB_POOL_RECYCLE_SECONDS'],
+            pre_ping=config['DB_POOL_PRE_PING'],
+            ping_interval=config['DB_POOL_PING_INTERVAL'],
+        )
+
+    def wrap_connections(self, wrapper):
+        """Register ``wrapper(conn) -> conn`` applied to each checked-out connection."""
+        if wrapper not in self._wrappers:
+            self._wrappers.append(wrapper)
+        return wrapper
+
+    def read_only(self, f):
+        """Let GETs of the decorated view read from a replica."""
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method in ('GET', 'HEAD'):
+                g._db_read_only = True
+            return f(*args, **kwargs)
+        return decorated
+
+    def _record_write(self, changeset):
+        if self._write_marks is not None:
+            # Wall clock, which unlike monotonic time every process shares
+            self._write_marks.mark(changeset.user_id, time.time())
+
+    def _wrote_recently(self):
+        user = getattr(request, 'user', None) if has_request_context() else None
+        if not user or self._write_marks is None:
+            return False
+        return time.time() - self._write_marks.last(user['id']) < self.read_your_writes
+
+    def _acquire(self):
+        """Check out a connection for this context; returns ``(pool, pooled)``."""
+        if self.replicas and g.get('_db_read_only') and not self._wrote_recently():
+            candidates = [r for r in self.replicas if r.healthy]
+            if candidates:
+                self._next_replica = (self._next_replica + 1) % len(candidates)
+                replica = candidates[self._next_replica]
+                try:
+                    pooled = replica.pool.acquire()
+                    replica.reads += 1
+                    return replica.pool, pooled
+                except PoolTimeout:
+                    pass
+                except Exception as e:
+                    replica.healthy = False
+                    replica.failures += 1
+                    logger.warning(f"[DB-REPLICA] {replica.name} unavailable: {e}")
+            self.fallbacks += 1
+        return self.pool, self.pool.acquire()
+
+    @property
+    def connection(self):
+        handle = g.get('_db_handle')
+        if handle is None:
+            pool, pooled = self._acquire()
+            g._db_pool = pool
+            g._db_conn = pooled
+            handle = pooled.raw
+            for wrapper in self._wrappers:
+                handle = wrapper(handle)
+            g._db_handle = handle
+        return handle
+
+    def server_side_cursor(self):
+        """Unbuffered cursor that streams rows from the server as they are fetched."""
+        return self.connection.cursor(SSCursor)
+
+    def discard_connection(self):
+        """Close this context's connection on teardown instead of pooling it.
+
+        Used when a streamed result set is abandoned part way: closing the
+        socket is cheaper than draining the remaining rows.
+        """
+        g._db_discard = True
+
+    def teardown(self, exception):
+        g.pop('_db_handle', None)
+        pool = g.pop('_db_pool', self.pool)
+        pooled = g.pop('_db_conn', None)
+        if pooled is not None:
+            pool.release(pooled, discard=g.pop('_db_discard', False))
+
+    def close(self):
+        """Close idle primary and replica connections. A preloading server
+        calls this before forking so workers never share a socket; the
+        pools reopen connections on demand."""
+        self.pool.close()
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def check_replicas(self):
+        """Refresh each replica's health and lag."""
+        for replica in self.replicas:
+            try:
+                pooled = replica.pool.acquire()
+            except Exception as e:
+                self._mark_down(replica, e)
+                continue
+            discard = False
+            try:
+                cur = pooled.raw.cursor()
+                try:
+                    replica.lag = replica_lag(cur)
+                finally:
+                    cur.close()
+            except Exception as e:
+                discard = True
+                self._mark_down(replica, e)
+                continue
+            finally:
+                replica.pool.release(pooled, discard=discard)
+            healthy = replica.lag is not None and replica.lag <= self.max_lag
+            if healthy != replica.healthy:
+                log = logger.info if healthy else logger.warning
+                log(f"[DB-REPLICA] {replica.name} {'in' if healthy else 'out of'} rotation (lag {replica.lag})")
+            replica.healthy = healthy
+
+    def _mark_down(self, replica, error):
+        replica.failures += 1
+        if replica.healthy is not False:
+            logger.warning(f"[DB-REPLICA] {replica.name} out of rotation: {error}")
+        replica.healthy = False
+        replica.lag = None
+
+    def _ensure_checker(self):
+        if self._checker_pid == os.getpid():
+            return
+        self._checker_pid = os.getpid()
+        threading.Thread(target=self._check_loop, name='db-replica-check', daemon=True).start()
+
+    def _check_loop(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.check_replicas()
+            except Exception as e:
+                logger.error(f"[DB-REPLICA] Health check failed: {e}")
+
+    def replica_stats(self):
+        stats = {'fallbacks': self.fallbacks}
+        for replica in self.replicas:
+            stats[f'{replica.name}_healthy'] = bool(replica.healthy)
+            stats[f'{replica.name}_lag_seconds'] = replica.lag if replica.lag is not None else -1
+            stats[f'{replica.name}_reads'] = replica.reads
+            stats[f'{replica.name}_failures'] = replica.failures
+            stats.update({f'{replica.name}_pool_{key}': value
+                          for key, value in replica.pool.stats().items()
+                          if key in ('size', 'in_use', 'timeouts')})
+        return stats
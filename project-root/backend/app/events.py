@@ -0,0 +1,253 @@
+"""Per-user change feed over Server-Sent Events.
+
+Committed change sets are published to an in-process hub that fans them
+out to every open ``/api/events`` stream of the same user. Each event is
+encoded once, however many tabs receive it. Subscriber queues are bounded:
+a stream that falls more than ``EVENTS_QUEUE_SIZE`` events behind has its
+backlog replaced by a single ``resync`` event, telling the client to
+refetch its lists. Idle streams get a comment line every
+``EVENTS_HEARTBEAT_SECONDS`` so proxies keep them open and dead
+connections are noticed.
+
+An idle stream costs a parked thread in the sync server and only a
+suspended coroutine under ``asgi.py``, which is what makes thousands of
+open tabs cheap. In the sync server ``EVENTS_MAX_BLOCKING_STREAMS`` caps the
+streams per process, so they can't take every thread from the API.
+
+With the default ``EVENTS_BACKEND='local'`` a stream sees only writes
+handled by its own process. With ``'redis'`` every process publishes its
+change sets to one Redis channel, and relays what it receives to its own
+streams, so a stream sees writes from every worker.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from . import changes
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+RESYNC = 'event: resync\ndata: {}\n\n'
+HEARTBEAT = ': keepalive\n\n'
+CHANNEL = 'task-tracker:events'
+RETRY_SECONDS = 5
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode(event_type, data):
+    return f'event: {event_type}\ndata: {json.dumps(data, default=_json_default)}\n\n'
+
+
+class Subscription:
+    """Bounded queue of encoded events for one open stream.
+
+    ``push`` runs on whichever thread committed the write; ``wait`` (sync
+    server) or ``wait_async`` (asgi.py, bound to the event loop passed to
+    ``EventHub.subscribe``) runs on the stream's own thread or loop.
+    """
+
+    def __init__(self, hub, user_id, max_queued, loop=None):
+        self.hub = hub
+        self.user_id = user_id
+        self.max_queued = max_queued
+        self.overflows = 0
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._loop = loop
+        if loop is None:
+            self._ready = threading.Event()
+        else:
+            self._ready = asyncio.Event()
+
+    def push(self, frame):
+        with self._lock:
+            if self._events and self._events[0] is RESYNC:
+                # The client refetches everything anyway
+                return
+            if len(self._events) >= self.max_queued:
+                self._events.clear()
+                self._events.append(RESYNC)
+                self.overflows += 1
+            else:
+                self._events.append(frame)
+        if self._loop is None:
+            self._ready.set()
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:  # loop closed under us
+                pass
+
+    def _drain(self):
+        with self._lock:
+            frames = list(self._events)
+            self._events.clear()
+        return frames
+
+    def wait(self, timeout):
+        """Block until events arrive or ``timeout`` passes; returns the frames."""
+        self._ready.wait(timeout)
+        self._ready.clear()
+        return self._drain()
+
+    async def wait_async(self, timeout):
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._ready.clear()
+        return self._drain()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    def __init__(self, app=None):
+        self._subscribers = {}  # user_id -> set of Subscription
+        self._count = 0
+        self._blocking = 0
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self.client = None
+        self.published = 0
+        self.relayed = 0
+        self.queue_size = 100
+        self.heartbeat = 15
+        self.max_subscribers = 10000
+        self.max_blocking_streams = None
+        self.backend = 'local'
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EVENTS_QUEUE_SIZE', 100)
+        app.config.setdefault('EVENTS_HEARTBEAT_SECONDS', 15)
+        app.config.setdefault('EVENTS_MAX_SUBSCRIBERS', 10000)
+        # Streams per process that park a thread (sync server); None for no cap
+        app.config.setdefault('EVENTS_MAX_BLOCKING_STREAMS', None)
+        app.config.setdefault('EVENTS_BACKEND', 'local')
+        app.config.setdefault('EVENTS_REDIS_URL', 'redis://localhost:6379/0')
+
+        self.queue_size = app.config['EVENTS_QUEUE_SIZE']
+        self.heartbeat = app.config['EVENTS_HEARTBEAT_SECONDS']
+        self.max_subscribers = app.config['EVENTS_MAX_SUBSCRIBERS']
+        self.max_blocking_streams = app.config['EVENTS_MAX_BLOCKING_STREAMS']
+        self.backend = app.config['EVENTS_BACKEND']
+        if self.backend == 'redis':
+            if redis is None:
+                raise RuntimeError('EVENTS_BACKEND=redis requires the redis package')
+            self.client = redis.Redis.from_url(app.config['EVENTS_REDIS_URL'])
+        elif self.backend != 'local':
+            raise ValueError(f'Unknown EVENTS_BACKEND: {self.backend}')
+        changes.on_commit(self.publish_changes)
+
+    def subscribe(self, user_id, loop=None):
+        if self.client is not None and self._listener_pid != os.getpid():
+            self._ensure_listener()
+        subscription = Subscription(self, user_id, self.queue_size, loop)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribers()
+            if loop is None and self.max_blocking_streams is not None:
+                if self._blocking >= self.max_blocking_streams:
+                    raise TooManySubscribers()
+                self._blocking += 1
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            self._count -= 1
+            if subscription._loop is None and self.max_blocking_streams is not None:
+                self._blocking -= 1
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, frames):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            for frame in frames:
+                subscription.push(frame)
+        self.published += len(frames)
+
+    def publish_changes(self, changeset):
+        if self.client is None and changeset.user_id not in self._subscribers:
+            return
+        frames = []
+        for change in changeset.tasks:
+            op = 'create' if change.created else 'delete' if change.deleted else 'update'
+            frames.append(encode('task', {'id': change.task_id, 'op': op,
+                                          'changes': change.after or {}}))
+        for change in changeset.projects:
+            frames.append(encode('project', {'id': change.project_id, 'op': change.op}))
+        if not frames:
+            return
+        if self.client is None:
+            self.publish(changeset.user_id, frames)
+            return
+        try:
+            # Every process, this one included, delivers it from the channel
+            self.client.publish(CHANNEL, json.dumps({'user_id': changeset.user_id,
+                                                     'frames': frames}))
+        except Exception as e:
+            logger.error(f"[EVENTS] Publish failed, delivering locally only: {e}")
+            self.publish(changeset.user_id, frames)
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+        threading.Thread(target=self._listen, name='events-relay', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    event = json.loads(message['data'])
+                    self.publish(event['user_id'], event['frames'])
+                    self.relayed += 1
+            except Exception as e:
+                logger.error(f"[EVENTS] Relay error, resubscribing: {e}")
+                # Anything published meanwhile is lost; tell streams to refetch
+                with self._lock:
+                    subscribers = [s for group in self._subscribers.values() for s in group]
+                for subscription in subscribers:
+                    subscription.push(RESYNC)
+                time.sleep(RETRY_SECONDS)
+
+    def stats(self):
+        with self._lock:
+            subscribers = self._count
+            users = len(self._subscribers)
+        return {'subscribers': subscribers, 'users': users, 'published': self.published,
+                'relayed': self.relayed}
@@ -0,0 +1,239 @@
+"""Serving of the built frontend (``npm run build`` output) next to the API.
+
+The build directory is indexed once at startup, and only indexed files are
+served, so request paths never touch the filesystem directly. The index
+holds the top-level pages, the files ``asset-manifest.json`` lists and the
+``static/`` tree, so a build directory shared with other files (such as the
+repository root) exposes nothing else. Text assets
+get ``.gz`` and, if the ``brotli`` package is installed, ``.br`` siblings.
+These are written at startup if missing or stale, or ahead of time with
+``flask frontend compress``. Each request picks the best variant its
+``Accept-Encoding`` allows. Files are sent with ``send_file``, so servers
+with a ``wsgi.file_wrapper`` (gunicorn) use ``sendfile``.
+
+Files listed in ``asset-manifest.json``, and files with a content hash in
+their name, never change at a given URL. They are cached for a year as
+``immutable``. Everything else (``index.html``, ``favicon.ico``) is
+revalidated through its ETag on every use. Unknown extensionless paths
+get ``index.html`` so client-side routes survive a reload.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+import click
+from flask import abort, request, send_file
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+INDEX = 'index.html'
+TOP_LEVEL_FILES = (INDEX, '404.html', 'favicon.ico')
+STATIC_DIR = 'static'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.')
+COMPRESSIBLE_TYPES = {
+    'application/javascript', 'application/json', 'application/manifest+json',
+    'image/svg+xml', 'text/css', 'text/html', 'text/javascript', 'text/plain',
+}
+# Build outputs the mimetypes module doesn't know
+EXTRA_TYPES = {'.map': 'application/json'}
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+# Preference order for negotiation
+ENCODINGS = [('br', '.br', _brotli)] if brotli is not None else []
+ENCODINGS.append(('gzip', '.gz', _gzip))
+VARIANT_SUFFIXES = ('.br', '.gz')
+
+
+def content_etag(data):
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+class Asset:
+    __slots__ = ('path', 'mimetype', 'etag', 'immutable', 'variants')
+
+    def __init__(self, path, mimetype, etag, immutable):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.immutable = immutable
+        self.variants = []  # (encoding, path, etag), in preference order
+
+
+def read_manifest(build_dir):
+    try:
+        with open(build_dir / 'asset-manifest.json') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'files': {}}
+
+
+def public_path(manifest):
+    """URL prefix the build was made for (``homepage`` in package.json)."""
+    index_url = manifest.get('files', {}).get(INDEX, '/' + INDEX)
+    return index_url[:-len(INDEX)]
+
+
+def _write_variant(source, target, compress, data):
+    """(Re)write ``target`` unless it is newer than ``source``; returns its bytes."""
+    try:
+        if target.stat().st_mtime >= source.stat().st_mtime:
+            return target.read_bytes()
+    except FileNotFoundError:
+        pass
+    compressed = compress(data)
+    # Unique temp name so workers starting together don't interleave writes
+    tmp = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+    tmp.write_bytes(compressed)
+    os.replace(tmp, target)
+    return compressed
+
+
+def build_files(build_dir, listed):
+    """Relative paths of the files that make up the build: the top-level
+    pages, files listed in the manifest and the ``static/`` tree. Anything
+    else in the directory (sources, dotfiles, config) is never served."""
+    root = build_dir.resolve()
+    candidates = set(TOP_LEVEL_FILES) | set(listed)
+    candidates.update(path.relative_to(build_dir).as_posix()
+                      for path in (build_dir / STATIC_DIR).rglob('*'))
+    names = []
+    for name in sorted(candidates):
+        path = build_dir / name
+        if (any(part.startswith('.') for part in Path(name).parts)
+                or path.suffix in VARIANT_SUFFIXES or path.name.endswith('.tmp')
+                or not path.is_file() or not path.resolve().is_relative_to(root)):
+            continue
+        names.append(name)
+    return names
+
+
+def build_assets(build_dir, min_size=1024, precompress=True):
+    """Index ``build_dir`` as ``{relative url path: Asset}``."""
+    manifest = read_manifest(build_dir)
+    prefix = public_path(manifest)
+    hashed = {url[len(prefix):] for name, url in manifest.get('files', {}).items()
+              if url.startswith(prefix) and name != INDEX}
+
+    assets = {}
+    for name in build_files(build_dir, hashed):
+        path = build_dir / name
+        mimetype = (mimetypes.guess_type(name)[0] or EXTRA_TYPES.get(path.suffix)
+                    or 'application/octet-stream')
+        data = path.read_bytes()
+        asset = assets[name] = Asset(path, mimetype, content_etag(data),
+                                     name in hashed or bool(HASHED_NAME.search(path.name)))
+        if mimetype not in COMPRESSIBLE_TYPES or len(data) < min_size:
+            continue
+        for encoding, suffix, compress in ENCODINGS:
+            target = path.with_name(path.name + suffix)
+            try:
+                if precompress:
+                    compressed = _write_variant(path, target, compress, data)
+                elif target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+                    compressed = target.read_bytes()
+                else:
+                    continue
+            except OSError as e:
+                logger.warning(f"[FRONTEND] Cannot write {target}: {e}")
+                continue
+            if len(compressed) < len(data):
+                asset.variants.append((encoding, target, f'{asset.etag}-{encoding}'))
+    return assets, prefix
+
+
+class FrontendAssets:
+    def __init__(self, app=None):
+        self.app = None
+        self.assets = {}
+        self.prefix = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FRONTEND_BUILD_DIR', None)
+        app.config.setdefault('FRONTEND_PUBLIC_PATH', None)
+        app.config.setdefault('FRONTEND_PRECOMPRESS', True)
+        app.config.setdefault('FRONTEND_COMPRESS_MIN_SIZE', 1024)
+
+        self.app = app
+        app.cli.add_command(frontend_cli)
+        build_dir = app.config['FRONTEND_BUILD_DIR']
+        if not build_dir:
+            return
+        self.assets, prefix = build_assets(Path(build_dir),
+                                           app.config['FRONTEND_COMPRESS_MIN_SIZE'],
+                                           app.config['FRONTEND_PRECOMPRESS'])
+        self.prefix = (app.config['FRONTEND_PUBLIC_PATH'] or prefix).rstrip('/')
+        app.add_url_rule(f'{self.prefix}/', 'frontend_index', self.serve, defaults={'path': ''})
+        app.add_url_rule(f'{self.prefix}/<path:path>', 'frontend', self.serve)
+        logger.info(f"[FRONTEND] Serving {len(self.assets)} files from {build_dir} "
+                    f"at {self.prefix or '/'}")
+
+    def serve(self, path):
+        asset = self.assets.get(path or INDEX)
+        if asset is None:
+            # Missing files and API paths 404; anything else is a client-side route
+            if path.startswith('api/') or '.' in path.rsplit('/', 1)[-1]:
+                abort(404)
+            asset = self.assets.get(INDEX)
+            if asset is None:
+                abort(404)
+        return self.send(asset)
+
+    def send(self, asset):
+        encoding = None
+        path, etag = asset.path, asset.etag
+        for variant_encoding, variant_path, variant_etag in asset.variants:
+            if request.accept_encodings[variant_encoding]:
+                encoding, path, etag = variant_encoding, variant_path, variant_etag
+                break
+
+        response = send_file(path, mimetype=asset.mimetype, etag=etag, conditional=True,
+                             max_age=IMMUTABLE_MAX_AGE if asset.immutable else None)
+        if asset.immutable:
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+frontend_cli = AppGroup('frontend', help='Built frontend assets.')
+
+
+@frontend_cli.command('compress')
+@click.argument('build_dir', required=False)
+def compress_command(build_dir):
+    """Write .gz/.br variants of the frontend build (defaults to FRONTEND_BUILD_DIR)."""
+    from flask import current_app
+
+    build_dir = build_dir or current_app.config['FRONTEND_BUILD_DIR']
+    if not build_dir:
+        raise click.UsageError('Pass BUILD_DIR or set FRONTEND_BUILD_DIR')
+    assets, _ = build_assets(Path(build_dir), current_app.config['FRONTEND_COMPRESS_MIN_SIZE'])
+    variants = sum(len(asset.variants) for asset in assets.values())
+    encodings = ', '.join(encoding for encoding, _, _ in ENCODINGS)
+    click.echo(f'{len(assets)} files, {variants} compressed variants ({encodings})')
@@ -0,0 +1,121 @@
+"""Password hashing off the request thread.
+
+Hashing and verification run on a bounded executor so a burst of logins
+queues behind a fixed number of KDF workers instead of occupying every
+request worker. When the executor and its queue are full, callers get
+``HasherBusy`` immediately and the app answers 503. Hashes made with an
+older ``PASSWORD_HASH_METHOD`` are upgraded transparently on login.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rejected = 0
+        self.kdf_seconds_total = 0.0
+        self.kdf_seconds_max = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        app.config.setdefault('PASSWORD_HASH_EXECUTOR', 'thread')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 4)
+        app.config.setdefault('PASSWORD_HASH_QUEUE_DEPTH', 32)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10.0)
+
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.executor_kind = app.config['PASSWORD_HASH_EXECUTOR']
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        self._slots = threading.BoundedSemaphore(
+            self.workers + app.config['PASSWORD_HASH_QUEUE_DEPTH'])
+        # werkzeug expands bare method names ('scrypt') to their full
+        # parameter string; compare stored hashes against that form.
+        self.method_prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+
+    def _get_executor(self):
+        # Executors don't survive fork; each worker process builds its own
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    if self.executor_kind == 'process':
+                        self._executor = ProcessPoolExecutor(self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            self.workers, thread_name_prefix='password-hash')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy('Password hashing is saturated')
+        try:
+            future = self._get_executor().submit(_timed, fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _record(self, elapsed):
+        self.calls += 1
+        self.kdf_seconds_total += elapsed
+        self.kdf_seconds_max = max(self.kdf_seconds_max, elapsed)
+
+    def _run(self, fn, *args):
+        result, elapsed = self._submit(fn, *args).result(timeout=self.timeout)
+        self._record(elapsed)
+        return result
+
+    async def _run_async(self, fn, *args):
+        future = asyncio.wrap_future(self._submit(fn, *args))
+        result, elapsed = await asyncio.wait_for(future, self.timeout)
+        self._record(elapsed)
+        return result
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    async def hash_async(self, password):
+        return await self._run_async(generate_password_hash, password, self.method)
+
+    async def verify_async(self, pwhash, password):
+        return await self._run_async(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != self.method_prefix
+
+    def stats(self):
+        return {
+            'executor': self.executor_kind,
+            'workers': self.workers,
+            'calls': self.calls,
+            'rejected': self.rejected,
+            'kdf_seconds_total': self.kdf_seconds_total,
+            'kdf_seconds_max': self.kdf_seconds_max,
+        }
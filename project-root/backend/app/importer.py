@@ -0,0 +1,134 @@
+"""Task validation and chunked bulk import.
+
+``parse_task`` validates one task payload and is shared by ``POST /tasks``
+and the importer. ``import_tasks`` consumes records lazily from a streamed
+CSV or NDJSON body, validates them one at a time and inserts valid rows in
+multi-row INSERTs of ``chunk_size`` rows, committing once per chunk.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from .changes import ChangeSet
+
+TASK_STATUSES = ('pending', 'in_progress', 'completed')
+TASK_PRIORITIES = ('low', 'medium', 'high')
+MAX_TITLE_LENGTH = 255
+
+
+class InvalidTask(ValueError):
+    pass
+
+
+def parse_task(data):
+    """Validate a task payload and return a normalized dict of column values."""
+    if not isinstance(data, dict):
+        raise InvalidTask('Task must be an object')
+    for field in ('title', 'description'):
+        if not isinstance(data.get(field), (str, type(None))):
+            raise InvalidTask(f'{field.capitalize()} must be a string')
+    title = (data.get('title') or '').strip()
+    if not title:
+        raise InvalidTask('Missing title')
+    if len(title) > MAX_TITLE_LENGTH:
+        raise InvalidTask('Title too long')
+
+    status = data.get('status') or 'pending'
+    if status not in TASK_STATUSES:
+        raise InvalidTask('Invalid status')
+    priority = data.get('priority') or 'medium'
+    if priority not in TASK_PRIORITIES:
+        raise InvalidTask('Invalid priority')
+
+    due_date = data.get('due_date') or None
+    if due_date is not None:
+        try:
+            due_date = datetime.fromisoformat(str(due_date).replace('Z', '+00:00'))
+        except ValueError:
+            raise InvalidTask('Invalid due_date')
+
+    return {
+        'title': title,
+        'description': data.get('description') or '',
+        'status': status,
+        'priority': priority,
+        'due_date': due_date,
+    }
+
+
+def read_records(stream, fmt):
+    """Yield ``(line_number, record_or_error)`` from a binary stream."""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, InvalidTask('Invalid JSON')
+
+
+def insert_tasks(cur, user_id, tasks):
+    """Insert ``tasks`` with one multi-row INSERT and return their ids.
+
+    The ids start at lastrowid in row order but need not be consecutive:
+    ``auto_increment_increment`` spaces them, and with interleaved
+    auto-increment locking another statement's rows can land between them.
+    Every task INSERT first locks the user's row until commit, so no other
+    row of this user can appear among them, and this user's first
+    ``len(tasks)`` rows from lastrowid on are read back as the new ones.
+    """
+    cur.execute("SELECT id FROM users WHERE id = %s FOR UPDATE", (user_id,))
+    cur.fetchall()
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(tasks))
+    params = []
+    for task in tasks:
+        params.extend((user_id, task['title'], task['description'], task['status'],
+                       task['priority'], task['due_date']))
+    cur.execute(f"""
+        INSERT INTO tasks (user_id, title, description, status, priority, due_date)
+        VALUES {values}""", tuple(params))
+    cur.execute("""
+        SELECT id FROM tasks
+        WHERE user_id = %s AND id >= %s
+        ORDER BY id
+        LIMIT %s""", (user_id, cur.lastrowid, len(tasks)))
+    return [row[0] for row in cur.fetchall()]
+
+
+def import_tasks(cur, user_id, records, chunk_size, max_errors):
+    summary = {'imported': 0, 'failed': 0, 'chunks': 0, 'errors': []}
+
+    def flush(batch):
+        ids = insert_tasks(cur, user_id, batch)
+        changes = ChangeSet(user_id)
+        for task_id, task in zip(ids, batch):
+            changes.task(task_id, after=task)
+        changes.commit(cur)
+        summary['imported'] += len(batch)
+        summary['chunks'] += 1
+
+    batch = []
+    for line_number, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            batch.append(parse_task(record))
+        except InvalidTask as e:
+            summary['failed'] += 1
+            if len(summary['errors']) < max_errors:
+                summary['errors'].append({'row': line_number, 'error': str(e)})
+            continue
+        if len(batch) >= chunk_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return summary
@@ -0,0 +1,184 @@
+"""Logging off the request thread.
+
+The root logger gets a single ``QueueHandler`` that puts records on a
+bounded queue; a ``QueueListener`` thread formats and writes them. When the
+queue is full records are dropped and counted rather than blocking the
+request. Request details (method, path, user id) are captured on the
+request thread, since the listener has no request context.
+
+Levels come from ``LOG_LEVEL`` and per-logger ``LOG_LEVELS``, e.g.
+``{'app.routes': 'DEBUG', 'werkzeug': 'WARNING'}``. ``LOG_FORMAT='json'``
+writes one JSON object per line. DEBUG records are limited to
+``LOG_DEBUG_RATE`` per call site per second and sampled at
+``LOG_DEBUG_SAMPLE``, so turning debug on under load stays cheap.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import has_request_context, request
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+CONTEXT_FIELDS = ('method', 'path', 'user_id')
+
+_exception_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+            user = getattr(request, 'user', None)
+            if user:
+                record.user_id = user['id']
+        return True
+
+
+class DebugLimiter(logging.Filter):
+    """Rate-limit and sample DEBUG records per call site.
+
+    Counters are updated without a lock; under contention a window may let
+    a few extra records through, which is fine for debug output.
+    """
+
+    def __init__(self, rate=None, sample=1.0):
+        super().__init__()
+        self.rate = rate
+        self.sample = sample
+        self.dropped = 0
+        self._windows = {}  # (pathname, lineno) -> (second, count)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.sample < 1.0 and random.random() >= self.sample:
+            self.dropped += 1
+            return False
+        if self.rate:
+            key = (record.pathname, record.lineno)
+            second = int(time.monotonic())
+            window, count = self._windows.get(key, (second, 0))
+            if window != second:
+                window, count = second, 0
+            if count >= self.rate:
+                self.dropped += 1
+                return False
+            self._windows[key] = (window, count + 1)
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Merge args and render tracebacks here, while they are still
+        # valid; leave the rest of the formatting to the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogQueue:
+    def __init__(self, app=None):
+        self.handler = None
+        self.listener = None
+        self.limiter = None
+        self._hooks_registered = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOG_LEVEL', 'INFO')
+        app.config.setdefault('LOG_LEVELS', {})
+        app.config.setdefault('LOG_FORMAT', 'text')
+        app.config.setdefault('LOG_QUEUE_SIZE', 10000)
+        app.config.setdefault('LOG_DEBUG_RATE', 10)
+        app.config.setdefault('LOG_DEBUG_SAMPLE', 1.0)
+
+        self.shutdown()
+        root = logging.getLogger()
+        if self.handler is not None:
+            root.removeHandler(self.handler)
+
+        if app.config['LOG_FORMAT'] == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(TEXT_FORMAT)
+        output = logging.StreamHandler()
+        output.setFormatter(formatter)
+
+        self.queue_size = app.config['LOG_QUEUE_SIZE']
+        self.limiter = DebugLimiter(app.config['LOG_DEBUG_RATE'], app.config['LOG_DEBUG_SAMPLE'])
+        self.handler = NonBlockingQueueHandler(queue.Queue(self.queue_size))
+        self.handler.addFilter(self.limiter)
+        self.handler.addFilter(RequestContextFilter())
+        self.listener = QueueListener(self.handler.queue, output)
+
+        root.addHandler(self.handler)
+        root.setLevel(app.config['LOG_LEVEL'])
+        for name, level in app.config['LOG_LEVELS'].items():
+            logging.getLogger(name).setLevel(level)
+
+        self.listener.start()
+        if not self._hooks_registered:
+            self._hooks_registered = True
+            atexit.register(self.shutdown)
+            # The listener thread does not survive fork; children start their own
+            os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _restart_in_child(self):
+        if self.listener is None:
+            return
+        self.handler.queue = queue.Queue(self.queue_size)
+        self.listener = QueueListener(self.handler.queue, *self.listener.handlers)
+        self.listener.start()
+
+    def shutdown(self):
+        """Flush queued records and stop the listener thread."""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def stats(self):
+        if self.handler is None:
+            return {}
+        return {
+            'queued': self.handler.queue.qsize(),
+            'dropped': self.handler.dropped,
+            'debug_dropped': self.limiter.dropped,
+        }
@@ -0,0 +1,261 @@
+"""Request and database instrumentation exported in Prometheus text format.
+
+Request hooks record a latency histogram and status code counts per
+endpoint. Connections handed out by ``mysql.connection`` are wrapped so
+every cursor counts its queries and the time spent in ``execute`` and the
+fetch calls, which for server-side cursors is where rows cross the wire.
+Components register a ``stats()`` callable with ``collect`` and are
+exported as gauges.
+
+Setting ``METRICS_SLOW_REQUEST_SECONDS`` logs requests slower than that
+threshold together with the statements they ran, without parameters.
+
+Values are per process; scrape each worker or aggregate upstream. The
+``/api/metrics`` endpoint is off unless ``METRICS_TOKEN`` is set, and then
+answers only requests that send it as a bearer token.
+"""
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class RouteStats:
+    __slots__ = ('latency', 'queries', 'statuses', 'db_seconds')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.statuses = {}
+        self.db_seconds = 0.0
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor, metrics):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._metrics.record_query(query, time.perf_counter() - started)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._metrics.record_query(query, time.perf_counter() - started)
+
+    def _fetch(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            self._metrics.record_fetch(time.perf_counter() - started)
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    def __init__(self, conn, metrics):
+        self._conn = conn
+        self._metrics = metrics
+
+    def cursor(self, *args):
+        return InstrumentedCursor(self._conn.cursor(*args), self._metrics)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.slow_request_seconds = None
+        self.token = None
+        self._routes = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        # Log requests slower than this many seconds, with their SQL
+        app.config.setdefault('METRICS_SLOW_REQUEST_SECONDS', None)
+        app.config.setdefault('METRICS_SLOW_REQUEST_MAX_QUERIES', 50)
+        # Bearer token scrapers must send to /api/metrics; None disables it
+        app.config.setdefault('METRICS_TOKEN', None)
+
+        self.enabled = app.config['METRICS_ENABLED']
+        self.slow_request_seconds = app.config['METRICS_SLOW_REQUEST_SECONDS']
+        self.slow_request_max_queries = app.config['METRICS_SLOW_REQUEST_MAX_QUERIES']
+        self.token = app.config['METRICS_TOKEN']
+        if self.enabled:
+            app.before_request(self._start_request)
+            app.after_request(self._finish_request)
+
+    def authorized(self, authorization):
+        """Whether an ``Authorization`` header carries ``METRICS_TOKEN``."""
+        scheme, _, token = (authorization or '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(
+            token.encode(), self.token.encode())
+
+    def collect(self, name, stats):
+        """Export the numeric values of ``stats()`` as ``<name>_<key>`` gauges."""
+        self._collectors[name] = stats
+
+    def instrument(self, conn):
+        return InstrumentedConnection(conn, self) if self.enabled else conn
+
+    def _start_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_queries = 0
+        g._metrics_db_seconds = 0.0
+        g._metrics_statements = [] if self.slow_request_seconds is not None else None
+
+    def record_query(self, query, seconds):
+        if not has_request_context() or '_metrics_started' not in g:
+            return
+        g._metrics_queries += 1
+        g._metrics_db_seconds += seconds
+        statements = g._metrics_statements
+        if statements is not None and len(statements) < self.slow_request_max_queries:
+            statements.append((' '.join(query.split()), seconds))
+
+    def record_fetch(self, seconds):
+        if has_request_context() and '_metrics_started' in g:
+            g._metrics_db_seconds += seconds
+
+    def _finish_request(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        queries = g.pop('_metrics_queries')
+        db_seconds = g.pop('_metrics_db_seconds')
+        statements = g.pop('_metrics_statements')
+        endpoint = request.endpoint or 'unmatched'
+
+        with self._lock:
+            route = self._routes.get((endpoint, request.method))
+            if route is None:
+                route = self._routes[(endpoint, request.method)] = RouteStats()
+            route.latency.observe(elapsed)
+            route.queries.observe(queries)
+            route.statuses[response.status_code] = route.statuses.get(response.status_code, 0) + 1
+            route.db_seconds += db_seconds
+
+        if self.slow_request_seconds is not None and elapsed >= self.slow_request_seconds:
+            lines = [f"[SLOW] {request.method} {request.path} -> {response.status_code} "
+                     f"in {elapsed * 1000:.1f} ms, {queries} queries, "
+                     f"{db_seconds * 1000:.1f} ms in DB"]
+            lines += [f"  {seconds * 1000:8.2f} ms  {sql}" for sql, seconds in statements]
+            logger.warning('\n'.join(lines))
+        return response
+
+    def snapshot(self):
+        """Per ``(endpoint, method)`` request count, query count and DB seconds."""
+        with self._lock:
+            return {
+                key: {
+                    'requests': route.latency.count,
+                    'queries': route.queries.sum,
+                    'db_seconds': route.db_seconds,
+                }
+                for key, route in self._routes.items()
+            }
+
+    def render(self):
+        out = []
+        with self._lock:
+            routes = sorted(self._routes.items())
+            out.append('# TYPE http_request_duration_seconds histogram')
+            for (endpoint, method), route in routes:
+                labels = f'endpoint="{_label(endpoint)}",method="{method}"'
+                for bound, count in route.latency.cumulative():
+                    out.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                out.append(f'http_request_duration_seconds_sum{{{labels}}} {route.latency.sum}')
+                out.append(f'http_request_duration_seconds_count{{{labels}}} {route.latency.count}')
+
+            out.append('# TYPE http_requests_total counter')
+            for (endpoint, method), route in routes:
+                labels = f'endpoint="{_label(endpoint)}",method="{method}"'
+                for status, count in sorted(route.statuses.items()):
+                    out.append(f'http_requests_total{{{labels},status="{status}"}} {count}')
+
+            out.append('# TYPE http_request_db_queries histogram')
+            for (endpoint, method), route in routes:
+                labels = f'endpoint="{_label(endpoint)}",method="{method}"'
+                for bound, count in route.queries.cumulative():
+                    out.append(f'http_request_db_queries_bucket{{{labels},le="{bound}"}} {count}')
+                out.append(f'http_request_db_queries_sum{{{labels}}} {route.queries.sum}')
+                out.append(f'http_request_db_queries_count{{{labels}}} {route.queries.count}')
+
+            out.append('# TYPE http_request_db_seconds_total counter')
+            for (endpoint, method), route in routes:
+                labels = f'endpoint="{_label(endpoint)}",method="{method}"'
+                out.append(f'http_request_db_seconds_total{{{labels}}} {route.db_seconds}')
+
+        for name, stats in sorted(self._collectors.items()):
+            try:
+                values = stats()
+            except Exception as e:
+                logger.warning(f"[METRICS] Collector {name} failed: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    out.append(f'# TYPE {name}_{key} gauge')
+                    out.append(f'{name}_{key} {value}')
+        return '\n'.join(out) + '\n'
@@ -0,0 +1,323 @@
+"""Versioned schema migrations and query-plan checks.
+
+Migrations are the numbered ``.sql`` files in ``app/migrations``, applied
+in order and recorded in ``schema_migrations``. MySQL commits DDL
+implicitly, so a migration that fails part way is fixed forward; index
+statements that were already applied are skipped on the rerun.
+
+    flask --app run db upgrade
+    flask --app run db status
+    flask --app run db check
+
+``db check`` pulls the SQL passed to ``execute`` out of the app modules,
+runs ``EXPLAIN`` on every SELECT, UPDATE and DELETE with placeholder
+values and fails if any of them reads a table with a full scan, cannot
+be rebuilt from the source or cannot be explained. Run it
+against realistic data volumes (``benchmarks/loadtest.py --db mysql`` seeds
+some): on near-empty tables the optimizer scans whatever the indexes.
+"""
+import ast
+import logging
+import re
+from pathlib import Path
+
+import click
+from flask.cli import AppGroup
+
+from .pagination import keyset_clause
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parent
+MIGRATIONS_DIR = APP_DIR / 'migrations'
+_FILE_RE = re.compile(r'^(\d+)_(\w+)\.sql$')
+ER_DUP_KEYNAME = 1061
+
+MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT NOT NULL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )"""
+
+# Queries that read everything on purpose, by module.function
+FULL_SCAN_ALLOWED = {
+    'stats.global_stats',
+    'stats.reconcile',
+    'search.reindex_command',
+    'sync.compact',
+}
+
+# Representative SQL for names the checker cannot resolve from assignments,
+# by name or, for one function only, by ``module.function:name``
+FORWARDED = '-- SQL from the caller, checked where it is written'
+SUBSTITUTIONS = {
+    'keyset_sql': keyset_clause(('2024-01-01T00:00:00', 1))[0],
+    'order': 'DESC',
+    'field': 'status',
+    'column': 'status',
+    'db.replica_lag:statement': 'SHOW REPLICA STATUS',
+    'metrics.InstrumentedCursor.execute:query': FORWARDED,
+    'metrics.InstrumentedCursor.executemany:query': FORWARDED,
+}
+
+
+def discover():
+    """Return ``[(version, name, path)]`` for the migration files, in order."""
+    found = []
+    for path in MIGRATIONS_DIR.iterdir():
+        match = _FILE_RE.match(path.name)
+        if match:
+            found.append((int(match.group(1)), match.group(2), path))
+    return sorted(found)
+
+
+def split_statements(text):
+    lines = [line for line in text.splitlines() if not line.strip().startswith('--')]
+    return [s.strip() for s in re.split(r';\s*$', '\n'.join(lines), flags=re.M) if s.strip()]
+
+
+def applied_versions(cur):
+    cur.execute(MIGRATIONS_TABLE)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def upgrade(cur, commit, target=None):
+    """Apply pending migrations up to ``target``; returns the applied versions."""
+    done = applied_versions(cur)
+    applied = []
+    for version, name, path in discover():
+        if version in done or (target is not None and version > target):
+            continue
+        for statement in split_statements(path.read_text()):
+            try:
+                cur.execute(statement)
+            except Exception as e:
+                if e.args and e.args[0] == ER_DUP_KEYNAME:
+                    logger.warning(f"[MIGRATE] {path.name}: index already exists, skipped")
+                    continue
+                raise
+        cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (version, name))
+        commit()
+        applied.append(version)
+        logger.info(f"[MIGRATE] Applied {path.name}")
+    return applied
+
+
+# --- query plan check ------------------------------------------------------
+
+class Unresolved(Exception):
+    pass
+
+
+def _local_nodes(node):
+    """Walk ``node`` without descending into nested functions or classes."""
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        yield child
+        yield from _local_nodes(child)
+
+
+class Scope:
+    def __init__(self, node, qualname, parent=None):
+        self.qualname = qualname
+        self.parent = parent
+        self.assigns = {}  # name -> [(lineno, augmented, value)]
+        self.appends = {}  # name -> [value]
+        for child in _local_nodes(node):
+            if isinstance(child, ast.Assign) and len(child.targets) == 1 \
+                    and isinstance(child.targets[0], ast.Name):
+                self.assigns.setdefault(child.targets[0].id, []).append(
+                    (child.lineno, False, child.value))
+            elif isinstance(child, ast.AugAssign) and isinstance(child.op, ast.Add) \
+                    and isinstance(child.target, ast.Name):
+                self.assigns.setdefault(child.target.id, []).append(
+                    (child.lineno, True, child.value))
+            elif isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute) \
+                    and child.func.attr == 'append' and isinstance(child.func.value, ast.Name) \
+                    and child.args:
+                self.appends.setdefault(child.func.value.id, []).append(child.args[0])
+
+    def substitute(self, name):
+        for key in (f'{self.qualname}:{name}', name):
+            if key in SUBSTITUTIONS:
+                return SUBSTITUTIONS[key]
+        raise Unresolved(name)
+
+    def resolve(self, name, lineno):
+        assigns = [a for a in self.assigns.get(name, ()) if a[0] < lineno]
+        if not assigns:
+            if self.parent is not None:
+                try:
+                    return self.parent.resolve(name, lineno)
+                except Unresolved:
+                    pass
+            return self.substitute(name)
+        plain = [i for i, (_, augmented, _) in enumerate(assigns) if not augmented]
+        try:
+            return ''.join(self.render(value, lineno)
+                           for _, _, value in assigns[plain[-1] if plain else 0:])
+        except Unresolved:
+            return self.substitute(name)
+
+    def render(self, node, lineno):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.JoinedStr):
+            return ''.join(self.render(part.value if isinstance(part, ast.FormattedValue) else part,
+                                       lineno) for part in node.values)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            return self.render(node.left, lineno) + self.render(node.right, lineno)
+        if isinstance(node, ast.Name):
+            return self.resolve(node.id, lineno)
+        if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.Or):
+            return self.render(node.values[-1], lineno)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                and node.func.attr == 'join' and node.args:
+            # ', '.join(['%s'] * n) or ' UNION ALL '.join(parts): one element
+            items = node.args[0]
+            if isinstance(items, ast.BinOp) and isinstance(items.left, ast.List) and items.left.elts:
+                return self.render(items.left.elts[0], lineno)
+            if isinstance(items, ast.Name):
+                scope = self
+                while scope is not None:
+                    if items.id in scope.appends:
+                        return self.render(scope.appends[items.id][0], lineno)
+                    scope = scope.parent
+        raise Unresolved(ast.unparse(node))
+
+
+def extract_queries(paths=None):
+    """Yield ``(location, function, sql_or_None, error)`` for each ``execute`` call."""
+    for path in paths or sorted(p for p in APP_DIR.glob('*.py') if p.name != 'migrate.py'):
+        tree = ast.parse(path.read_text(), str(path))
+        yield from _extract(tree, path.stem, None, path.name)
+
+
+def _extract(node, qualname, scope, filename):
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            # Nested functions report under the function that defines them
+            name = qualname if scope is not None else f'{qualname}.{child.name}'
+            inner = scope if isinstance(child, ast.ClassDef) else Scope(child, name, scope)
+            yield from _extract(child, name, inner, filename)
+            continue
+        if scope is not None and isinstance(child, ast.Call) \
+                and isinstance(child.func, ast.Attribute) \
+                and child.func.attr in ('execute', 'executemany') and child.args:
+            location = f'{filename}:{child.lineno}'
+            try:
+                yield location, qualname, scope.render(child.args[0], child.lineno), None
+            except Unresolved as e:
+                yield location, qualname, None, f'cannot resolve {e}'
+        yield from _extract(child, qualname, scope, filename)
+
+
+_DATETIME_PARAM = re.compile(r'(created_at|updated_at|due_date|changed_at)\s*(<=|>=|<|>|=)\s*(DATE\()?$', re.I)
+
+
+def bind_placeholders(sql):
+    """Replace ``%s`` with literals of a plausible type for EXPLAIN."""
+    out, pos = [], 0
+    for match in re.finditer(r'%s', sql):
+        before = sql[:match.start()]
+        if re.search(r'LIMIT\s*$', before, re.I):
+            literal = '50'
+        elif _DATETIME_PARAM.search(before):
+            literal = "'2024-01-01 00:00:00'"
+        elif re.search(r'LIKE\s*$', before, re.I):
+            literal = "'ta%'"
+        else:
+            literal = "'1'"
+        out.append(sql[pos:match.start()] + literal)
+        pos = match.end()
+    return ''.join(out) + sql[pos:]
+
+
+def explain(cur, sql):
+    """Return the tables EXPLAIN reports as full scans."""
+    cur.execute('EXPLAIN ' + bind_placeholders(sql))
+    columns = [column[0] for column in cur.description]
+    scans = []
+    for row in cur.fetchall():
+        plan = dict(zip(columns, row))
+        table = plan.get('table') or ''
+        if plan.get('type') == 'ALL' and not table.startswith('<'):
+            scans.append(table)
+    return scans
+
+
+def check_plans(cur):
+    """EXPLAIN every extracted query; returns ``(failures, errors)``."""
+    failures, errors, seen = [], [], set()
+    for location, function, sql, error in extract_queries():
+        if sql is None:
+            errors.append((location, function, error))
+            continue
+        statement = ' '.join(sql.split())
+        if not statement.upper().startswith(('SELECT', 'UPDATE', 'DELETE')) or statement in seen:
+            continue
+        seen.add(statement)
+        try:
+            scans = explain(cur, sql)
+        except Exception as e:
+            errors.append((location, function, f'EXPLAIN failed: {e}'))
+            continue
+        if scans and function not in FULL_SCAN_ALLOWED:
+            failures.append((location, function, scans, statement))
+    return failures, errors
+
+
+db_cli = AppGroup('db', help='Schema migrations and query plan checks.')
+
+
+@db_cli.command('upgrade')
+@click.option('--target', type=int, help='Stop after this migration version.')
+def upgrade_command(target):
+    """Apply pending migrations."""
+    from . import mysql
+
+    cur = mysql.connection.cursor()
+    try:
+        applied = upgrade(cur, mysql.connection.commit, target)
+        click.echo(f'Applied {len(applied)} migrations' + (f': {applied}' if applied else ''))
+    finally:
+        cur.close()
+
+
+@db_cli.command('status')
+def status_command():
+    """List migrations and whether they have been applied."""
+    from . import mysql
+
+    cur = mysql.connection.cursor()
+    try:
+        done = applied_versions(cur)
+        mysql.connection.commit()
+    finally:
+        cur.close()
+    for version, name, _ in discover():
+        click.echo(f'{"applied" if version in done else "pending":<8} {version:04d} {name}')
+
+
+@db_cli.command('check')
+def check_command():
+    """EXPLAIN the app's queries and fail on full scans or unchecked queries."""
+    from . import mysql
+
+    cur = mysql.connection.cursor()
+    try:
+        failures, errors = check_plans(cur)
+    finally:
+        mysql.connection.rollback()
+        cur.close()
+    for location, function, reason in errors:
+        click.echo(f'ERROR    {location} {function}: {reason}')
+    for location, function, tables, statement in failures:
+        click.echo(f'FULL SCAN {location} {function} on {", ".join(tables)}\n    {statement}')
+    if failures or errors:
+        raise SystemExit(1)
+    click.echo('No full table scans')
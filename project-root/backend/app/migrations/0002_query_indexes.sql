@@ -0,0 +1,14 @@
+-- Login looks users up by email; signup relies on it being unique.
+ALTER TABLE users ADD UNIQUE KEY uq_users_email (email);
+
+-- Listings and exports: WHERE user_id = ? ORDER BY created_at DESC, id DESC,
+-- including the keyset predicate on (created_at, id).
+ALTER TABLE tasks ADD KEY idx_tasks_user_created (user_id, created_at, id);
+
+-- /tasks/filter and dashboard-style counts by status and priority.
+ALTER TABLE tasks ADD KEY idx_tasks_user_status_priority (user_id, status, priority, created_at);
+
+-- /tasks/search?due_date=
+ALTER TABLE tasks ADD KEY idx_tasks_user_due (user_id, due_date);
+
+ALTER TABLE projects ADD KEY idx_projects_user_created (user_id, created_at, id);
@@ -0,0 +1,31 @@
+-- Search index postings, maintained from change sets (app/search.py).
+CREATE TABLE IF NOT EXISTS task_terms (
+    user_id INT NOT NULL,
+    term VARCHAR(64) NOT NULL,
+    task_id INT NOT NULL,
+    weight SMALLINT NOT NULL,
+    PRIMARY KEY (user_id, term, task_id),
+    KEY idx_task_terms_task (task_id)
+);
+
+-- Per-user collection versions behind listing ETags (app/versions.py).
+CREATE TABLE IF NOT EXISTS collection_versions (
+    user_id INT NOT NULL,
+    collection VARCHAR(16) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, collection)
+);
+
+-- Dashboard counters (app/stats.py).
+CREATE TABLE IF NOT EXISTS user_task_stats (
+    user_id INT NOT NULL PRIMARY KEY,
+    total_tasks INT NOT NULL DEFAULT 0,
+    pending_tasks INT NOT NULL DEFAULT 0,
+    in_progress_tasks INT NOT NULL DEFAULT 0,
+    completed_tasks INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS global_stats (
+    name VARCHAR(32) NOT NULL PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
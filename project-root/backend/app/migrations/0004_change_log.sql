@@ -0,0 +1,22 @@
+-- Delta sync (app/sync.py). seq is the user's last change sequence number;
+-- horizon is the highest seq removed by retention, below which sync tokens
+-- can no longer be answered incrementally.
+CREATE TABLE IF NOT EXISTS sync_state (
+    user_id INT NOT NULL PRIMARY KEY,
+    seq BIGINT NOT NULL DEFAULT 0,
+    horizon BIGINT NOT NULL DEFAULT 0
+);
+
+-- One row per changed task or project per change set; deleted rows are
+-- the tombstones. Superseded rows are compacted away.
+CREATE TABLE IF NOT EXISTS change_log (
+    user_id INT NOT NULL,
+    seq BIGINT NOT NULL,
+    entity VARCHAR(8) NOT NULL,
+    entity_id INT NOT NULL,
+    deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, seq),
+    KEY idx_change_log_entity (user_id, entity, entity_id, seq),
+    KEY idx_change_log_changed (changed_at)
+);
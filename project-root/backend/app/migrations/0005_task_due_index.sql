@@ -0,0 +1,3 @@
+-- Reminder scheduler (app/reminders.py) loads upcoming deadlines across
+-- all users by due_date range, in (due_date, id) keyset batches.
+ALTER TABLE tasks ADD KEY idx_tasks_due (due_date, id);
@@ -0,0 +1,11 @@
+-- Daily HyperLogLog sketches of distinct active users (app/analytics.py).
+-- name is '' for all requests, otherwise 'METHOD /api/route'. Workers merge
+-- their registers into the row (register-wise max) and add their request
+-- counts.
+CREATE TABLE IF NOT EXISTS activity_sketches (
+    day DATE NOT NULL,
+    name VARCHAR(128) NOT NULL,
+    registers VARBINARY(4096) NOT NULL,
+    requests BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, name)
+);
@@ -0,0 +1,60 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, row_id):
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+
+
+def page_args(args, config=None):
+    """Read ``limit``/``cursor`` from the query string.
+
+    Returns ``(limit, after)`` where ``after`` is the decoded
+    ``(created_at, id)`` keyset position or None for the first page.
+    """
+    config = config if config is not None else current_app.config
+    default = config['PAGE_SIZE_DEFAULT']
+    maximum = config['PAGE_SIZE_MAX']
+    try:
+        limit = int(args.get('limit', default))
+    except ValueError:
+        raise InvalidCursor('Invalid limit')
+    limit = max(1, min(limit, maximum))
+
+    cursor = args.get('cursor')
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+def keyset_clause(after):
+    """SQL fragment and params continuing a ``created_at DESC, id DESC`` scan."""
+    if after is None:
+        return '', ()
+    created_at, row_id = after
+    return (' AND (created_at < %s OR (created_at = %s AND id < %s))',
+            (created_at, created_at, row_id))
+
+
+def next_cursor(rows, limit, created_at_index, id_index=0):
+    """Trim the look-ahead row and return ``(rows, cursor)``."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[created_at_index], last[id_index])
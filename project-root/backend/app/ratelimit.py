@@ -0,0 +1,197 @@
+"""Per-IP and per-user request rate limits shared by the workers on a node.
+
+Limits are GCRA, the token bucket reduced to one number per key: the
+theoretical arrival time (TAT) at which the bucket is full again. A rule
+``(count, seconds)`` admits ``count`` requests at once and refills one every
+``seconds / count``. A rejected request gets ``429`` with ``Retry-After``.
+
+Buckets live in a fixed table of ``RATELIMIT_SLOTS`` 16-byte slots (key hash,
+TAT). The table is an anonymous shared ``mmap`` made in ``init_app``, so the
+workers a preloading server forks from the app all see it. Without
+preloading, set ``RATELIMIT_SHM_PATH`` (e.g. under ``/dev/shm``) to map a
+file instead. ``RATELIMIT_BACKEND='local'`` keeps the table in process
+memory, as a stand-in for tests and single-process runs.
+
+Nothing is locked: two workers updating one key at the same instant can lose
+an update and admit an extra request, which a rate limit can afford. A key
+probes ``PROBES`` slots; a slot whose TAT has passed holds a full bucket and is
+free to reuse, so the table only evicts live buckets when it is overfull.
+
+IP rules are checked before the view runs, so a limited login never reaches
+the password hash. User rules are checked in ``token_required`` once the
+token is decoded.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import time
+
+from flask import request
+
+SLOT = struct.Struct('<Qd')
+PROBES = 8
+IP = 'ip'
+USER = 'user'
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f'Rate limit exceeded, retry after {retry_after:.1f}s')
+        self.retry_after = retry_after
+
+
+def endpoint_name(endpoint):
+    """``api.login`` -> ``login``, so rules apply in sync and async mode alike."""
+    return (endpoint or '').rsplit('.', 1)[-1]
+
+
+def key_hash(key):
+    # 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+
+class BucketTable:
+    """GCRA state in a fixed open-addressed table over ``buffer``."""
+
+    def __init__(self, buffer, slots):
+        self.buffer = buffer
+        self.slots = slots
+        self.evictions = 0
+
+    def acquire(self, key, interval, burst, now):
+        """Take one request from ``key``'s bucket; returns 0, or the seconds to wait."""
+        h = key_hash(key)
+        buffer = self.buffer
+        first = h % self.slots
+        offset = free = oldest = None
+        tat = oldest_tat = math.inf
+        for i in range(PROBES):
+            slot_offset = ((first + i) % self.slots) * SLOT.size
+            slot_key, slot_tat = SLOT.unpack_from(buffer, slot_offset)
+            if slot_key == h:
+                offset, tat = slot_offset, slot_tat
+                break
+            if free is None and (slot_key == 0 or slot_tat <= now):
+                free = slot_offset
+            if slot_tat < oldest_tat:
+                oldest, oldest_tat = slot_offset, slot_tat
+        if offset is None:
+            if free is None:
+                free = oldest
+                self.evictions += 1
+            offset, tat = free, now
+
+        tat = max(tat, now)
+        allow_at = tat + interval - burst * interval
+        if now < allow_at:
+            return allow_at - now
+        SLOT.pack_into(buffer, offset, h, tat + interval)
+        return 0
+
+
+def create_table(slots, backend='shared', path=None):
+    size = slots * SLOT.size
+    if backend == 'local':
+        return BucketTable(bytearray(size), slots)
+    if backend != 'shared':
+        raise ValueError(f'Unknown RATELIMIT_BACKEND: {backend}')
+    if path:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            return BucketTable(mmap.mmap(fd, size), slots)
+        finally:
+            os.close(fd)
+    # Anonymous mappings are MAP_SHARED, so forked workers share this one
+    return BucketTable(mmap.mmap(-1, size), slots)
+
+
+class RateLimiter:
+    def __init__(self, app=None):
+        self.app = None
+        self.table = None
+        self.enabled = False
+        self.allowed = 0
+        self.limited = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_BACKEND', 'shared')
+        app.config.setdefault('RATELIMIT_SHM_PATH', None)
+        app.config.setdefault('RATELIMIT_SLOTS', 65536)
+        # Endpoint name (without blueprint) -> (IP or USER, count, seconds)
+        app.config.setdefault('RATELIMITS', {})
+        # Rule for authenticated endpoints not listed in RATELIMITS
+        app.config.setdefault('RATELIMIT_DEFAULT', None)
+        # Proxies in front of the app whose X-Forwarded-For entries to trust
+        app.config.setdefault('RATELIMIT_FORWARDED_HOPS', 0)
+
+        self.app = app
+        self.enabled = app.config['RATELIMIT_ENABLED']
+        self.rules = {endpoint: self._rule(*rule)
+                      for endpoint, rule in app.config['RATELIMITS'].items()}
+        default = app.config['RATELIMIT_DEFAULT']
+        self.default = self._rule(*default) if default else None
+        self.forwarded_hops = app.config['RATELIMIT_FORWARDED_HOPS']
+        if not self.enabled:
+            return
+        self.table = create_table(app.config['RATELIMIT_SLOTS'],
+                                  app.config['RATELIMIT_BACKEND'],
+                                  app.config['RATELIMIT_SHM_PATH'])
+        app.before_request(self._before_request)
+
+    @staticmethod
+    def _rule(scope, count, seconds):
+        if scope not in (IP, USER):
+            raise ValueError(f'Rate limit scope must be {IP!r} or {USER!r}, not {scope!r}')
+        # (scope, interval between requests, burst)
+        return scope, seconds / count, count
+
+    def client_ip(self, headers, remote_addr):
+        if self.forwarded_hops:
+            forwarded = headers.get('X-Forwarded-For', '').split(',')
+            if len(forwarded) >= self.forwarded_hops:
+                return forwarded[-self.forwarded_hops].strip()
+        return remote_addr or ''
+
+    def hit(self, key, rule):
+        _, interval, burst = rule
+        retry_after = self.table.acquire(key, interval, burst, time.time())
+        if retry_after:
+            self.limited += 1
+            raise RateLimited(retry_after)
+        self.allowed += 1
+
+    def check_ip(self, endpoint, headers, remote_addr):
+        """Apply the endpoint's rule keyed by client address, if it has one."""
+        endpoint = endpoint_name(endpoint)
+        rule = self.rules.get(endpoint)
+        if rule is not None and rule[0] == IP:
+            self.hit(f'{endpoint}:ip:{self.client_ip(headers, remote_addr)}', rule)
+
+    def check_user(self, endpoint, user_id):
+        """Apply the endpoint's (or the default) rule keyed by user; called
+        by ``token_required``."""
+        if not self.enabled:
+            return
+        endpoint = endpoint_name(endpoint)
+        rule = self.rules.get(endpoint, self.default)
+        if rule is not None and rule[0] == USER:
+            key = endpoint if endpoint in self.rules else '*'
+            self.hit(f'{key}:user:{user_id}', rule)
+
+    def _before_request(self):
+        if request.method != 'OPTIONS':  # CORS preflights
+            self.check_ip(request.endpoint, request.headers, request.remote_addr)
+
+    def stats(self):
+        return {
+            'allowed': self.allowed,
+            'limited': self.limited,
+            'evictions': self.table.evictions if self.table else 0,
+        }
@@ -0,0 +1,247 @@
+"""Due-date reminders pushed to the change feed.
+
+Upcoming deadlines are held in a heap keyed by fire time (due date minus
+``REMINDERS_LEAD_SECONDS``), so scheduling and firing are O(log n) and the
+scheduler thread sleeps until the next one is due. Only the next
+``REMINDERS_WINDOW_SECONDS`` of deadlines are loaded, by index range on
+``tasks.due_date`` in keyset batches. The next window is loaded before the
+current one runs out, and a restart rebuilds from the current window only.
+
+Committed change sets queue the ids of tasks whose title, status or due date
+changed, and the scheduler thread re-reads just those rows. Writes handled
+by other workers are picked up when the loaded window is re-read every
+``REMINDERS_RESYNC_SECONDS``. Every task is checked again by primary key
+just before its reminder fires. Reminders go out as ``reminder`` events on
+``/api/events``.
+"""
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from . import changes
+from .events import encode
+
+logger = logging.getLogger(__name__)
+
+REMINDER_FIELDS = ('title', 'status', 'due_date')
+RETRY_SECONDS = 5
+
+
+class ReminderScheduler:
+    def __init__(self, app=None):
+        self.app = None
+        self._heap = []  # (fire_at, task_id); stale entries are skipped when popped
+        self._entries = {}  # task_id -> (fire_at, user_id, title, due_date)
+        self._pending = set()  # task ids to re-read
+        self._fired = {}  # task_id -> due_date already reminded about
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker_pid = None
+        self.loaded_until = None
+        self.fired = 0
+        self.rows_loaded = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REMINDERS_ENABLED', True)
+        app.config.setdefault('REMINDERS_LEAD_SECONDS', 900)
+        app.config.setdefault('REMINDERS_WINDOW_SECONDS', 3600)
+        app.config.setdefault('REMINDERS_RESYNC_SECONDS', 300)
+        app.config.setdefault('REMINDERS_LOAD_BATCH', 1000)
+
+        self.app = app
+        self.lead = timedelta(seconds=app.config['REMINDERS_LEAD_SECONDS'])
+        self.window = timedelta(seconds=app.config['REMINDERS_WINDOW_SECONDS'])
+        self.resync_seconds = app.config['REMINDERS_RESYNC_SECONDS']
+        self.batch = app.config['REMINDERS_LOAD_BATCH']
+        if app.config['REMINDERS_ENABLED']:
+            changes.on_commit(self.apply_changes)
+            # Started lazily so forked workers each get their own thread
+            app.before_request(self._ensure_worker)
+
+    def apply_changes(self, changeset):
+        ids = [change.task_id for change in changeset.tasks
+               if change.created or change.deleted
+               or any(field in change.after for field in REMINDER_FIELDS)]
+        if ids:
+            with self._lock:
+                self._pending.update(ids)
+            self._wake.set()
+
+    # --- heap -------------------------------------------------------------
+
+    def _schedule(self, task_id, user_id, title, due_date, status, now):
+        """Add, move or drop one task's reminder; the caller holds ``_lock``."""
+        if (due_date is None or status == 'completed' or due_date < now
+                or self.loaded_until is None or due_date >= self.loaded_until):
+            self._entries.pop(task_id, None)
+            return
+        if self._fired.get(task_id) == due_date:
+            return
+        entry = (due_date - self.lead, user_id, title, due_date)
+        if self._entries.get(task_id) != entry:
+            self._entries[task_id] = entry
+            heapq.heappush(self._heap, (entry[0], task_id))
+
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, task_id = heapq.heappop(self._heap)
+                entry = self._entries.get(task_id)
+                if entry is not None and entry[0] == fire_at:
+                    due.append((task_id, entry))
+                    del self._entries[task_id]
+            if len(self._heap) > 2 * len(self._entries) + 1000:
+                self._heap = [(entry[0], task_id) for task_id, entry in self._entries.items()]
+                heapq.heapify(self._heap)
+        return due
+
+    def _next_fire(self):
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    # --- database ---------------------------------------------------------
+
+    def load_window(self, cur, start, end, now):
+        """Schedule the open tasks due in ``[start, end)``; returns the row count."""
+        count = 0
+        after = None
+        while True:
+            if after is None:
+                cur.execute("""
+                    SELECT id, user_id, title, due_date, status FROM tasks
+                    WHERE due_date >= %s AND due_date < %s
+                    ORDER BY due_date, id
+                    LIMIT %s""", (start, end, self.batch))
+            else:
+                cur.execute("""
+                    SELECT id, user_id, title, due_date, status FROM tasks
+                    WHERE due_date >= %s AND due_date < %s
+                      AND (due_date > %s OR (due_date = %s AND id > %s))
+                    ORDER BY due_date, id
+                    LIMIT %s""", (start, end, after[0], after[0], after[1], self.batch))
+            rows = cur.fetchall()
+            with self._lock:
+                for task_id, user_id, title, due_date, status in rows:
+                    self._schedule(task_id, user_id, title, due_date, status, now)
+            count += len(rows)
+            if len(rows) < self.batch:
+                break
+            after = (rows[-1][3], rows[-1][0])
+        self.rows_loaded += count
+        return count
+
+    def _read_tasks(self, cur, task_ids):
+        cur.execute(f"""
+            SELECT id, user_id, title, due_date, status FROM tasks
+            WHERE id IN ({', '.join(['%s'] * len(task_ids))})""", tuple(task_ids))
+        return {row[0]: row for row in cur.fetchall()}
+
+    def refresh(self, cur, now):
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        if not pending:
+            return
+        rows = self._read_tasks(cur, pending)
+        with self._lock:
+            for task_id in pending:
+                row = rows.get(task_id)
+                if row is None:
+                    self._entries.pop(task_id, None)
+                else:
+                    self._schedule(*row, now=now)
+
+    def fire(self, cur, now):
+        due = self._pop_due(now)
+        if not due:
+            return 0
+        from . import event_hub
+
+        current = self._read_tasks(cur, [task_id for task_id, _ in due])
+        fired = 0
+        for task_id, (_, user_id, title, due_date) in due:
+            row = current.get(task_id)
+            # Skip tasks deleted, completed or rescheduled by another worker
+            if row is None or row[4] == 'completed' or row[3] != due_date:
+                if row is not None:
+                    with self._lock:
+                        self._schedule(*row, now=now)
+                continue
+            event_hub.publish(user_id, [encode('reminder', {
+                'task_id': task_id, 'title': row[2], 'due_date': due_date})])
+            fired += 1
+        with self._lock:
+            self._fired.update((task_id, entry[3]) for task_id, entry in due)
+            if len(self._fired) > len(self._entries) + 1000:
+                # Past deadlines are never scheduled again
+                self._fired = {task_id: due_date for task_id, due_date in self._fired.items()
+                               if due_date >= now}
+        self.fired += fired
+        return fired
+
+    # --- worker -----------------------------------------------------------
+
+    def _ensure_worker(self):
+        if self._worker_pid == os.getpid():
+            return
+        self._worker_pid = os.getpid()
+        threading.Thread(target=self._run, name='reminders', daemon=True).start()
+
+    def _run(self):
+        next_resync = 0
+        while True:
+            failed = False
+            try:
+                with self.app.app_context():
+                    from . import mysql
+
+                    cur = mysql.connection.cursor()
+                    try:
+                        now = datetime.now()
+                        if self.loaded_until is None:
+                            self.loaded_until = now + self.window
+                            self.load_window(cur, now, self.loaded_until, now)
+                            next_resync = time.monotonic() + self.resync_seconds
+                        elif self.loaded_until - now < self.window / 2:
+                            start = max(self.loaded_until, now)
+                            self.loaded_until = start + self.window
+                            self.load_window(cur, start, self.loaded_until, now)
+                        elif time.monotonic() >= next_resync:
+                            self.load_window(cur, now, self.loaded_until, now)
+                            next_resync = time.monotonic() + self.resync_seconds
+                        self.refresh(cur, now)
+                        self.fire(cur, now)
+                    finally:
+                        cur.close()
+            except Exception as e:
+                failed = True
+                logger.error(f"[REMINDERS] Error: {e}")
+
+            if failed or self.loaded_until is None:
+                wait = RETRY_SECONDS
+            else:
+                # Sleep until the next reminder, resync or window advance
+                now = datetime.now()
+                wait = min(next_resync - time.monotonic(),
+                           (self.loaded_until - self.window / 2 - now).total_seconds())
+                next_fire = self._next_fire()
+                if next_fire is not None:
+                    wait = min(wait, (next_fire - now).total_seconds())
+            self._wake.wait(max(0.0, wait))
+            self._wake.clear()
+
+    def stats(self):
+        with self._lock:
+            scheduled = len(self._entries)
+            heap = len(self._heap)
+        return {
+            'scheduled': scheduled,
+            'heap_size': heap,
+            'fired': self.fired,
+            'rows_loaded': self.rows_loaded,
+        }
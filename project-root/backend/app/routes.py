@@ -1,10 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from datetime import datetime, timedelta
+import csv
+import io
+import json
 import jwt
 import logging
 # Fix import
-from . import mysql  # Use relative import
+from . import mysql, search_index, token_cache, response_cache, password_hasher, metrics, versions, stats, event_hub, change_log, sync, analytics, rate_limiter  # Use relative import
+from .changes import ChangeSet
+from .events import HEARTBEAT
+from .hashing import HasherBusy
+from .importer import TASK_STATUSES, TASK_PRIORITIES, InvalidTask, parse_task, read_records, import_tasks
+from .serializers import TASK_FIELDS, serialize_tasks, serialize_projects, task_row, wants_columnar
+from .pagination import InvalidCursor, page_args, keyset_clause, next_cursor
 from functools import wraps
 from flask_cors import CORS
 
@@ -18,19 +26,30 @@ CORS(api, resources={
         "supports_credentials": True
     }
 })
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+def token_in_query(f):
+    """Let ``token_required`` also accept ``?access_token=``, for clients
+    such as ``EventSource`` that cannot set headers."""
+    f.token_in_query = True
+    return f
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get('Authorization')
+        if not token and getattr(f, 'token_in_query', False) and request.args.get('access_token'):
+            token = f"Bearer {request.args['access_token']}"
         
         if not token:
             return jsonify({'error': 'Token is missing'}), 401
         
         try:
             token = token.split(' ')[1]  # Remove 'Bearer ' prefix
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+            data = token_cache.get(token)
+            if data is None:
+                data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+                token_cache.put(token, data)
             
             # Add user data to request
             request.user = {
@@ -38,10 +57,22 @@ def token_required(f):
                 'email': data['email'],
                 'role': data['role']
             }
-            return f(*args, **kwargs)
         except Exception as e:
-            logging.error(f"[AUTH] Token validation error: {e}")
+            logger.error(f"[AUTH] Token validation error: {e}")
             return jsonify({'error': 'Token is invalid'}), 401
+        analytics.record(data['user_id'], f"{request.method} {request.url_rule.rule}")
+        rate_limiter.check_user(request.endpoint, data['user_id'])
+        return f(*args, **kwargs)
+    return decorated
+
+def admin_required(f):
+    """Reject users without the ``admin`` role; apply below ``token_required``."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.user['role'] != 'admin':
+            logger.warning(f"[AUTH] User {request.user['id']} denied {request.path}")
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
     return decorated
 
 @api.route('/projects/<int:project_id>', methods=['DELETE'])
@@ -49,11 +80,15 @@ def token_required(f):
 def delete_project(project_id):
     cur = mysql.connection.cursor()
     try:
+        changes = ChangeSet(request.user['id'])
         cur.execute("DELETE FROM projects WHERE id = %s AND user_id = %s", 
                    (project_id, request.user['id']))
-        mysql.connection.commit()
+        deleted = cur.rowcount
+        if deleted > 0:
+            changes.project(project_id, 'delete')
+        changes.commit(cur)
         
-        if cur.rowcount > 0:
+        if deleted > 0:
             return jsonify({
                 'status': 'success',
                 'message': 'Project deleted successfully',
@@ -63,7 +98,7 @@ def delete_project(project_id):
         
     except Exception as e:
         mysql.connection.rollback()
-        logging.error(f"[PROJECT-DELETE] Error: {str(e)}")
+        logger.error(f"[PROJECT-DELETE] Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
     finally:
         cur.close()
@@ -77,20 +112,73 @@ def test_db():
         return jsonify({
             'status': 'success',
             'message': 'Database connection successful',
-            'result': result
+            'result': result,
+            'pool': mysql.pool.stats()
         })
     except Exception as e:
-        logging.error(f"Database connection error: {str(e)}")
+        logger.error(f"Database connection error: {str(e)}")
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+@api.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if not metrics.token:
+        return jsonify({'error': 'Not found'}), 404
+    if not metrics.authorized(request.headers.get('Authorization')):
+        return jsonify({'error': 'Token is invalid'}), 401, {'WWW-Authenticate': 'Bearer'}
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/events', methods=['GET'])
+@token_required
+@token_in_query
+def events():
+    subscription = event_hub.subscribe(request.user['id'])
+    heartbeat = event_hub.heartbeat
+
+    def stream():
+        yield 'retry: 5000\n\n'
+        while True:
+            frames = subscription.wait(heartbeat)
+            yield ''.join(frames) if frames else HEARTBEAT
+
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs even if the client goes away before the first chunk
+    response.call_on_close(subscription.close)
+    return response
+
+@api.route('/sync', methods=['GET'])
+@token_required
+def sync_changes():
+    user_id = request.user['id']
+    token = request.args.get('since')
+    try:
+        since = sync.decode_token(token) if token else None
+    except sync.InvalidToken as e:
+        return jsonify({'error': str(e)}), 400
+
+    cur = mysql.connection.cursor()
+    try:
+        seq, horizon = sync.read_state(cur, user_id)
+        if since is None or since < horizon or since > seq:
+            # Too old (or foreign) to answer incrementally: refetch the lists,
+            # then sync from this token
+            return jsonify({
+                'status': 'success',
+                'data': {'reset': True, 'sync_token': sync.encode_token(seq), 'has_more': False}
+            })
+        body, last, has_more = sync.delta(cur, user_id, since, seq, change_log.max_changes)
+        body.update(reset=False, sync_token=sync.encode_token(last), has_more=has_more)
+        return jsonify({'status': 'success', 'data': body})
+    finally:
+        cur.close()
+
 @api.route('/signup', methods=['POST'])
 def signup():
     try:
         data = request.get_json()
-        logging.debug(f"Signup data: {data}")
 
         if not data or not all(k in data for k in ['username', 'email', 'password']):
             return jsonify({'error': 'Missing required fields'}), 400
@@ -101,32 +189,39 @@ def signup():
             if cur.fetchone():
                 return jsonify({'error': 'Email already exists'}), 400
 
-            hashed_password = generate_password_hash(data['password'])
+            hashed_password = password_hasher.hash(data['password'])
             cur.execute(
                 "INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
                 (data['username'], data['email'], hashed_password, 'student')
             )
+            stats.bump_global(cur, 'total_users', 1)
             mysql.connection.commit()
             return jsonify({'message': 'User created successfully'}), 201
         finally:
             cur.close()
+    except HasherBusy:
+        raise
     except Exception as e:
-        logging.error(f"Signup error: {str(e)}")
+        logger.error(f"Signup error: {str(e)}")
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
 @api.route('/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
-        logging.debug(f"[LOGIN] Request data: {data}")
 
         cur = mysql.connection.cursor()
         try:
             cur.execute("SELECT * FROM users WHERE email = %s", (data['email'],))
             user = cur.fetchone()
-            logging.debug(f"[LOGIN] Found user: {user}")
 
-            if user and check_password_hash(user[3], data['password']):
+            if user and password_hasher.verify(user[3], data['password']):
+                if password_hasher.needs_rehash(user[3]):
+                    # Hash cost changed since this password was stored
+                    cur.execute("UPDATE users SET password = %s WHERE id = %s",
+                                (password_hasher.hash(data['password']), user[0]))
+                    mysql.connection.commit()
+                    logger.info(f"[LOGIN] Rehashed password for user {user[0]}")
                 token = jwt.encode({
                     'user_id': user[0],
                     'username': user[1],
@@ -135,7 +230,7 @@ def login():
                     'exp': datetime.utcnow() + timedelta(hours=24)
                 }, current_app.config['JWT_SECRET_KEY'])
                 
-                logging.debug("[LOGIN] Authentication successful - token generated")
+                logger.debug("[LOGIN] Authentication successful - token generated")
                 return jsonify({
                     'token': token,
                     'user': {
@@ -146,19 +241,21 @@ def login():
                     }
                 })
             else:
-                logging.debug("[LOGIN] User not found or password verification failed")
+                logger.debug("[LOGIN] User not found or password verification failed")
 
             return jsonify({'error': 'Invalid credentials'}), 401
         finally:
             cur.close()
+    except HasherBusy:
+        raise
     except Exception as e:
-        logging.error(f"[LOGIN] Error: {str(e)}")
+        logger.error(f"[LOGIN] Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @api.route('/protected', methods=['GET'])
 @token_required
 def protected():
-    logging.debug("[PROTECTED] Route accessed")
+    logger.debug("[PROTECTED] Route accessed")
     return jsonify({
         'message': 'Access granted to protected route',
         'status': 'success',
@@ -171,25 +268,26 @@ def protected():
 @api.route('/dashboard', methods=['GET'])
 @token_required
 def dashboard():
-    logging.debug("[DASHBOARD] Route accessed")
+    logger.debug("[DASHBOARD] Route accessed")
+    cur = mysql.connection.cursor()
+    try:
+        user_stats = stats.user_stats(cur, request.user['id'])
+    finally:
+        cur.close()
     return jsonify({
         'message': 'Dashboard data retrieved',
         'status': 'success',
         'data': {
             'timestamp': datetime.utcnow().isoformat(),
             'endpoint': 'dashboard',
-            'stats': {
-                'total_tasks': 0,
-                'completed_tasks': 0,
-                'pending_tasks': 0
-            }
+            'stats': user_stats
         }
     })
 
 @api.route('/profile', methods=['GET'])
 @token_required
 def profile():
-    logging.debug("[PROFILE] Route accessed")
+    logger.debug("[PROFILE] Route accessed")
     return jsonify({
         'message': 'Profile data retrieved',
         'status': 'success',
@@ -205,25 +303,30 @@ def profile():
 
 @api.route('/admin', methods=['GET'])
 @token_required
+@admin_required
 def admin():
-    logging.debug("[ADMIN] Route accessed")
+    logger.debug("[ADMIN] Route accessed")
+    cur = mysql.connection.cursor()
+    try:
+        global_stats = stats.global_stats(cur)
+        activity = analytics.summary(cur)
+    finally:
+        cur.close()
     return jsonify({
         'message': 'Admin dashboard accessed',
         'status': 'success',
         'data': {
             'timestamp': datetime.utcnow().isoformat(),
             'endpoint': 'admin',
-            'stats': {
-                'total_users': 0,
-                'active_users': 0
-            }
+            'stats': global_stats,
+            'activity': activity
         }
     })
 
 @api.route('/student', methods=['GET'])
 @token_required
 def student_dashboard():
-    logging.debug("[STUDENT] Route accessed")
+    logger.debug("[STUDENT] Route accessed")
     return jsonify({
         'message': 'Student dashboard accessed',
         'status': 'success',
@@ -236,40 +339,160 @@ def student_dashboard():
 
 @api.route('/tasks', methods=['GET', 'POST'])
 @token_required
+@mysql.read_only
+@response_cache.cached('tasks')
+@versions.conditional(versions.TASKS)
 def handle_tasks():
     if request.method == 'GET':
+        try:
+            limit, after = page_args(request.args)
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+
+        keyset_sql, keyset_params = keyset_clause(after)
         cur = mysql.connection.cursor()
         try:
             cur.execute("""
                 SELECT id, title, description, status, priority, 
                        due_date, created_at, updated_at 
                 FROM tasks 
-                WHERE user_id = %s 
-                ORDER BY created_at DESC""", (request.user['id'],))
-            tasks = cur.fetchall()
-            formatted_tasks = [{
-                'id': task[0],
-                'title': task[1],
-                'description': task[2],
-                'status': task[3],
-                'priority': task[4],
-                'due_date': task[5].isoformat() if task[5] else None,
-                'created_at': task[6].isoformat(),
-                'updated_at': task[7].isoformat()
-            } for task in tasks]
+                WHERE user_id = %s""" + keyset_sql + """
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s""", (request.user['id'], *keyset_params, limit + 1))
+            tasks, cursor = next_cursor(cur.fetchall(), limit, 6)
             
             return jsonify({
                 'status': 'success',
                 'data': {
-                    'tasks': formatted_tasks,
-                    'count': len(formatted_tasks)
+                    'tasks': serialize_tasks(tasks, wants_columnar(request.args)),
+                    'count': len(tasks),
+                    'next_cursor': cursor
                 }
             })
         finally:
             cur.close()
 
+    elif request.method == 'POST':
+        try:
+            task = parse_task(request.get_json(silent=True))
+        except InvalidTask as e:
+            return jsonify({'error': str(e)}), 400
+
+        cur = mysql.connection.cursor()
+        try:
+            # Orders this insert against a running import (see insert_tasks)
+            cur.execute("SELECT id FROM users WHERE id = %s FOR UPDATE", (request.user['id'],))
+            cur.fetchall()
+            cur.execute("""
+                INSERT INTO tasks (user_id, title, description, status, priority, due_date)
+                VALUES (%s, %s, %s, %s, %s, %s)""",
+                (request.user['id'], task['title'], task['description'],
+                 task['status'], task['priority'], task['due_date']))
+            task_id = cur.lastrowid
+            changes = ChangeSet(request.user['id'])
+            changes.task(task_id, after=task)
+            changes.commit(cur)
+            return jsonify({'message': 'Task created successfully', 'task_id': task_id}), 201
+        except Exception as e:
+            mysql.connection.rollback()
+            logger.error(f"[TASK-CREATE] Error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+        finally:
+            cur.close()
+
+IMPORT_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+@api.route('/tasks/import', methods=['POST'])
+@token_required
+def import_tasks_route():
+    import_format = request.args.get('format') or IMPORT_FORMATS.get(request.mimetype)
+    if import_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Unsupported import format'}), 415
+
+    cur = mysql.connection.cursor()
+    try:
+        summary = import_tasks(
+            cur, request.user['id'], read_records(request.stream, import_format),
+            chunk_size=current_app.config['IMPORT_CHUNK_ROWS'],
+            max_errors=current_app.config['IMPORT_MAX_ERRORS'])
+        logger.info(f"[TASK-IMPORT] User {request.user['id']} imported "
+                     f"{summary['imported']} tasks, {summary['failed']} failed")
+        return jsonify({'status': 'success', 'data': summary})
+    except Exception as e:
+        # Chunks committed before the failure stay imported
+        mysql.connection.rollback()
+        logger.error(f"[TASK-IMPORT] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cur.close()
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+def _export_ndjson(rows):
+    return ''.join(json.dumps(task_row(row), separators=(',', ':')) + '\n' for row in rows)
+
+def _export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for row in rows)
+    return buffer.getvalue()
+
+@api.route('/tasks/export', methods=['GET'])
+@token_required
+@mysql.read_only
+def export_tasks():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Invalid export format'}), 400
+
+    chunk_rows = current_app.config['EXPORT_CHUNK_ROWS']
+    encode = _export_csv if export_format == 'csv' else _export_ndjson
+    user_id = request.user['id']
+
+    def generate():
+        cur = mysql.server_side_cursor()
+        finished = False
+        try:
+            cur.execute("""
+                SELECT id, title, description, status, priority,
+                       due_date, created_at, updated_at
+                FROM tasks
+                WHERE user_id = %s
+                ORDER BY created_at DESC, id DESC""", (user_id,))
+            if export_format == 'csv':
+                yield ','.join(TASK_FIELDS) + '\r\n'
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield encode(rows)
+            finished = True
+        finally:
+            if finished:
+                cur.close()
+            else:
+                # Client went away (or the query failed) mid-stream
+                logger.info(f"[TASK-EXPORT] Export for user {user_id} stopped early")
+                mysql.discard_connection()
+
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=tasks.{export_format}'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @api.route('/tasks/<int:task_id>', methods=['GET', 'PUT', 'DELETE'])
 @token_required
+@mysql.read_only
+@response_cache.cached('task', 'task_id')
 def handle_task(task_id):
     if request.method == 'GET':
         cur = mysql.connection.cursor()
@@ -286,19 +509,10 @@ def handle_task(task_id):
                 
             return jsonify({
                 'status': 'success',
-                'data': {
-                    'id': task[0],
-                    'title': task[1],
-                    'description': task[2],
-                    'status': task[3],
-                    'priority': task[4],
-                    'due_date': task[5].isoformat() if task[5] else None,
-                    'created_at': task[6].isoformat(),
-                    'updated_at': task[7].isoformat()
-                }
+                'data': task_row(task)
             })
         except Exception as e:
-            logging.error(f"[TASK-GET] Error: {str(e)}")
+            logger.error(f"[TASK-GET] Error: {str(e)}")
             return jsonify({'error': str(e)}), 500
         finally:
             cur.close()
@@ -307,18 +521,29 @@ def handle_task(task_id):
         data = request.get_json()
         cur = mysql.connection.cursor()
         try:
+            cur.execute("""
+                SELECT status FROM tasks
+                WHERE id = %s AND user_id = %s
+                FOR UPDATE""", (task_id, request.user['id']))
+            task = cur.fetchone()
+            if not task:
+                return jsonify({'error': 'Task not found'}), 404
+
             cur.execute("""
                 UPDATE tasks 
                 SET title = %s, description = %s, status = %s, 
                     priority = %s, due_date = %s 
-                WHERE id = %s""",
+                WHERE id = %s AND user_id = %s""",
                 (data['title'], data['description'], data['status'],
-                 data.get('priority', 'medium'), data['due_date'], task_id))
-            mysql.connection.commit()
+                 data.get('priority', 'medium'), data['due_date'], task_id,
+                 request.user['id']))
+            changes = ChangeSet(request.user['id'])
+            changes.task(task_id, before={'status': task[0]}, after=data)
+            changes.commit(cur)
             return jsonify({'message': 'Task updated successfully'})
         except Exception as e:
             mysql.connection.rollback()
-            logging.error(f"[TASK-UPDATE] Error: {str(e)}")
+            logger.error(f"[TASK-UPDATE] Error: {str(e)}")
             return jsonify({'error': str(e)}), 500
         finally:
             cur.close()
@@ -326,18 +551,31 @@ def handle_task(task_id):
     elif request.method == 'DELETE':
         cur = mysql.connection.cursor()
         try:
-            cur.execute("DELETE FROM tasks WHERE id = %s", (task_id,))
-            mysql.connection.commit()
+            cur.execute("""
+                SELECT status FROM tasks
+                WHERE id = %s AND user_id = %s
+                FOR UPDATE""", (task_id, request.user['id']))
+            task = cur.fetchone()
+            if not task:
+                return jsonify({'error': 'Task not found'}), 404
+
+            cur.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s",
+                        (task_id, request.user['id']))
+            changes = ChangeSet(request.user['id'])
+            changes.task(task_id, before={'status': task[0]})
+            changes.commit(cur)
             return jsonify({'message': 'Task deleted successfully'})
         except Exception as e:
             mysql.connection.rollback()
-            logging.error(f"[TASK-DELETE] Error: {str(e)}")
+            logger.error(f"[TASK-DELETE] Error: {str(e)}")
             return jsonify({'error': str(e)}), 500
         finally:
             cur.close()
 
 @api.route('/tasks/<int:task_id>', methods=['GET'])
 @token_required
+@mysql.read_only
+@response_cache.cached('task', 'task_id')
 def get_task(task_id):
     cur = mysql.connection.cursor()
     try:
@@ -348,32 +586,23 @@ def get_task(task_id):
             WHERE id = %s""", (task_id,))
         task = cur.fetchone()
         
-        logging.debug(f"[TASK-GET] Task found: {task}")
         
         if not task:
             return jsonify({'error': 'Task not found'}), 404
             
         return jsonify({
             'status': 'success',
-            'data': {
-                'id': task[0],
-                'title': task[1],
-                'description': task[2],
-                'status': task[3],
-                'priority': task[4],
-                'due_date': task[5].isoformat() if task[5] else None,
-                'created_at': task[6].isoformat() if task[6] else None,
-                'updated_at': task[7].isoformat() if task[7] else None
-            }
+            'data': task_row(task)
         })
     except Exception as e:
-        logging.error(f"[TASK-GET] Error: {str(e)}")
+        logger.error(f"[TASK-GET] Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
     finally:
         cur.close()
 
 @api.route('/tasks/filter', methods=['GET'])
 @token_required
+@mysql.read_only
 def filter_tasks():
     status = request.args.get('status')
     priority = request.args.get('priority')
@@ -385,9 +614,9 @@ def filter_tasks():
             SELECT id, title, description, status, priority,
                    due_date, created_at, updated_at
             FROM tasks
-            WHERE 1=1
+            WHERE user_id = %s
         """
-        params = []
+        params = [request.user['id']]
         
         if status:
             query += " AND status = %s"
@@ -396,33 +625,25 @@ def filter_tasks():
             query += " AND priority = %s"
             params.append(priority)
         if search:
-            query += " AND (title LIKE %s OR description LIKE %s)"
-            params.extend([f"%{search}%", f"%{search}%"])
+            matches = search_index.search(cur, request.user['id'], search)
+            if matches is not None:
+                if not matches:
+                    return jsonify({'status': 'success', 'data': [], 'count': 0})
+                query += f" AND id IN ({', '.join(['%s'] * len(matches))})"
+                params.extend(task_id for task_id, _ in matches)
             
         query += " ORDER BY created_at DESC"
         
-        logging.debug(f"[TASK-FILTER] Query: {query}, Params: {params}")
         cur.execute(query, tuple(params))
         tasks = cur.fetchall()
         
-        formatted_tasks = [{
-            'id': task[0],
-            'title': task[1],
-            'description': task[2],
-            'status': task[3],
-            'priority': task[4],
-            'due_date': task[5].isoformat() if task[5] else None,
-            'created_at': task[6].isoformat() if task[6] else None,
-            'updated_at': task[7].isoformat() if task[7] else None
-        } for task in tasks]
-        
         return jsonify({
             'status': 'success',
-            'data': formatted_tasks,
-            'count': len(formatted_tasks)
+            'data': serialize_tasks(tasks, wants_columnar(request.args)),
+            'count': len(tasks)
         })
     except Exception as e:
-        logging.error(f"[TASK-FILTER] Error: {str(e)}")
+        logger.error(f"[TASK-FILTER] Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
     finally:
         cur.close()
@@ -430,19 +651,19 @@ def filter_tasks():
 @api.route('/tasks/<int:task_id>/status', methods=['PUT'])
 @token_required
 def update_task_status(task_id):
-    logging.debug(f"[STATUS-UPDATE] Updating task {task_id}")
+    logger.debug("[STATUS-UPDATE] Updating task %s", task_id)
     data = request.get_json()
     new_status = data.get('status')
     
-    if not new_status or new_status not in ['pending', 'in_progress', 'completed']:
+    if not new_status or new_status not in TASK_STATUSES:
         return jsonify({'error': 'Invalid status'}), 400
         
     cur = mysql.connection.cursor()
     try:
         # Debug task existence
-        cur.execute("SELECT id, status FROM tasks WHERE id = %s", (task_id,))
+        cur.execute("SELECT id, status FROM tasks WHERE id = %s AND user_id = %s",
+                    (task_id, request.user['id']))
         task = cur.fetchone()
-        logging.debug(f"[STATUS-UPDATE] Found task: {task}")
         
         if not task:
             return jsonify({'error': 'Task not found'}), 404
@@ -452,14 +673,16 @@ def update_task_status(task_id):
             UPDATE tasks 
             SET status = %s,
                 updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s""", 
-            (new_status, task_id))
+            WHERE id = %s AND user_id = %s""", 
+            (new_status, task_id, request.user['id']))
         
         rows_affected = cur.rowcount
-        logging.debug(f"[STATUS-UPDATE] Rows affected: {rows_affected}")
+        logger.debug("[STATUS-UPDATE] Rows affected: %s", rows_affected)
         
         if rows_affected > 0:
-            mysql.connection.commit()
+            changes = ChangeSet(request.user['id'])
+            changes.task(task_id, before={'status': task[1]}, after={'status': new_status})
+            changes.commit(cur)
             return jsonify({
                 'message': 'Status updated successfully',
                 'task_id': task_id,
@@ -472,7 +695,7 @@ def update_task_status(task_id):
             
     except Exception as e:
         mysql.connection.rollback()
-        logging.error(f"[STATUS-UPDATE] Error: {str(e)}")
+        logger.error(f"[STATUS-UPDATE] Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
     finally:
         cur.close()
@@ -480,18 +703,18 @@ def update_task_status(task_id):
 @api.route('/tasks/<int:task_id>/priority', methods=['PUT'])
 @token_required
 def update_task_priority(task_id):
-    logging.debug(f"[PRIORITY-UPDATE] Updating task {task_id}")
+    logger.debug("[PRIORITY-UPDATE] Updating task %s", task_id)
     data = request.get_json()
     new_priority = data.get('priority')
     
-    if not new_priority or new_priority not in ['low', 'medium', 'high']:
+    if not new_priority or new_priority not in TASK_PRIORITIES:
         return jsonify({'error': 'Invalid priority'}), 400
         
     cur = mysql.connection.cursor()
     try:
-        cur.execute("SELECT id, priority FROM tasks WHERE id = %s", (task_id,))
+        cur.execute("SELECT id, priority FROM tasks WHERE id = %s AND user_id = %s",
+                    (task_id, request.user['id']))
         task = cur.fetchone()
-        logging.debug(f"[PRIORITY-UPDATE] Found task: {task}")
         
         if not task:
             return jsonify({'error': 'Task not found'}), 404
@@ -500,10 +723,12 @@ def update_task_priority(task_id):
             UPDATE tasks 
             SET priority = %s,
                 updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s""", 
-            (new_priority, task_id))
+            WHERE id = %s AND user_id = %s""", 
+            (new_priority, task_id, request.user['id']))
         
-        mysql.connection.commit()
+        changes = ChangeSet(request.user['id'])
+        changes.task(task_id, before={'priority': task[1]}, after={'priority': new_priority})
+        changes.commit(cur)
         return jsonify({
             'message': 'Priority updated successfully',
             'task_id': task_id,
@@ -511,18 +736,163 @@ def update_task_priority(task_id):
         })
     except Exception as e:
         mysql.connection.rollback()
-        logging.error(f"[PRIORITY-UPDATE] Error: {str(e)}")
+        logger.error(f"[PRIORITY-UPDATE] Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
     finally:
         cur.close()
 
+BULK_OPERATIONS = ('status', 'priority', 'update', 'delete')
+BULK_UPDATE_FIELDS = ('title', 'description', 'status', 'due_date')
+
+def _validate_bulk_operation(op):
+    """Return ``(op, error)``; ``update`` ops come back with their fields
+    normalized by ``parse_task``."""
+    kind = op.get('op')
+    if kind not in BULK_OPERATIONS:
+        return op, 'Invalid operation'
+    if kind == 'status' and op.get('status') not in TASK_STATUSES:
+        return op, 'Invalid status'
+    if kind == 'priority' and op.get('priority') not in TASK_PRIORITIES:
+        return op, 'Invalid priority'
+    if kind == 'update':
+        if not all(k in op for k in BULK_UPDATE_FIELDS):
+            return op, 'Missing required fields'
+        if op['status'] not in TASK_STATUSES or op.get('priority', 'medium') not in TASK_PRIORITIES:
+            return op, 'Invalid status or priority'
+        try:
+            return {**op, **parse_task(op)}, None
+        except InvalidTask as e:
+            return op, str(e)
+    return op, None
+
+@api.route('/tasks/bulk', methods=['POST'])
+@token_required
+def bulk_tasks():
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Missing operations'}), 400
+    # The limit is on task ids, however the operations group them
+    expanded = []
+    for op in operations:
+        op = op if isinstance(op, dict) else {}
+        ids = op.get('ids', [op.get('id')])
+        expanded.append((op, ids if isinstance(ids, list) else [ids]))
+    if sum(len(ids) for _, ids in expanded) > current_app.config['BULK_MAX_OPERATIONS']:
+        return jsonify({'error': 'Too many operations'}), 400
+
+    user_id = request.user['id']
+    results = []
+    items = []  # (result, op) for every valid (operation, task id) pair
+    for index, (op, ids) in enumerate(expanded):
+        op, error = _validate_bulk_operation(op)
+        # bool is an int subclass, but true/false are not task ids
+        if not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            error = error or 'Invalid task id'
+        for task_id in ids or [op.get('id')]:
+            result = {'index': index, 'id': task_id, 'op': op.get('op')}
+            if error:
+                result.update(status='error', error=error)
+            else:
+                items.append((result, op))
+            results.append(result)
+
+    if not items:
+        return jsonify({'error': 'No valid operations', 'results': results}), 400
+
+    task_ids = sorted({result['id'] for result, _ in items})
+    placeholders = ', '.join(['%s'] * len(task_ids))
+    cur = mysql.connection.cursor()
+    try:
+        cur.execute(f"""
+            SELECT id, status FROM tasks
+            WHERE user_id = %s AND id IN ({placeholders})
+            FOR UPDATE""", (user_id, *task_ids))
+        existing = dict(cur.fetchall())
+
+        # Later operations on the same task win, and anything is moot once
+        # the task is deleted, so collapse to one value per task and field.
+        statuses, priorities, updates, deletes = {}, {}, {}, set()
+        for result, op in items:
+            task_id = result['id']
+            if task_id not in existing:
+                result.update(status='error', error='Task not found')
+                continue
+            result['status'] = 'ok'
+            if op['op'] == 'status':
+                statuses[task_id] = op['status']
+            elif op['op'] == 'priority':
+                priorities[task_id] = op['priority']
+            elif op['op'] == 'update':
+                updates[task_id] = op
+                statuses.pop(task_id, None)
+                priorities.pop(task_id, None)
+            else:
+                deletes.add(task_id)
+
+        if updates:
+            cur.executemany("""
+                UPDATE tasks
+                SET title = %s, description = %s, status = %s,
+                    priority = %s, due_date = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND user_id = %s""",
+                [(op['title'], op['description'], op['status'], op.get('priority', 'medium'),
+                  op['due_date'], task_id, user_id)
+                 for task_id, op in updates.items() if task_id not in deletes])
+        for column, values in (('status', statuses), ('priority', priorities)):
+            groups = {}
+            for task_id, value in values.items():
+                if task_id not in deletes:
+                    groups.setdefault(value, []).append(task_id)
+            for value, ids in groups.items():
+                cur.execute(f"""
+                    UPDATE tasks
+                    SET {column} = %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(ids))})""",
+                    (value, user_id, *ids))
+        if deletes:
+            cur.execute(f"""
+                DELETE FROM tasks
+                WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(deletes))})""",
+                (user_id, *deletes))
+
+        changes = ChangeSet(user_id)
+        for task_id in deletes:
+            changes.task(task_id, before={'status': existing[task_id]})
+        for task_id in (updates.keys() | statuses.keys() | priorities.keys()) - deletes:
+            after = {}
+            if task_id in updates:
+                after = {k: updates[task_id][k] for k in BULK_UPDATE_FIELDS}
+                after['priority'] = updates[task_id].get('priority', 'medium')
+            if task_id in statuses:
+                after['status'] = statuses[task_id]
+            if task_id in priorities:
+                after['priority'] = priorities[task_id]
+            changes.task(task_id, before={'status': existing[task_id]}, after=after)
+        changes.commit(cur)
+        return jsonify({'status': 'success', 'results': results})
+    except Exception as e:
+        mysql.connection.rollback()
+        logger.error(f"[TASK-BULK] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cur.close()
+
+SEARCH_SORT_COLUMNS = ('created_at', 'updated_at', 'due_date', 'priority', 'status', 'title')
+
 @api.route('/tasks/search', methods=['GET'])
 @token_required
+@mysql.read_only
 def search_tasks():
     query = request.args.get('q', '')
     due_date = request.args.get('due_date')
-    sort_by = request.args.get('sort', 'created_at')
-    order = request.args.get('order', 'desc')
+    sort_by = request.args.get('sort')
+    order = request.args.get('order', 'desc').lower()
+
+    if sort_by and sort_by not in SEARCH_SORT_COLUMNS:
+        return jsonify({'error': 'Invalid sort column'}), 400
+    if order not in ('asc', 'desc'):
+        return jsonify({'error': 'Invalid sort order'}), 400
     
     cur = mysql.connection.cursor()
     try:
@@ -530,66 +900,74 @@ def search_tasks():
             SELECT id, title, description, status, priority, 
                    due_date, created_at, updated_at 
             FROM tasks 
-            WHERE (title LIKE %s OR description LIKE %s)
+            WHERE user_id = %s
         """
-        params = [f"%{query}%", f"%{query}%"]
+        params = [request.user['id']]
+
+        matches = search_index.search(cur, request.user['id'], query)
+        if matches is not None:
+            if not matches:
+                return jsonify({'status': 'success', 'data': {'tasks': [], 'count': 0}})
+            sql += f" AND id IN ({', '.join(['%s'] * len(matches))})"
+            params.extend(task_id for task_id, _ in matches)
         
         if due_date:
-            sql += " AND DATE(due_date) = DATE(%s)"
-            params.append(due_date)
-            
-        sql += f" ORDER BY {sort_by} {order}"
+            sql += " AND due_date >= DATE(%s) AND due_date < DATE(%s) + INTERVAL 1 DAY"
+            params.extend([due_date, due_date])
+
+        if sort_by or matches is None:
+            sql += f" ORDER BY {sort_by or 'created_at'} {order}"
+        if matches is None:
+            sql += " LIMIT %s"
+            params.append(search_index.max_results)
         
         cur.execute(sql, tuple(params))
         tasks = cur.fetchall()
+        if matches is not None and not sort_by:
+            # Keep the index's relevance order
+            rank = {task_id: i for i, (task_id, _) in enumerate(matches)}
+            tasks = sorted(tasks, key=lambda task: rank[task[0]])
         
         return jsonify({
             'status': 'success',
             'data': {
-                'tasks': [{
-                    'id': task[0],
-                    'title': task[1],
-                    'description': task[2],
-                    'status': task[3],
-                    'priority': task[4],
-                    'due_date': task[5].isoformat() if task[5] else None,
-                    'created_at': task[6].isoformat(),
-                    'updated_at': task[7].isoformat()
-                } for task in tasks],
+                'tasks': serialize_tasks(tasks, wants_columnar(request.args)),
                 'count': len(tasks)
             }
         })
     except Exception as e:
-        logging.error(f"[TASK-SEARCH] Error: {str(e)}")
+        logger.error(f"[TASK-SEARCH] Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
     finally:
         cur.close()
 
 @api.route('/projects', methods=['GET', 'POST'])
 @token_required
+@mysql.read_only
+@response_cache.cached('projects')
+@versions.conditional(versions.PROJECTS)
 def handle_projects():
     if request.method == 'GET':
+        try:
+            limit, after = page_args(request.args)
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+
+        keyset_sql, keyset_params = keyset_clause(after)
         cur = mysql.connection.cursor()
         try:
             cur.execute("""
                 SELECT id, title, description, is_completed, created_at, updated_at 
                 FROM projects 
-                WHERE user_id = %s 
-                ORDER BY created_at DESC""", (request.user['id'],))
-            projects = cur.fetchall()
-            
-            formatted_projects = [{
-                'id': project[0],
-                'title': project[1],
-                'description': project[2],
-                'is_completed': bool(project[3]),
-                'created_at': project[4].isoformat(),
-                'updated_at': project[5].isoformat()
-            } for project in projects]
+                WHERE user_id = %s""" + keyset_sql + """
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s""", (request.user['id'], *keyset_params, limit + 1))
+            projects, cursor = next_cursor(cur.fetchall(), limit, 4)
             
             return jsonify({
                 'status': 'success',
-                'data': formatted_projects
+                'data': serialize_projects(projects, wants_columnar(request.args)),
+                'next_cursor': cursor
             })
             
         finally:
@@ -603,7 +981,9 @@ def handle_projects():
                 INSERT INTO projects (title, description, user_id) 
                 VALUES (%s, %s, %s)""",
                 (data['title'], data['description'], request.user['id']))
-            mysql.connection.commit()
+            changes = ChangeSet(request.user['id'])
+            changes.project(cur.lastrowid, 'create')
+            changes.commit(cur)
             return jsonify({'message': 'Project created successfully'}), 201
         finally:
             cur.close()
@@ -620,11 +1000,15 @@ def handle_project(project_id):
     if request.method == 'DELETE':
         cur = mysql.connection.cursor()
         try:
+            changes = ChangeSet(request.user['id'])
             cur.execute("DELETE FROM projects WHERE id = %s AND user_id = %s", 
                        (project_id, request.user['id']))
-            mysql.connection.commit()
+            deleted = cur.rowcount
+            if deleted > 0:
+                changes.project(project_id, 'delete')
+            changes.commit(cur)
             
-            if cur.rowcount > 0:
+            if deleted > 0:
                 return jsonify({
                     'status': 'success',
                     'message': 'Project deleted successfully',
@@ -634,7 +1018,7 @@ def handle_project(project_id):
             
         except Exception as e:
             mysql.connection.rollback()
-            logging.error(f"[PROJECT-DELETE] Error: {str(e)}")
+            logger.error(f"[PROJECT-DELETE] Error: {str(e)}")
             return jsonify({'error': str(e)}), 500
         finally:
             cur.close()
@@ -648,7 +1032,10 @@ def handle_project(project_id):
                 SET is_completed = %s, updated_at = CURRENT_TIMESTAMP
                 WHERE id = %s AND user_id = %s""", 
                 (data['is_completed'], project_id, request.user['id']))
-            mysql.connection.commit()
+            changes = ChangeSet(request.user['id'])
+            if cur.rowcount > 0:
+                changes.project(project_id, 'update')
+            changes.commit(cur)
             return jsonify({'message': 'Project updated successfully'})
         finally:
             cur.close()
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""Inverted index over task titles and descriptions.
+
+Every task write replaces the task's postings in ``task_terms`` so that
+search is a handful of indexed prefix range scans on ``(user_id, term)``
+instead of ``LIKE '%q%'`` over the whole ``tasks`` table.
+"""
+import bisect
+import logging
+import re
+from collections import defaultdict
+
+import click
+from flask.cli import AppGroup
+
+from . import changes
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+MAX_TERM_LENGTH = 64
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def tokenize(text):
+    if not text:
+        return []
+    return [t[:MAX_TERM_LENGTH] for t in _TOKEN_RE.findall(text.lower())]
+
+
+def task_terms(title, description):
+    """Map each term of a task to its accumulated weight."""
+    weights = defaultdict(int)
+    for term in tokenize(title):
+        weights[term] += TITLE_WEIGHT
+    for term in tokenize(description):
+        weights[term] += DESCRIPTION_WEIGHT
+    return weights
+
+
+def query_terms(query):
+    # Keep order but drop duplicates so "a a" doesn't need two matches
+    return list(dict.fromkeys(tokenize(query)))
+
+
+class MySQLTermStore:
+    """Postings kept in the ``task_terms`` table, written on the caller's cursor."""
+
+    def replace(self, cur, user_id, task_id, weights):
+        cur.execute("DELETE FROM task_terms WHERE task_id = %s", (task_id,))
+        if weights:
+            cur.executemany(
+                "INSERT INTO task_terms (user_id, term, task_id, weight) VALUES (%s, %s, %s, %s)",
+                [(user_id, term, task_id, weight) for term, weight in weights.items()])
+
+    def add_many(self, cur, user_id, documents):
+        """Insert postings for tasks that have none yet."""
+        rows = [(user_id, term, task_id, weight)
+                for task_id, weights in documents for term, weight in weights.items()]
+        if rows:
+            cur.executemany(
+                "INSERT INTO task_terms (user_id, term, task_id, weight) VALUES (%s, %s, %s, %s)",
+                rows)
+
+    def remove(self, cur, task_ids):
+        if not task_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(task_ids))
+        cur.execute(f"DELETE FROM task_terms WHERE task_id IN ({placeholders})", tuple(task_ids))
+
+    def search(self, cur, user_id, terms, limit):
+        # One prefix range scan per query term; a task must match all of them.
+        parts = []
+        params = []
+        for term in terms:
+            parts.append("""
+                SELECT task_id, MAX(weight) AS score
+                FROM task_terms
+                WHERE user_id = %s AND term LIKE %s
+                GROUP BY task_id""")
+            params.extend([user_id, term.replace('_', r'\_') + '%'])
+        cur.execute("""
+            SELECT task_id, SUM(score) AS rank_score
+            FROM (""" + ' UNION ALL '.join(parts) + """) matches
+            GROUP BY task_id
+            HAVING COUNT(*) = %s
+            ORDER BY rank_score DESC, task_id DESC
+            LIMIT %s""", (*params, len(terms), limit))
+        return [(row[0], int(row[1])) for row in cur.fetchall()]
+
+
+class MemoryTermStore:
+    """Embedded store with the same interface, used for tests and local runs."""
+
+    def __init__(self):
+        self._postings = defaultdict(lambda: defaultdict(dict))  # user -> term -> {task: weight}
+        self._terms = defaultdict(list)  # user -> sorted terms
+        self._owners = {}  # task -> (user, terms)
+
+    def replace(self, cur, user_id, task_id, weights):
+        self.remove(cur, [task_id])
+        postings = self._postings[user_id]
+        terms = self._terms[user_id]
+        for term, weight in weights.items():
+            if term not in postings:
+                bisect.insort(terms, term)
+            postings[term][task_id] = weight
+        self._owners[task_id] = (user_id, list(weights))
+
+    def add_many(self, cur, user_id, documents):
+        for task_id, weights in documents:
+            self.replace(cur, user_id, task_id, weights)
+
+    def remove(self, cur, task_ids):
+        for task_id in task_ids:
+            owner = self._owners.pop(task_id, None)
+            if owner is None:
+                continue
+            user_id, terms = owner
+            postings = self._postings[user_id]
+            for term in terms:
+                postings[term].pop(task_id, None)
+                if not postings[term]:
+                    del postings[term]
+                    sorted_terms = self._terms[user_id]
+                    del sorted_terms[bisect.bisect_left(sorted_terms, term)]
+
+    def _prefix_scores(self, user_id, prefix):
+        sorted_terms = self._terms.get(user_id, [])
+        postings = self._postings.get(user_id, {})
+        scores = {}
+        i = bisect.bisect_left(sorted_terms, prefix)
+        while i < len(sorted_terms) and sorted_terms[i].startswith(prefix):
+            for task_id, weight in postings[sorted_terms[i]].items():
+                if weight > scores.get(task_id, 0):
+                    scores[task_id] = weight
+            i += 1
+        return scores
+
+    def search(self, cur, user_id, terms, limit):
+        totals = None
+        for term in terms:
+            scores = self._prefix_scores(user_id, term)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {t: s + scores[t] for t, s in totals.items() if t in scores}
+            if not totals:
+                return []
+        ranked = sorted(totals.items(), key=lambda item: (item[1], item[0]), reverse=True)
+        return ranked[:limit]
+
+
+class SearchIndex:
+    stores = {
+        'mysql': MySQLTermStore,
+        'memory': MemoryTermStore,
+    }
+
+    def __init__(self, app=None):
+        self.store = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SEARCH_BACKEND', 'mysql')
+        app.config.setdefault('SEARCH_MAX_RESULTS', 200)
+        self.store = self.stores[app.config['SEARCH_BACKEND']]()
+        self.max_results = app.config['SEARCH_MAX_RESULTS']
+        app.cli.add_command(search_cli)
+        changes.on_apply(self.apply_changes)
+
+    def index_task(self, cur, user_id, task_id, title, description):
+        self.store.replace(cur, user_id, task_id, task_terms(title, description))
+
+    def remove_tasks(self, cur, task_ids):
+        self.store.remove(cur, list(task_ids))
+
+    def apply_changes(self, cur, changeset):
+        # Drop postings of deleted and retitled tasks in one statement, then
+        # write postings for new and retitled tasks in one batch.
+        stale = []
+        documents = []
+        for change in changeset.tasks:
+            indexed = change.after is not None and 'title' in change.after
+            if not change.created and (change.deleted or indexed):
+                stale.append(change.task_id)
+            if indexed:
+                documents.append((change.task_id, task_terms(
+                    change.after['title'], change.after.get('description'))))
+        if stale:
+            self.remove_tasks(cur, stale)
+        if documents:
+            self.store.add_many(cur, changeset.user_id, documents)
+
+    def search(self, cur, user_id, query, limit=None):
+        """Return ``[(task_id, score), ...]`` best match first.
+
+        Returns None when the query has no searchable terms so callers can
+        fall back to an unfiltered listing.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return None
+        return self.store.search(cur, user_id, terms, limit or self.max_results)
+
+
+search_cli = AppGroup('search', help='Task search index maintenance.')
+
+
+@search_cli.command('reindex')
+def reindex_command():
+    """Rebuild the search index from the tasks table."""
+    from . import mysql, search_index
+
+    read_cur = mysql.connection.cursor()
+    write_cur = mysql.connection.cursor()
+    try:
+        read_cur.execute("SELECT id, user_id, title, description FROM tasks")
+        count = 0
+        for task_id, user_id, title, description in read_cur.fetchall():
+            search_index.index_task(write_cur, user_id, task_id, title, description)
+            count += 1
+        mysql.connection.commit()
+        logger.info(f"[SEARCH] Reindexed {count} tasks")
+        click.echo(f'Reindexed {count} tasks')
+    except Exception:
+        mysql.connection.rollback()
+        raise
+    finally:
+        read_cur.close()
+        write_cur.close()
@@ -0,0 +1,92 @@
+"""Row serializers shared by the task and project routes.
+
+Rows arrive as tuples in the column order of ``TASK_FIELDS`` /
+``PROJECT_FIELDS``. Row mode builds one dict per row from a single tuple
+unpack; columnar mode (``?format=columnar``) transposes the page once and
+returns one array per column, which is smaller on the wire and faster to
+encode for long listings.
+"""
+TASK_FIELDS = ('id', 'title', 'description', 'status', 'priority',
+               'due_date', 'created_at', 'updated_at')
+PROJECT_FIELDS = ('id', 'title', 'description', 'is_completed',
+                  'created_at', 'updated_at')
+
+
+def _isoformat_all(values):
+    return [value.isoformat() if value is not None else None for value in values]
+
+
+def task_row(row):
+    task_id, title, description, status, priority, due_date, created_at, updated_at = row
+    return {
+        'id': task_id,
+        'title': title,
+        'description': description,
+        'status': status,
+        'priority': priority,
+        'due_date': due_date.isoformat() if due_date is not None else None,
+        'created_at': created_at.isoformat() if created_at is not None else None,
+        'updated_at': updated_at.isoformat() if updated_at is not None else None,
+    }
+
+
+def project_row(row):
+    project_id, title, description, is_completed, created_at, updated_at = row
+    return {
+        'id': project_id,
+        'title': title,
+        'description': description,
+        'is_completed': bool(is_completed),
+        'created_at': created_at.isoformat() if created_at is not None else None,
+        'updated_at': updated_at.isoformat() if updated_at is not None else None,
+    }
+
+
+def task_rows(rows):
+    return list(map(task_row, rows))
+
+
+def project_rows(rows):
+    return list(map(project_row, rows))
+
+
+def task_columns(rows):
+    if not rows:
+        return {field: [] for field in TASK_FIELDS}
+    ids, titles, descriptions, statuses, priorities, due_dates, created, updated = zip(*rows)
+    return {
+        'id': list(ids),
+        'title': list(titles),
+        'description': list(descriptions),
+        'status': list(statuses),
+        'priority': list(priorities),
+        'due_date': _isoformat_all(due_dates),
+        'created_at': _isoformat_all(created),
+        'updated_at': _isoformat_all(updated),
+    }
+
+
+def project_columns(rows):
+    if not rows:
+        return {field: [] for field in PROJECT_FIELDS}
+    ids, titles, descriptions, completed, created, updated = zip(*rows)
+    return {
+        'id': list(ids),
+        'title': list(titles),
+        'description': list(descriptions),
+        'is_completed': [bool(value) for value in completed],
+        'created_at': _isoformat_all(created),
+        'updated_at': _isoformat_all(updated),
+    }
+
+
+def wants_columnar(args):
+    return args.get('format') == 'columnar'
+
+
+def serialize_tasks(rows, columnar=False):
+    return task_columns(rows) if columnar else task_rows(rows)
+
+
+def serialize_projects(rows, columnar=False):
+    return project_columns(rows) if columnar else project_rows(rows)
@@ -0,0 +1,209 @@
+"""Incrementally maintained task and user statistics.
+
+Per-user task counts live in ``user_task_stats`` and are adjusted from each
+``ChangeSet`` inside the writing transaction; global counters live in
+``global_stats``. ``active_users`` counts users with at least one task that
+is not completed. Dashboard reads are single-row lookups. A periodic
+reconciliation recomputes everything from ``tasks``/``users`` and repairs
+drift left by writes that bypassed the API.
+"""
+import logging
+import os
+import threading
+import time
+
+import click
+from flask.cli import AppGroup
+
+from . import changes
+
+logger = logging.getLogger(__name__)
+
+STATUS_COLUMNS = {
+    'pending': 'pending_tasks',
+    'in_progress': 'in_progress_tasks',
+    'completed': 'completed_tasks',
+}
+
+_USER_COLUMNS = ('total_tasks', 'pending_tasks', 'in_progress_tasks', 'completed_tasks')
+
+
+def _open_tasks(counts):
+    return counts['pending_tasks'] + counts['in_progress_tasks']
+
+
+def bump_global(cur, name, delta):
+    cur.execute("""
+        INSERT INTO global_stats (name, value) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE value = value + VALUES(value)""", (name, delta))
+
+
+def user_stats(cur, user_id):
+    cur.execute("""
+        SELECT total_tasks, pending_tasks, in_progress_tasks, completed_tasks
+        FROM user_task_stats WHERE user_id = %s""", (user_id,))
+    row = cur.fetchone()
+    return dict(zip(_USER_COLUMNS, row or (0, 0, 0, 0)))
+
+
+def global_stats(cur):
+    cur.execute("SELECT name, value FROM global_stats")
+    values = {'total_users': 0, 'active_users': 0}
+    values.update((name, int(value)) for name, value in cur.fetchall())
+    return values
+
+
+def status_deltas(changeset):
+    deltas = dict.fromkeys(_USER_COLUMNS, 0)
+    for change in changeset.tasks:
+        before = change.before and change.before.get('status')
+        after = change.after and change.after.get('status')
+        if change.created:
+            deltas['total_tasks'] += 1
+        elif change.deleted:
+            deltas['total_tasks'] -= 1
+        elif before == after or before is None or after is None:
+            # Status untouched, or unknown on one side of an update
+            continue
+        if before in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[before]] -= 1
+        if after in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[after]] += 1
+    return deltas
+
+
+@changes.on_apply
+def apply_task_changes(cur, changeset):
+    deltas = status_deltas(changeset)
+    if not any(deltas.values()):
+        return
+    cur.execute("""
+        SELECT total_tasks, pending_tasks, in_progress_tasks, completed_tasks
+        FROM user_task_stats WHERE user_id = %s FOR UPDATE""", (changeset.user_id,))
+    row = cur.fetchone()
+    before = dict(zip(_USER_COLUMNS, row or (0, 0, 0, 0)))
+    after = {column: max(0, before[column] + deltas[column]) for column in _USER_COLUMNS}
+    cur.execute("""
+        INSERT INTO user_task_stats
+            (user_id, total_tasks, pending_tasks, in_progress_tasks, completed_tasks)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            total_tasks = VALUES(total_tasks),
+            pending_tasks = VALUES(pending_tasks),
+            in_progress_tasks = VALUES(in_progress_tasks),
+            completed_tasks = VALUES(completed_tasks)""",
+        (changeset.user_id, *(after[column] for column in _USER_COLUMNS)))
+
+    was_active, is_active = _open_tasks(before) > 0, _open_tasks(after) > 0
+    if was_active != is_active:
+        bump_global(cur, 'active_users', 1 if is_active else -1)
+
+
+def reconcile(cur):
+    """Recompute all counters from source tables; returns the number of repaired rows."""
+    cur.execute("""
+        SELECT user_id, COUNT(*),
+               SUM(status = 'pending'), SUM(status = 'in_progress'), SUM(status = 'completed')
+        FROM tasks GROUP BY user_id""")
+    actual = {row[0]: tuple(int(v or 0) for v in row[1:]) for row in cur.fetchall()}
+    cur.execute("""
+        SELECT user_id, total_tasks, pending_tasks, in_progress_tasks, completed_tasks
+        FROM user_task_stats""")
+    stored = {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+
+    drifted = [(user_id, *counts) for user_id, counts in actual.items()
+               if stored.get(user_id) != counts]
+    drifted += [(user_id, 0, 0, 0, 0) for user_id, counts in stored.items()
+                if user_id not in actual and any(counts)]
+    if drifted:
+        cur.executemany("""
+            INSERT INTO user_task_stats
+                (user_id, total_tasks, pending_tasks, in_progress_tasks, completed_tasks)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                total_tasks = VALUES(total_tasks),
+                pending_tasks = VALUES(pending_tasks),
+                in_progress_tasks = VALUES(in_progress_tasks),
+                completed_tasks = VALUES(completed_tasks)""", drifted)
+
+    cur.execute("SELECT COUNT(*) FROM users")
+    total_users = cur.fetchone()[0]
+    active_users = sum(1 for counts in actual.values() if counts[1] + counts[2] > 0)
+    cur.execute("""
+        INSERT INTO global_stats (name, value) VALUES ('total_users', %s), ('active_users', %s)
+        ON DUPLICATE KEY UPDATE value = VALUES(value)""", (total_users, active_users))
+    return len(drifted)
+
+
+def reconcile_with_lock(cur):
+    """Run ``reconcile`` unless another worker holds the reconciliation lock."""
+    cur.execute("SELECT GET_LOCK('task_tracker_stats_reconcile', 0)")
+    if not cur.fetchone()[0]:
+        return None
+    try:
+        return reconcile(cur)
+    finally:
+        cur.execute("SELECT RELEASE_LOCK('task_tracker_stats_reconcile')")
+
+
+class Statistics:
+    def __init__(self, app=None):
+        self.app = None
+        self._worker = None
+        self._worker_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('STATS_RECONCILE_INTERVAL', 900)
+        self.app = app
+        self.interval = app.config['STATS_RECONCILE_INTERVAL']
+        app.cli.add_command(stats_cli)
+        if self.interval:
+            # Started lazily so forked workers each get their own thread
+            app.before_request(self._ensure_worker)
+
+    def _ensure_worker(self):
+        if self._worker_pid == os.getpid():
+            return
+        self._worker_pid = os.getpid()
+        self._worker = threading.Thread(target=self._run, name='stats-reconcile', daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.app.app_context():
+                from . import mysql
+
+                cur = mysql.connection.cursor()
+                try:
+                    repaired = reconcile_with_lock(cur)
+                    mysql.connection.commit()
+                    if repaired:
+                        logger.warning(f"[STATS] Reconciliation repaired {repaired} users")
+                except Exception as e:
+                    mysql.connection.rollback()
+                    logger.error(f"[STATS] Reconciliation failed: {e}")
+                finally:
+                    cur.close()
+
+
+stats_cli = AppGroup('stats', help='Dashboard statistics maintenance.')
+
+
+@stats_cli.command('reconcile')
+def reconcile_command():
+    """Recompute statistics from the tasks and users tables."""
+    from . import mysql
+
+    cur = mysql.connection.cursor()
+    try:
+        repaired = reconcile(cur)
+        mysql.connection.commit()
+        click.echo(f'Repaired {repaired} users')
+    except Exception:
+        mysql.connection.rollback()
+        raise
+    finally:
+        cur.close()
@@ -0,0 +1,254 @@
+"""Delta sync of a user's tasks and projects.
+
+Every change set appends one ``change_log`` row per task or project it
+touched, numbered from the user's ``sync_state.seq`` inside the writing
+transaction. The ``sync_state`` row lock orders a user's writers, so
+sequence order is commit order and a token never skips a change that
+commits later. ``GET /api/sync?since=<token>`` returns the current rows of
+the entities changed after the token and tombstones for deleted ones.
+
+Compaction removes rows superseded by a later change to the same entity.
+Retention drops rows older than ``SYNC_RETENTION_DAYS`` and raises the
+user's horizon; a token from before the horizon gets ``reset`` and the
+client refetches its lists.
+"""
+import base64
+import logging
+import os
+import threading
+import time
+
+import click
+from flask.cli import AppGroup
+
+from . import changes
+from .serializers import project_rows, task_rows
+
+logger = logging.getLogger(__name__)
+
+TASK = 'task'
+PROJECT = 'project'
+COMPACT_BATCH = 5000
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def encode_token(seq):
+    return base64.urlsafe_b64encode(f's{seq}'.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = base64.urlsafe_b64decode(padded).decode()
+        if not payload.startswith('s'):
+            raise ValueError(payload)
+        return int(payload[1:])
+    except Exception:
+        raise InvalidToken('Invalid sync token')
+
+
+def record_changes(cur, changeset):
+    entries = [(TASK, change.task_id, change.deleted) for change in changeset.tasks]
+    entries += [(PROJECT, change.project_id, change.op == 'delete') for change in changeset.projects]
+    if not entries:
+        return
+    user_id = changeset.user_id
+    cur.execute("""
+        INSERT INTO sync_state (user_id, seq) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE seq = seq + %s""", (user_id, len(entries), len(entries)))
+    cur.execute("SELECT seq FROM sync_state WHERE user_id = %s", (user_id,))
+    first = cur.fetchone()[0] - len(entries) + 1
+    cur.executemany("""
+        INSERT INTO change_log (user_id, seq, entity, entity_id, deleted)
+        VALUES (%s, %s, %s, %s, %s)""",
+        [(user_id, first + i, entity, entity_id, deleted)
+         for i, (entity, entity_id, deleted) in enumerate(entries)])
+
+
+def read_state(cur, user_id):
+    """Return the user's ``(seq, horizon)``."""
+    cur.execute("SELECT seq, horizon FROM sync_state WHERE user_id = %s", (user_id,))
+    return cur.fetchone() or (0, 0)
+
+
+def delta(cur, user_id, since, until, limit):
+    """Changes in ``(since, until]``, at most ``limit`` log entries.
+
+    Returns ``(body, last_seq, has_more)`` where ``body`` holds the current
+    task and project rows plus the ids of deleted ones.
+    """
+    cur.execute("""
+        SELECT seq, entity, entity_id, deleted FROM change_log
+        WHERE user_id = %s AND seq > %s AND seq <= %s
+        ORDER BY seq
+        LIMIT %s""", (user_id, since, until, limit))
+    entries = cur.fetchall()
+    has_more = len(entries) == limit
+    last = entries[-1][0] if has_more else until
+
+    latest = {}
+    for _, entity, entity_id, deleted in entries:
+        latest[(entity, entity_id)] = bool(deleted)
+    deleted = {TASK: [], PROJECT: []}
+    live = {TASK: [], PROJECT: []}
+    for (entity, entity_id), is_deleted in latest.items():
+        (deleted if is_deleted else live)[entity].append(entity_id)
+
+    tasks = projects = []
+    if live[TASK]:
+        cur.execute(f"""
+            SELECT id, title, description, status, priority,
+                   due_date, created_at, updated_at
+            FROM tasks
+            WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(live[TASK]))})""",
+            (user_id, *live[TASK]))
+        tasks = cur.fetchall()
+    if live[PROJECT]:
+        cur.execute(f"""
+            SELECT id, title, description, is_completed, created_at, updated_at
+            FROM projects
+            WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(live[PROJECT]))})""",
+            (user_id, *live[PROJECT]))
+        projects = cur.fetchall()
+
+    # Rows deleted by writes that bypassed the API have no tombstone
+    found_tasks = {row[0] for row in tasks}
+    found_projects = {row[0] for row in projects}
+    deleted[TASK] += [task_id for task_id in live[TASK] if task_id not in found_tasks]
+    deleted[PROJECT] += [p for p in live[PROJECT] if p not in found_projects]
+
+    body = {
+        'tasks': task_rows(tasks),
+        'projects': project_rows(projects),
+        'deleted': {'tasks': deleted[TASK], 'projects': deleted[PROJECT]},
+    }
+    return body, last, has_more
+
+
+def compact(cur, commit, retention_days, batch=COMPACT_BATCH):
+    """Drop superseded and expired log rows; returns ``(superseded, expired)``."""
+    superseded = 0
+    while True:
+        cur.execute("""
+            SELECT DISTINCT c.user_id, c.seq
+            FROM change_log c
+            JOIN change_log newer
+              ON newer.user_id = c.user_id AND newer.entity = c.entity
+             AND newer.entity_id = c.entity_id AND newer.seq > c.seq
+            LIMIT %s""", (batch,))
+        rows = cur.fetchall()
+        if not rows:
+            break
+        cur.execute(f"""
+            DELETE FROM change_log
+            WHERE (user_id, seq) IN ({', '.join(['(%s, %s)'] * len(rows))})""",
+            tuple(value for row in rows for value in row))
+        superseded += cur.rowcount
+        commit()
+
+    # One cutoff for both statements, so nothing expires without raising the horizon
+    cur.execute("SELECT NOW() - INTERVAL %s DAY", (retention_days,))
+    cutoff = cur.fetchone()[0]
+    cur.execute("""
+        SELECT user_id, MAX(seq) FROM change_log
+        WHERE changed_at < %s
+        GROUP BY user_id""", (cutoff,))
+    horizons = cur.fetchall()
+    if horizons:
+        cur.executemany("UPDATE sync_state SET horizon = GREATEST(horizon, %s) WHERE user_id = %s",
+                        [(seq, user_id) for user_id, seq in horizons])
+        commit()
+    expired = 0
+    while True:
+        cur.execute("DELETE FROM change_log WHERE changed_at < %s LIMIT %s", (cutoff, batch))
+        deleted = cur.rowcount
+        expired += deleted
+        commit()
+        if deleted < batch:
+            break
+    return superseded, expired
+
+
+def compact_with_lock(cur, commit, retention_days):
+    """Run ``compact`` unless another worker holds the compaction lock."""
+    cur.execute("SELECT GET_LOCK('task_tracker_sync_compact', 0)")
+    if not cur.fetchone()[0]:
+        return None
+    try:
+        return compact(cur, commit, retention_days)
+    finally:
+        cur.execute("SELECT RELEASE_LOCK('task_tracker_sync_compact')")
+
+
+class ChangeLog:
+    def __init__(self, app=None):
+        self.app = None
+        self._worker = None
+        self._worker_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SYNC_MAX_CHANGES', 500)
+        app.config.setdefault('SYNC_RETENTION_DAYS', 30)
+        app.config.setdefault('SYNC_COMPACT_INTERVAL', 3600)
+        self.app = app
+        self.max_changes = app.config['SYNC_MAX_CHANGES']
+        self.retention_days = app.config['SYNC_RETENTION_DAYS']
+        self.interval = app.config['SYNC_COMPACT_INTERVAL']
+        changes.on_apply(record_changes)
+        app.cli.add_command(sync_cli)
+        if self.interval:
+            # Started lazily so forked workers each get their own thread
+            app.before_request(self._ensure_worker)
+
+    def _ensure_worker(self):
+        if self._worker_pid == os.getpid():
+            return
+        self._worker_pid = os.getpid()
+        self._worker = threading.Thread(target=self._run, name='sync-compact', daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.app.app_context():
+                from . import mysql
+
+                cur = mysql.connection.cursor()
+                try:
+                    result = compact_with_lock(cur, mysql.connection.commit, self.retention_days)
+                    mysql.connection.commit()
+                    if result:
+                        logger.info(f"[SYNC] Compacted {result[0]} superseded, "
+                                    f"{result[1]} expired change log rows")
+                except Exception as e:
+                    mysql.connection.rollback()
+                    logger.error(f"[SYNC] Compaction failed: {e}")
+                finally:
+                    cur.close()
+
+
+sync_cli = AppGroup('sync', help='Delta sync change log maintenance.')
+
+
+@sync_cli.command('compact')
+@click.option('--retention-days', type=int, help='Defaults to SYNC_RETENTION_DAYS.')
+def compact_command(retention_days):
+    """Remove superseded and expired change log rows."""
+    from . import change_log, mysql
+
+    if retention_days is None:
+        retention_days = change_log.retention_days
+    cur = mysql.connection.cursor()
+    try:
+        superseded, expired = compact(cur, mysql.connection.commit, retention_days)
+        click.echo(f'Removed {superseded} superseded and {expired} expired rows')
+    except Exception:
+        mysql.connection.rollback()
+        raise
+    finally:
+        cur.close()
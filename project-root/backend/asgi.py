@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from app.aio import create_async_app
+
+app = create_async_app()
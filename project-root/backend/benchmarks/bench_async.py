@@ -0,0 +1,152 @@
+"""Compare the sync and async serving modes over HTTP.
+
+Start both servers against the same local database, e.g.
+
+    flask --app run run --port 5000 --with-threads
+    hypercorn asgi:app --bind 127.0.0.1:8000
+
+then log in once on each and hammer a read route with N concurrent
+keep-alive clients:
+
+    python benchmarks/bench_async.py --email me@example.com --password secret \\
+        --target sync=http://127.0.0.1:5000 --target async=http://127.0.0.1:8000 \\
+        --concurrency 200 --requests 20000
+
+Disable the response cache (``RESPONSE_CACHE_BACKEND=None``) on both servers
+to measure the database path rather than cache hits.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+class Client:
+    """Minimal HTTP/1.1 keep-alive client on asyncio streams."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        if body is not None:
+            lines += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + (body or b''))
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length, close, chunked = 0, False, False
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            name, value = name.lower(), value.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'connection' and value == 'close':
+                close = True
+            elif name == 'transfer-encoding' and value == 'chunked':
+                chunked = True
+
+        if chunked:
+            payload = b''
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                payload += chunk[:-2]
+        else:
+            payload = await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def login(url, email, password):
+    client = Client(url)
+    body = json.dumps({'email': email, 'password': password}).encode()
+    status, payload = await client.request('POST', '/api/login', body=body)
+    client.close()
+    if status != 200:
+        raise SystemExit(f'login against {url} failed with {status}: {payload[:200]!r}')
+    return json.loads(payload)['token']
+
+
+async def run(url, path, token, concurrency, total):
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies, errors = [], 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        client = Client(url)
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                status, _ = await client.request('GET', path, headers)
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                client.close()
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+        client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', action='append', required=True,
+                        help='name=base_url, repeatable')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--path', default='/api/tasks?limit=50')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f'{args.requests} x GET {args.path}, {args.concurrency} concurrent clients')
+    print(f'{"mode":<8} {"req/s":>9} {"mean ms":>9} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for target in args.target:
+        name, _, url = target.partition('=')
+        token = await login(url, args.email, args.password)
+        result = await run(url, args.path, token, args.concurrency, args.requests)
+        print(f'{name:<8} {result["rps"]:>9.0f} {result["mean_ms"]:>9.2f} '
+              f'{result["p50_ms"]:>8.2f} {result["p99_ms"]:>8.2f} {result["errors"]:>7}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""Microbenchmark for task serialization.
+
+Compares the per-field dict comprehension the routes used to inline, the
+shared row serializer and the columnar mode, including JSON encoding and
+payload size.
+
+    python benchmarks/bench_serializers.py --rows 5000 --repeat 20
+"""
+import argparse
+import json
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.serializers import task_columns, task_rows  # noqa: E402
+
+
+def make_rows(count):
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    statuses = ('pending', 'in_progress', 'completed')
+    priorities = ('low', 'medium', 'high')
+    return [
+        (i, f'Task {i}', f'Description for task number {i}', statuses[i % 3],
+         priorities[i % 3], now + timedelta(days=i % 30) if i % 4 else None,
+         now - timedelta(minutes=i), now - timedelta(minutes=i // 2))
+        for i in range(count)
+    ]
+
+
+def legacy(rows):
+    return [{
+        'id': task[0],
+        'title': task[1],
+        'description': task[2],
+        'status': task[3],
+        'priority': task[4],
+        'due_date': task[5].isoformat() if task[5] else None,
+        'created_at': task[6].isoformat() if task[6] else None,
+        'updated_at': task[7].isoformat() if task[7] else None
+    } for task in rows]
+
+
+MODES = {
+    'legacy': legacy,
+    'rows': task_rows,
+    'columnar': task_columns,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f'{args.rows} rows, best of {args.repeat}')
+    print(f'{"mode":<10} {"serialize ms":>13} {"+ encode ms":>12} {"bytes":>10}')
+    for name, serialize in MODES.items():
+        build = min(timeit.repeat(lambda: serialize(rows), number=1, repeat=args.repeat))
+        encode = min(timeit.repeat(lambda: json.dumps(serialize(rows), separators=(',', ':')),
+                                   number=1, repeat=args.repeat))
+        size = len(json.dumps(serialize(rows), separators=(',', ':')))
+        print(f'{name:<10} {build * 1000:>13.2f} {encode * 1000:>12.2f} {size:>10}')
+
+
+if __name__ == '__main__':
+    main()
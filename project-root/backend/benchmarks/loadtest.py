@@ -0,0 +1,378 @@
+"""Load test for the API.
+
+Boots ``create_app()`` in process against a seeded MySQL database or the
+in-memory stand-in, drives a weighted mix of API calls from N client
+threads through the WSGI test client, and reports throughput, latency
+percentiles and queries per request. Results are written as JSON so runs
+can be compared across changes.
+
+    python benchmarks/loadtest.py --db standin --users 20 --tasks-per-user 500
+    python benchmarks/loadtest.py --db mysql --mysql-db task_tracker_bench --reset \\
+        --concurrency 16 --requests 20000 --output results/baseline.json
+
+``--db mysql`` creates and seeds the database unless it already holds the
+requested number of users (``--reset`` drops and reseeds it).
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app import create_app, metrics, password_hasher, search_index  # noqa: E402
+from standin import StandIn  # noqa: E402
+
+PASSWORD = 'bench-password'
+WORDS = ('report', 'review', 'deploy', 'invoice', 'meeting', 'design', 'budget', 'release',
+         'client', 'migration', 'backlog', 'sprint', 'audit', 'training', 'roadmap', 'hiring')
+STATUSES = ('pending', 'in_progress', 'completed')
+PRIORITIES = ('low', 'medium', 'high')
+
+BENCH_TABLES = ('users', 'tasks', 'projects', 'task_terms', 'collection_versions',
+                'user_task_stats', 'global_stats', 'change_log', 'sync_state',
+                'schema_migrations')
+
+
+def fake_task(rng):
+    words = rng.sample(WORDS, 3)
+    return {
+        'title': f'{words[0].capitalize()} {words[1]}',
+        'description': f'Follow up on the {words[2]} for the {words[1]}',
+        'status': rng.choice(STATUSES),
+        'priority': rng.choice(PRIORITIES),
+        'due_date': datetime.now() + timedelta(days=rng.randint(-10, 30)) if rng.random() < 0.7 else None,
+    }
+
+
+# --- seeding ---------------------------------------------------------------
+
+def seed_standin(args, password_hash):
+    db = StandIn()
+    rng = random.Random(args.seed)
+    for u in range(args.users):
+        user_id = db.add_user(f'user{u}', f'user{u}@bench.local', password_hash)
+        for _ in range(args.tasks_per_user):
+            task = fake_task(rng)
+            task_id = db.add('tasks', user_id, **task)
+            search_index.index_task(None, user_id, task_id, task['title'], task['description'])
+        for p in range(args.projects_per_user):
+            db.add('projects', user_id, title=f'Project {p}', description='', is_completed=False)
+    return db
+
+
+def seed_mysql(args, app, password_hash):
+    import pymysql
+
+    server = pymysql.connect(host=args.mysql_host, port=args.mysql_port,
+                             user=args.mysql_user, password=args.mysql_password)
+    with server.cursor() as cur:
+        cur.execute(f'CREATE DATABASE IF NOT EXISTS `{args.mysql_db}`')
+        cur.execute(f'USE `{args.mysql_db}`')
+        if args.reset:
+            for table in BENCH_TABLES:
+                cur.execute(f'DROP TABLE IF EXISTS {table}')
+        server.commit()
+
+    runner = app.test_cli_runner()
+    migrate = runner.invoke(args=['db', 'upgrade'])
+    if migrate.exit_code:
+        raise SystemExit(f'flask db upgrade failed: {migrate.output}')
+
+    with server.cursor() as cur:
+        cur.execute('SELECT COUNT(*) FROM users')
+        if cur.fetchone()[0] >= args.users:
+            server.close()
+            return
+
+        rng = random.Random(args.seed)
+        print(f'Seeding {args.users} users x {args.tasks_per_user} tasks into {args.mysql_db}')
+        for u in range(args.users):
+            cur.execute("INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
+                        (f'user{u}', f'user{u}@bench.local', password_hash, 'student'))
+            user_id = cur.lastrowid
+            tasks = [fake_task(rng) for _ in range(args.tasks_per_user)]
+            cur.executemany("""
+                INSERT INTO tasks (user_id, title, description, status, priority, due_date)
+                VALUES (%s, %s, %s, %s, %s, %s)""",
+                [(user_id, t['title'], t['description'], t['status'], t['priority'], t['due_date'])
+                 for t in tasks])
+            cur.executemany("INSERT INTO projects (title, description, user_id) VALUES (%s, %s, %s)",
+                            [(f'Project {p}', '', user_id) for p in range(args.projects_per_user)])
+        server.commit()
+    server.close()
+
+    for command in (['search', 'reindex'], ['stats', 'reconcile']):
+        result = runner.invoke(args=command)
+        if result.exit_code:
+            raise SystemExit(f'flask {" ".join(command)} failed: {result.output}')
+
+
+# --- workload --------------------------------------------------------------
+
+class Session:
+    def __init__(self, client, index, rng):
+        self.client = client
+        self.email = f'user{index}@bench.local'
+        self.rng = rng
+        self.headers = {}
+        self.task_ids = []
+        self.project_ids = []
+
+    def setup(self):
+        response = login(self)
+        self.headers = {'Authorization': f'Bearer {response.get_json()["token"]}'}
+        tasks = self.client.get('/api/tasks?limit=200', headers=self.headers).get_json()
+        self.task_ids = [t['id'] for t in tasks['data']['tasks']]
+        projects = self.client.get('/api/projects?limit=200', headers=self.headers).get_json()
+        self.project_ids = [p['id'] for p in projects['data']]
+
+
+def login(s):
+    return s.client.post('/api/login', json={'email': s.email, 'password': PASSWORD})
+
+
+def list_tasks(s):
+    return s.client.get('/api/tasks?limit=50', headers=s.headers)
+
+
+def filter_tasks(s):
+    return s.client.get(f'/api/tasks/filter?status={s.rng.choice(STATUSES)}'
+                        f'&priority={s.rng.choice(PRIORITIES)}', headers=s.headers)
+
+
+def search_tasks(s):
+    return s.client.get(f'/api/tasks/search?q={s.rng.choice(WORDS)[:4]}', headers=s.headers)
+
+
+def update_status(s):
+    if not s.task_ids:
+        return list_tasks(s)
+    return s.client.put(f'/api/tasks/{s.rng.choice(s.task_ids)}/status',
+                        json={'status': s.rng.choice(STATUSES)}, headers=s.headers)
+
+
+def list_projects(s):
+    return s.client.get('/api/projects', headers=s.headers)
+
+
+def create_project(s):
+    return s.client.post('/api/projects', json={'title': 'Bench project', 'description': ''},
+                         headers=s.headers)
+
+
+def update_project(s):
+    if not s.project_ids:
+        return create_project(s)
+    return s.client.put(f'/api/projects/{s.rng.choice(s.project_ids)}',
+                        json={'is_completed': s.rng.random() < 0.5}, headers=s.headers)
+
+
+def delete_project(s):
+    if not s.project_ids:
+        return create_project(s)
+    project_id = s.project_ids.pop(s.rng.randrange(len(s.project_ids)))
+    return s.client.delete(f'/api/projects/{project_id}', headers=s.headers)
+
+
+# name -> (call, default weight, (endpoint, method) for query accounting)
+OPERATIONS = {
+    'login': (login, 3, ('api.login', 'POST')),
+    'list_tasks': (list_tasks, 35, ('api.handle_tasks', 'GET')),
+    'filter_tasks': (filter_tasks, 10, ('api.filter_tasks', 'GET')),
+    'search_tasks': (search_tasks, 15, ('api.search_tasks', 'GET')),
+    'update_status': (update_status, 15, ('api.update_task_status', 'PUT')),
+    'list_projects': (list_projects, 10, ('api.handle_projects', 'GET')),
+    'create_project': (create_project, 4, ('api.handle_projects', 'POST')),
+    'update_project': (update_project, 5, ('api.handle_project', 'PUT')),
+    'delete_project': (delete_project, 3, ('api.delete_project', 'DELETE')),
+}
+
+
+def parse_mix(spec):
+    weights = {name: op[1] for name, op in OPERATIONS.items()}
+    if spec:
+        weights = dict.fromkeys(OPERATIONS, 0)
+        for part in spec.split(','):
+            name, _, weight = part.partition('=')
+            if name not in OPERATIONS:
+                raise SystemExit(f'Unknown operation {name!r}; choose from {", ".join(OPERATIONS)}')
+            weights[name] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def worker(app, index, args, mix, count, results, barrier):
+    rng = random.Random(args.seed * 1000 + index)
+    session = Session(app.test_client(), index % args.users, rng)
+    session.setup()
+    names, weights = list(mix), list(mix.values())
+    local = {name: [] for name in mix}
+    errors = dict.fromkeys(mix, 0)
+
+    for _ in range(args.warmup):
+        OPERATIONS[rng.choices(names, weights)[0]][0](session)
+    barrier.wait()
+    for _ in range(count):
+        name = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        response = OPERATIONS[name][0](session)
+        local[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors[name] += 1
+    results[index] = (local, errors)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def summarize(latencies, errors, elapsed, queries=None):
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+    if queries is not None:
+        summary['queries_per_request'] = queries
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', choices=('standin', 'mysql'), default='standin')
+    parser.add_argument('--mysql-host', default='localhost')
+    parser.add_argument('--mysql-port', type=int, default=3306)
+    parser.add_argument('--mysql-user', default='root')
+    parser.add_argument('--mysql-password', default='')
+    parser.add_argument('--mysql-db', default='task_tracker_bench')
+    parser.add_argument('--reset', action='store_true', help='drop and reseed the MySQL tables')
+    parser.add_argument('--mysql-replica', action='append', default=[], metavar='HOST:PORT',
+                        help='read replica of the --mysql-* server; repeatable')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--tasks-per-user', type=int, default=200)
+    parser.add_argument('--projects-per-user', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=5000, help='measured requests in total')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per client')
+    parser.add_argument('--mix', help='e.g. list_tasks=50,search_tasks=20,update_status=10')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', '-o', help='write results as JSON to this path')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    mix = parse_mix(args.mix)
+    config = {
+        'METRICS_ENABLED': True,
+        'STATS_RECONCILE_INTERVAL': 0,
+        # Every simulated user comes from one address and logs in repeatedly
+        'RATELIMIT_ENABLED': False,
+        'DB_POOL_MAX_SIZE': max(args.concurrency, 10),
+    }
+    if args.no_cache:
+        config['RESPONSE_CACHE_BACKEND'] = None
+    if args.db == 'standin':
+        holder = {}
+        config.update(DB_CONNECTION_FACTORY=lambda: holder['db'].connect(),
+                      DB_POOL_MIN_SIZE=0, SEARCH_BACKEND='memory')
+    else:
+        config.update(MYSQL_HOST=args.mysql_host, MYSQL_PORT=args.mysql_port,
+                      MYSQL_USER=args.mysql_user, MYSQL_PASSWORD=args.mysql_password,
+                      MYSQL_DB=args.mysql_db, DB_POOL_MIN_SIZE=0,
+                      MYSQL_REPLICAS=[{'host': host, 'port': int(port)} for host, port in
+                                      (replica.rsplit(':', 1) for replica in args.mysql_replica)])
+    app = create_app(config)
+    password_hash = password_hasher.hash(PASSWORD)
+    if args.db == 'standin':
+        holder['db'] = seed_standin(args, password_hash)
+    else:
+        seed_mysql(args, app, password_hash)
+
+    per_client = [args.requests // args.concurrency] * args.concurrency
+    for i in range(args.requests % args.concurrency):
+        per_client[i] += 1
+    results = [None] * args.concurrency
+    barrier = threading.Barrier(args.concurrency + 1)
+    threads = [threading.Thread(target=worker, args=(app, i, args, mix, per_client[i], results, barrier))
+               for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    before = metrics.snapshot()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    after = metrics.snapshot()
+
+    operations = {}
+    all_latencies, all_errors = [], 0
+    total_queries = total_requests = 0
+    for name in mix:
+        latencies = [v for local, _ in results for v in local[name]]
+        errors = sum(errs[name] for _, errs in results)
+        key = OPERATIONS[name][2]
+        end, start = after.get(key, {}), before.get(key, {})
+        requests = end.get('requests', 0) - start.get('requests', 0)
+        queries = end.get('queries', 0) - start.get('queries', 0)
+        operations[name] = summarize(latencies, errors, elapsed,
+                                     queries / requests if requests else None)
+        all_latencies += latencies
+        all_errors += errors
+    for key, end in after.items():
+        start = before.get(key, {})
+        total_requests += end['requests'] - start.get('requests', 0)
+        total_queries += end['queries'] - start.get('queries', 0)
+
+    report = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'config': {k: v for k, v in vars(args).items() if k != 'mysql_password'},
+        'mix': mix,
+        'elapsed_seconds': elapsed,
+        'total': summarize(all_latencies, all_errors, elapsed,
+                           total_queries / total_requests if total_requests else None),
+        'operations': operations,
+    }
+
+    print(f'{args.requests} requests, {args.concurrency} clients, {args.db}, {elapsed:.2f}s')
+    print(f'{"operation":<15} {"req":>6} {"err":>5} {"req/s":>8} {"p50 ms":>8} '
+          f'{"p95 ms":>8} {"p99 ms":>8} {"q/req":>6}')
+    for name, row in [*operations.items(), ('TOTAL', report['total'])]:
+        qpr = row.get('queries_per_request')
+        print(f'{name:<15} {row["requests"]:>6} {row["errors"]:>5} {row["throughput_rps"]:>8.0f} '
+              f'{row["p50_ms"]:>8.2f} {row["p95_ms"]:>8.2f} {row["p99_ms"]:>8.2f} '
+              f'{"-" if qpr is None else f"{qpr:.1f}":>6}')
+
+    if args.output:
+        path = Path(args.output)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2) + '\n')
+        print(f'Results written to {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""In-memory stand-in for MySQL used by the load test.
+
+Understands just the statements the benchmarked routes issue against
+``users``, ``tasks``, ``projects`` and ``collection_versions``; other
+bookkeeping writes (statistics, change log) are accepted and ignored. Numbers measured against it
+show the application's own overhead, not database cost. ``id_step`` plays
+MySQL's ``auto_increment_increment`` for ids handed out by INSERTs.
+"""
+import re
+import threading
+from datetime import datetime
+
+SELECT_RE = re.compile(r'^SELECT (.+?) FROM (tasks|projects)\b', re.S)
+IN_RE = re.compile(r'AND id IN \(([%s, ]+)\)')
+KEYSET = 'AND (created_at < %s OR (created_at = %s AND id < %s))'
+TASK_COLUMNS = ('title', 'description', 'status', 'priority', 'due_date')
+
+
+class StandIn:
+    def __init__(self, id_step=1):
+        self.id_step = id_step
+        self.users = {}  # email -> row
+        self.tasks = {}  # id -> dict
+        self.projects = {}  # id -> dict
+        self.versions = {}  # (user_id, collection) -> version
+        self._by_user = {'tasks': {}, 'projects': {}}
+        self._next_id = {'tasks': 1, 'projects': 1, 'users': 1}
+        self._lock = threading.Lock()
+
+    def add_user(self, username, email, password, role='student'):
+        user_id = self._take_id('users')
+        self.users[email] = (user_id, username, email, password, role)
+        return user_id
+
+    def add(self, table, user_id, **values):
+        row_id = self._take_id(table)
+        now = datetime.now()
+        row = {'id': row_id, 'user_id': user_id, 'created_at': now, 'updated_at': now, **values}
+        getattr(self, table)[row_id] = row
+        self._by_user[table].setdefault(user_id, []).append(row)
+        return row_id
+
+    def _take_id(self, table):
+        row_id = self._next_id[table]
+        self._next_id[table] += self.id_step
+        return row_id
+
+    def connect(self):
+        return Connection(self)
+
+    def execute(self, sql, params):
+        """Return ``(rows, rowcount, lastrowid)`` for one statement."""
+        sql = ' '.join(sql.split())
+        params = tuple(params or ())
+        with self._lock:
+            if sql.startswith('SELECT * FROM users WHERE email'):
+                user = self.users.get(params[0])
+                return ([user] if user else []), 0, None
+            if sql.startswith('INSERT INTO collection_versions'):
+                for key in zip(params[::2], params[1::2]):
+                    self.versions[key] = self.versions.get(key, 0) + 1
+                return [], 1, None
+            if sql.startswith('SELECT version FROM collection_versions'):
+                return [(self.versions.get(params, 0),)], 0, None
+            if sql.startswith('SELECT seq FROM sync_state'):
+                return [(0,)], 0, None
+            if sql.startswith('SELECT total_tasks'):
+                rows = self._by_user['tasks'].get(params[0], [])
+                counts = [sum(1 for row in rows if row['status'] == status)
+                          for status in ('pending', 'in_progress', 'completed')]
+                return [(len(rows), *counts)], 0, None
+            match = SELECT_RE.match(sql)
+            if match:
+                return self._select(sql, params, match.group(2),
+                                    [c.strip() for c in match.group(1).split(',')]), 0, None
+            if sql.startswith('INSERT INTO tasks'):
+                # Multi-row: (user_id, *TASK_COLUMNS) per row, ids in row order
+                width = 1 + len(TASK_COLUMNS)
+                ids = [self.add('tasks', params[i], **dict(zip(TASK_COLUMNS, params[i + 1:i + width])))
+                       for i in range(0, len(params), width)]
+                return [], len(ids), ids[0]
+            if sql.startswith('INSERT INTO projects'):
+                title, description, user_id = params
+                project_id = self.add('projects', user_id, title=title,
+                                      description=description, is_completed=False)
+                return [], 1, project_id
+            if sql.startswith(('UPDATE tasks', 'UPDATE projects')):
+                return [], self._update(sql, params), None
+            if sql.startswith(('DELETE FROM tasks WHERE id', 'DELETE FROM projects')):
+                table = 'tasks' if sql.startswith('DELETE FROM tasks') else 'projects'
+                store = getattr(self, table)
+                row = store.get(params[0])
+                if row is None or row['user_id'] != params[1]:
+                    return [], 0, None
+                del store[params[0]]
+                self._by_user[table][row['user_id']].remove(row)
+                return [], 1, None
+            return [], 0, None
+
+    def _select(self, sql, params, table, columns):
+        store = getattr(self, table)
+        if 'WHERE id = %s AND user_id = %s' in sql:
+            row = store.get(params[0])
+            rows = [row] if row and row['user_id'] == params[1] else []
+        else:
+            rows = self._by_user[table].get(params[0], [])
+            rest = list(params[1:])
+            for column in ('status', 'priority'):
+                if f'AND {column} = %s' in sql:
+                    value = rest.pop(0)
+                    rows = [row for row in rows if row[column] == value]
+            if KEYSET in sql:
+                created_at, _, last_id, *rest = rest
+                rows = [row for row in rows
+                        if (row['created_at'], row['id']) < (created_at, last_id)]
+            match = IN_RE.search(sql)
+            if match:
+                count = match.group(1).count('%s')
+                ids, rest = set(rest[:count]), rest[count:]
+                rows = [row for row in rows if row['id'] in ids]
+            if 'AND id >= %s' in sql:
+                first = rest.pop(0)
+                rows = [row for row in rows if row['id'] >= first]
+            if 'ORDER BY id' in sql:
+                rows = sorted(rows, key=lambda row: row['id'])
+            else:
+                rows = sorted(rows, key=lambda row: (row['created_at'], row['id']), reverse=True)
+            if 'LIMIT %s' in sql:
+                rows = rows[:rest[-1]]
+        return [tuple(row.get(column) for column in columns) for row in rows]
+
+    def _update(self, sql, params):
+        table = 'tasks' if sql.startswith('UPDATE tasks') else 'projects'
+        assignments = sql.split(' SET ', 1)[1].split(' WHERE ', 1)[0]
+        columns = [part.split('=')[0].strip() for part in assignments.split(',')
+                   if '%s' in part]
+        row = getattr(self, table).get(params[len(columns)])
+        if row is None or row['user_id'] != params[len(columns) + 1]:
+            return 0
+        row.update(zip(columns, params))
+        row['updated_at'] = datetime.now()
+        return 1
+
+
+class Cursor:
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def execute(self, sql, params=None):
+        self._rows, self.rowcount, self.lastrowid = self.db.execute(sql, params)
+        return self.rowcount
+
+    def executemany(self, sql, seq):
+        for params in seq:
+            self.execute(sql, params)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class Connection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, *args):
+        return Cursor(self.db)
+
+    def ping(self, *args):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,103 @@
+"""Production server settings: ``gunicorn`` from this directory picks them up.
+
+The app is imported once in the master (``preload_app``) and the workers
+fork from it, sharing its memory copy-on-write. Settings come from the
+environment:
+
+- ``WEB_CONCURRENCY``: worker processes (default: one per CPU)
+- ``GUNICORN_THREADS``: threads per worker (default 8)
+- ``GUNICORN_MAX_REQUESTS`` / ``GUNICORN_MAX_REQUESTS_JITTER``: replace a
+  worker after this many requests, staggered so workers don't all restart
+  together (defaults 10000 / 1000; 0 disables)
+- ``GUNICORN_MAX_RSS_MB``: replace a worker once its resident memory passes
+  this many MB (default 0, disabled)
+- ``GUNICORN_SSE_STREAMS``: ``/api/events`` streams per worker, each of
+  which holds a thread while open (default: half of ``GUNICORN_THREADS``)
+- ``BIND``: listen address (default ``0.0.0.0:$PORT``, port 8000)
+
+App settings are read from ``TASK_TRACKER_<NAME>`` variables. With more than
+one worker the response cache and the change feed must be shared, so the
+server refuses to start unless ``TASK_TRACKER_RESPONSE_CACHE_BACKEND`` is
+``redis`` (or ``null`` to disable it) and ``TASK_TRACKER_EVENTS_BACKEND`` is
+``redis``. Serve many ``/api/events`` streams from ``asgi.py`` instead, where
+an idle stream holds no thread.
+
+``kill -HUP <master>`` replaces workers gracefully with the same code. To
+deploy new code with preloading on, send ``USR2`` to start a new master,
+then ``QUIT`` to the old one.
+"""
+import logging
+import os
+import sys
+
+logger = logging.getLogger('gunicorn.error')
+
+wsgi_app = 'run:app'
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = 'gthread'
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+max_rss_mb = int(os.environ.get('GUNICORN_MAX_RSS_MB', 0))
+# Leave threads for the API however many tabs hold a stream open
+sse_streams = int(os.environ.get('GUNICORN_SSE_STREAMS', max(1, threads // 2)))
+raw_env = [f'TASK_TRACKER_EVENTS_MAX_BLOCKING_STREAMS={sse_streams}']
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Reading /proc is cheap but not free; check memory every this many requests
+MEMORY_CHECK_EVERY = 50
+
+
+def rss_mb():
+    """Current resident set size of this process in MB."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        import resource  # peak rather than current size, outside Linux
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if os.uname().sysname == 'Darwin' else peak / 2 ** 10
+
+
+def on_starting(server):
+    if server.num_workers <= 1:
+        return
+    # The app is preloaded by now
+    from app import event_hub, response_cache
+    from app.cache import LocalBackend
+
+    problems = []
+    if isinstance(response_cache.backend, LocalBackend):
+        problems.append('RESPONSE_CACHE_BACKEND is local: workers would serve '
+                        'bodies and ETags other workers have invalidated')
+    if event_hub.backend == 'local':
+        problems.append('EVENTS_BACKEND is local: /api/events streams would miss '
+                        'writes handled by other workers')
+    if problems:
+        for problem in problems:
+            server.log.error(f'{server.num_workers} workers, but {problem}')
+        server.log.error('Set TASK_TRACKER_RESPONSE_CACHE_BACKEND=redis (or null) and '
+                         'TASK_TRACKER_EVENTS_BACKEND=redis, or run WEB_CONCURRENCY=1')
+        sys.exit(1)
+
+
+def pre_fork(server, worker):
+    # Connections the preloaded app opened would otherwise be shared by every worker
+    from app import mysql
+
+    mysql.close()
+
+
+def post_request(worker, req, environ, resp):
+    if not max_rss_mb or worker.nr % MEMORY_CHECK_EVERY:
+        return
+    rss = rss_mb()
+    if rss > max_rss_mb and worker.alive:
+        logger.warning(f"Worker {worker.pid} at {rss:.0f} MB (limit {max_rss_mb} MB), recycling")
+        # Finishes in-flight requests, then exits; the master starts a replacement
+        worker.alive = False
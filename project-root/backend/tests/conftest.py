@@ -0,0 +1,71 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import jwt
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(BACKEND), str(BACKEND / 'benchmarks')]
+
+from app import create_app, mysql, search_index  # noqa: E402
+from app.search import MemoryTermStore  # noqa: E402
+from standin import StandIn  # noqa: E402
+
+SECRET = 'test-secret-key-of-at-least-32-bytes'
+
+
+@pytest.fixture(scope='session')
+def _holder():
+    return {}
+
+
+@pytest.fixture(scope='session')
+def app(_holder):
+    # The extensions are module singletons, so the app is built once and
+    # each test gets a fresh database behind it
+    return create_app({
+        'TESTING': True,
+        'JWT_SECRET_KEY': SECRET,
+        'DB_CONNECTION_FACTORY': lambda: _holder['db'].connect(),
+        'DB_POOL_MIN_SIZE': 0,
+        'SEARCH_BACKEND': 'memory',
+        'RESPONSE_CACHE_BACKEND': None,
+        'RATELIMIT_ENABLED': False,
+        'STATS_RECONCILE_INTERVAL': 0,
+        'BULK_MAX_OPERATIONS': 5,
+    })
+
+
+@pytest.fixture
+def use_db(app, _holder):
+    """Put ``standin`` behind the app, dropping pooled connections to the last one."""
+    def use(standin):
+        mysql.close()
+        search_index.store = MemoryTermStore()
+        _holder['db'] = standin
+        return standin
+    return use
+
+
+@pytest.fixture
+def db(use_db):
+    return use_db(StandIn())
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(db):
+    return db.add_user('alice', 'alice@example.com', 'unused')
+
+
+@pytest.fixture
+def headers(user):
+    token = jwt.encode({'user_id': user, 'username': 'alice', 'email': 'alice@example.com',
+                        'role': 'student', 'exp': datetime.utcnow() + timedelta(hours=1)},
+                       SECRET)
+    return {'Authorization': f'Bearer {token}'}
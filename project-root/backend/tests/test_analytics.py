@@ -0,0 +1,83 @@
+import sys
+from datetime import date
+
+import pytest
+
+from app.analytics import ALL, Analytics, HyperLogLog
+
+
+def sketch(values, p=12):
+    hll = HyperLogLog(p)
+    for value in values:
+        hll.add(value)
+    return hll
+
+
+def test_empty_sketch_counts_zero():
+    assert HyperLogLog().count() == 0
+
+
+def test_duplicates_count_once():
+    assert sketch([7] * 1000).count() == 1
+
+
+@pytest.mark.parametrize('n', [10, 1000, 50000])
+def test_count_is_close(n):
+    # Standard error at p=12 is about 1.6%; allow several of those
+    assert sketch(range(n)).count() == pytest.approx(n, rel=0.06)
+
+
+def test_merge_counts_the_union():
+    a = sketch(range(0, 30000))
+    b = sketch(range(20000, 50000))
+    union = HyperLogLog().merge(a).merge(b)
+    assert union.count() == pytest.approx(50000, rel=0.06)
+    assert union.registers == sketch(range(50000)).registers
+
+
+def test_merge_is_idempotent_and_accepts_raw_registers():
+    a = sketch(range(1000))
+    before = bytes(a.registers)
+    a.merge(bytes(a.registers))
+    assert bytes(a.registers) == before
+    assert HyperLogLog(registers=before).count() == a.count()
+
+
+class FlakyCursor:
+    """Stores upserted rows; the INSERT for ``fail_day`` raises."""
+
+    def __init__(self, fail_day=None):
+        self.fail_day = fail_day
+        self.rows = {}  # (day, name) -> requests
+
+    def execute(self, sql, params):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def executemany(self, sql, rows):
+        if rows[0][0] == self.fail_day:
+            raise ConnectionError('lost connection')
+        for day, name, _, requests in rows:
+            self.rows[day, name] = self.rows.get((day, name), 0) + requests
+
+
+def test_failed_flush_retries_only_uncommitted_days(monkeypatch):
+    analytics = Analytics()
+    analytics.enabled, analytics.precision, analytics.flush_seconds = True, 12, 0
+    analytics.retention_days = 90
+    days = [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)]
+    for day in days:
+        analytics._day_ends = 0  # roll over on the next record
+        monkeypatch.setattr(sys.modules['app.analytics'], 'utc_today', lambda day=day: day)
+        analytics.record(1, 'GET /api/tasks')
+
+    cur = FlakyCursor(fail_day=days[1])
+    with pytest.raises(ConnectionError):
+        analytics.flush(cur, lambda: None)
+    assert cur.rows == {(days[0], ALL): 1, (days[0], 'GET /api/tasks'): 1}
+
+    cur.fail_day = None
+    analytics.flush(cur, lambda: None)
+    assert {day: cur.rows[day, ALL] for day in days} == {day: 1 for day in days}
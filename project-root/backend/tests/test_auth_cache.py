@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+from app import token_cache
+from app.auth_cache import TokenCache
+from conftest import SECRET
+
+
+class App:
+    def __init__(self, size):
+        self.config = {'TOKEN_CACHE_SIZE': size}
+
+
+@pytest.fixture
+def cache():
+    return TokenCache(App(2))
+
+
+def test_hit_after_put(cache):
+    assert cache.get('a') is None
+    cache.put('a', {'user_id': 1})
+    assert cache.get('a') == {'user_id': 1}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_claims_are_dropped(cache, monkeypatch):
+    cache.put('a', {'user_id': 1, 'exp': 1000})
+    monkeypatch.setattr('app.auth_cache.time.time', lambda: 1000)
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_fractional_exp_is_truncated_like_jwt(cache, monkeypatch):
+    cache.put('a', {'user_id': 1, 'exp': 1000.9})
+    monkeypatch.setattr('app.auth_cache.time.time', lambda: 1000.5)
+    assert cache.get('a') is None
+
+
+def test_least_recently_used_is_evicted(cache):
+    cache.put('a', {})
+    cache.put('b', {})
+    cache.get('a')
+    cache.put('c', {})
+    assert cache.get('b') is None
+    assert cache.get('a') == {} and cache.get('c') == {}
+    assert cache.evictions == 1
+
+
+def test_size_zero_disables():
+    cache = TokenCache(App(0))
+    cache.put('a', {})
+    assert cache.get('a') is None
+
+
+def make_token(user, secret=SECRET, **claims):
+    return jwt.encode({'user_id': user, 'username': 'alice', 'email': 'alice@example.com',
+                       'role': 'student', 'exp': datetime.utcnow() + timedelta(hours=1),
+                       **claims}, secret)
+
+
+def get(client, token):
+    return client.get('/api/student', headers={'Authorization': f'Bearer {token}'}).status_code
+
+
+def test_repeat_requests_skip_decoding(client, user):
+    token = make_token(user)
+    before = token_cache.hits
+    assert get(client, token) == 200
+    assert get(client, token) == 200
+    assert token_cache.hits == before + 1
+
+
+@pytest.mark.parametrize('token', [
+    make_token(1, secret='another-secret-of-at-least-32-bytes!'),
+    make_token(1, exp=datetime.utcnow() - timedelta(seconds=1)),
+])
+def test_invalid_tokens_are_never_cached(client, token):
+    assert get(client, token) == 401
+    assert get(client, token) == 401
+    assert token_cache.get(token) is None
+
+
+def test_cached_token_expires(client, user):
+    expires = int(time.time()) + 2
+    token = make_token(user, exp=expires)
+    assert get(client, token) == 200
+    time.sleep(expires - time.time() + 0.1)
+    assert get(client, token) == 401
@@ -0,0 +1,84 @@
+import pytest
+
+
+@pytest.fixture
+def task(db, user):
+    return db.add('tasks', user, title='Write report', description='', status='pending',
+                  priority='low', due_date=None)
+
+
+def bulk(client, headers, *operations):
+    response = client.post('/api/tasks/bulk', json={'operations': list(operations)},
+                           headers=headers)
+    return response.status_code, response.get_json()
+
+
+def test_applies_operations_and_reports_missing_tasks(client, headers, db, task):
+    status, body = bulk(client, headers, {'op': 'status', 'ids': [task, 999], 'status': 'completed'})
+    assert status == 200
+    assert [r['status'] for r in body['results']] == ['ok', 'error']
+    assert body['results'][1]['error'] == 'Task not found'
+    assert db.tasks[task]['status'] == 'completed'
+
+
+def test_other_users_tasks_are_not_found(client, headers, db):
+    other = db.add_user('bob', 'bob@example.com', 'unused')
+    task = db.add('tasks', other, title='Private', description='', status='pending',
+                  priority='low', due_date=None)
+    status, body = bulk(client, headers, {'op': 'delete', 'id': task})
+    assert status == 200
+    assert body['results'][0]['error'] == 'Task not found'
+    assert task in db.tasks
+
+
+@pytest.mark.parametrize('operations', [
+    [],
+    [{'op': 'delete', 'ids': list(range(1, 7))}],
+    [{'op': 'delete', 'ids': [1, 2, 3]}, {'op': 'delete', 'ids': [4, 5, 6]}],
+])
+def test_rejects_empty_or_oversized_requests(client, headers, operations):
+    status, body = bulk(client, headers, *operations)
+    assert status == 400
+    assert 'results' not in body
+
+
+@pytest.mark.parametrize('operation, error', [
+    ({'op': 'delete', 'ids': [True]}, 'Invalid task id'),
+    ({'op': 'delete', 'id': False}, 'Invalid task id'),
+    ({'op': 'delete', 'ids': ['1']}, 'Invalid task id'),
+    ({'op': 'delete', 'ids': []}, 'Invalid task id'),
+    ({'op': 'archive', 'id': 1}, 'Invalid operation'),
+    ({'op': 'status', 'id': 1, 'status': 'done'}, 'Invalid status'),
+    ({'op': 'update', 'id': 1, 'title': 'x'}, 'Missing required fields'),
+    ({'op': 'update', 'id': 1, 'title': 5, 'description': '', 'status': 'pending',
+      'due_date': None}, 'Title must be a string'),
+    ({'op': 'update', 'id': 1, 'title': 'x', 'description': {'a': 1}, 'status': 'pending',
+      'due_date': None}, 'Description must be a string'),
+    ({'op': 'update', 'id': 1, 'title': ' ', 'description': '', 'status': 'pending',
+      'due_date': None}, 'Missing title'),
+    ({'op': 'update', 'id': 1, 'title': 'x', 'description': '', 'status': 'pending',
+      'due_date': 'soon'}, 'Invalid due_date'),
+])
+def test_invalid_operations_fail_without_writing(client, headers, db, task, operation, error):
+    status, body = bulk(client, headers, operation)
+    assert status == 400
+    assert [r['error'] for r in body['results']] == [error]
+    assert db.tasks[task]['status'] == 'pending'
+
+
+def test_invalid_operation_does_not_block_valid_ones(client, headers, db, task):
+    status, body = bulk(client, headers, {'op': 'delete', 'ids': [True]},
+                        {'op': 'priority', 'id': task, 'priority': 'high'})
+    assert status == 200
+    assert [r['status'] for r in body['results']] == ['error', 'ok']
+    assert db.tasks[task]['priority'] == 'high'
+
+
+def test_update_writes_normalized_fields(client, headers, db, task):
+    status, body = bulk(client, headers, {'op': 'update', 'id': task, 'title': '  Renamed ',
+                                          'description': None, 'status': 'in_progress',
+                                          'due_date': '2024-05-01T12:00:00Z'})
+    assert status == 200, body
+    row = db.tasks[task]
+    assert (row['title'], row['description'], row['status']) == ('Renamed', '', 'in_progress')
+    assert row['due_date'].year == 2024
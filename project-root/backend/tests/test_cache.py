@@ -0,0 +1,114 @@
+import pytest
+
+from app import response_cache
+from app.cache import LocalBackend, RedisBackend
+
+
+@pytest.fixture
+def cached(monkeypatch):
+    backend = LocalBackend(100, 60)
+    monkeypatch.setattr(response_cache, 'backend', backend)
+    return backend
+
+
+def fetch(client, headers, path):
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    return response.headers['X-Cache'], response.get_json()
+
+
+def create(client, headers, title):
+    return client.post('/api/tasks', json={'title': title}, headers=headers).get_json()['task_id']
+
+
+def titles(body):
+    return [task['title'] for task in body['data']['tasks']]
+
+
+def test_listing_is_served_from_cache_until_a_write(client, headers, cached):
+    create(client, headers, 'One')
+    assert fetch(client, headers, '/api/tasks')[0] == 'MISS'
+    assert fetch(client, headers, '/api/tasks')[0] == 'HIT'
+
+    create(client, headers, 'Two')
+    state, body = fetch(client, headers, '/api/tasks')
+    assert (state, titles(body)) == ('MISS', ['Two', 'One'])
+
+
+def test_update_drops_the_single_task_body(client, headers, cached):
+    task = create(client, headers, 'One')
+    fetch(client, headers, f'/api/tasks/{task}')
+    assert fetch(client, headers, f'/api/tasks/{task}')[0] == 'HIT'
+    client.put(f'/api/tasks/{task}', headers=headers, json={
+        'title': 'Renamed', 'description': '', 'status': 'pending', 'due_date': None})
+    state, body = fetch(client, headers, f'/api/tasks/{task}')
+    assert state == 'MISS'
+    assert body['data']['title'] == 'Renamed'
+
+
+def test_task_writes_keep_project_bodies(client, headers, cached):
+    fetch(client, headers, '/api/projects')
+    create(client, headers, 'One')
+    assert fetch(client, headers, '/api/projects')[0] == 'HIT'
+
+
+def test_query_strings_are_cached_separately(client, headers, cached):
+    fetch(client, headers, '/api/tasks?limit=1')
+    assert fetch(client, headers, '/api/tasks?limit=2')[0] == 'MISS'
+
+
+def test_local_backend_skips_bodies_built_across_a_write():
+    backend = LocalBackend(10, 60)
+    generation = backend.generation(1)
+    backend.invalidate(1, {'tasks'})
+    backend.set(1, 'tasks', '/a', ('e', b'stale'), generation)
+    assert backend.get(1, 'tasks', '/a') is None
+    assert backend.stale_writes == 1
+
+
+def test_local_backend_evicts_and_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('app.cache.time.monotonic', lambda: now[0])
+    backend = LocalBackend(2, 60)
+    for path in ('/a', '/b', '/c'):
+        backend.set(1, 'tasks', path, ('e', b'body'))
+    assert backend.get(1, 'tasks', '/a') is None
+    assert backend.evictions == 1
+    now[0] += 61
+    assert backend.get(1, 'tasks', '/b') is None
+    assert backend.expirations == 1
+
+
+def test_invalidation_is_per_user_and_namespace():
+    backend = LocalBackend(10, 60)
+    for user, namespace in ((1, 'tasks'), (1, 'projects'), (2, 'tasks')):
+        backend.set(user, namespace, '/a', ('e', b'body'))
+    backend.invalidate(1, {'tasks'})
+    assert backend.get(1, 'tasks', '/a') is None
+    assert backend.get(1, 'projects', '/a') is not None
+    assert backend.get(2, 'tasks', '/a') is not None
+
+
+@pytest.fixture
+def redis_backend(monkeypatch):
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')  # fakeredis runs the Lua script with it
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr('redis.Redis.from_url',
+                        lambda url: fakeredis.FakeRedis(server=server))
+    return RedisBackend('redis://localhost:6379/0', 60)
+
+
+def test_redis_backend_checks_generations(redis_backend):
+    generation = redis_backend.generation(1)
+    redis_backend.set(1, 'tasks', '/a', ('e1', b'one'), generation)
+    assert redis_backend.get(1, 'tasks', '/a') == ('e1', b'one')
+
+    redis_backend.invalidate(1, {'tasks'})
+    assert redis_backend.get(1, 'tasks', '/a') is None
+    redis_backend.set(1, 'tasks', '/a', ('e2', b'stale'), generation)
+    assert redis_backend.get(1, 'tasks', '/a') is None
+
+    redis_backend.set(1, 'tasks', '/a', ('e3', b'fresh'), redis_backend.generation(1))
+    assert redis_backend.get(1, 'tasks', '/a') == ('e3', b'fresh')
+    assert redis_backend.stats() == {'writes': 2, 'stale_writes': 1, 'deleted_groups': 1}
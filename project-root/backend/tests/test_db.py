@@ -0,0 +1,97 @@
+import pytest
+
+from app import db
+from app.db import ConnectionPool, PoolTimeout
+
+
+class Raw:
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.closed = False
+
+    def ping(self):
+        if not self.alive:
+            raise ConnectionError('gone away')
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened():
+    return []
+
+
+@pytest.fixture
+def connect(opened):
+    def connect():
+        opened.append(Raw(len(opened)))
+        return opened[-1]
+    return connect
+
+
+def test_acquire_times_out_when_exhausted(connect):
+    pool = ConnectionPool(connect, min_size=0, max_size=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+
+    pool.release(held)
+    assert pool.acquire() is held
+
+
+def test_release_reuses_connection(connect, opened):
+    pool = ConnectionPool(connect, min_size=1, max_size=2)
+    pool.fill()
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(opened) == 1
+
+
+def test_recycles_after_max_uses(connect, opened):
+    pool = ConnectionPool(connect, min_size=0, max_size=1, recycle_uses=2)
+    first = pool.acquire()
+    pool.release(first)
+    pool.release(pool.acquire())  # second use: closed on release
+    assert first.raw.closed
+    assert pool.acquire().raw is opened[1]
+    assert pool.stats()['recycled'] == 1
+
+
+def test_recycles_after_max_age(connect, opened, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db.time, 'monotonic', lambda: now[0])
+    pool = ConnectionPool(connect, min_size=0, max_size=1, recycle_seconds=60)
+    pool.release(pool.acquire())
+    now[0] += 61
+    conn = pool.acquire()
+    assert conn.raw is opened[1]
+    assert opened[0].closed
+    assert pool.stats()['recycled'] == 1
+
+
+def test_dead_idle_connection_is_replaced(connect, opened):
+    pool = ConnectionPool(connect, min_size=1, max_size=1)
+    pool.fill()
+    opened[0].alive = False
+    conn = pool.acquire()
+    assert conn.raw is opened[1]
+    assert pool.stats()['ping_failures'] == 1
+    assert pool.stats()['size'] == 1
+
+
+def test_failed_connect_frees_the_slot(opened):
+    def connect():
+        raise ConnectionError('refused')
+    pool = ConnectionPool(connect, min_size=0, max_size=1, timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            pool.acquire()
+    assert pool.stats()['size'] == 0
+    assert pool.stats()['in_use'] == 0
@@ -0,0 +1,117 @@
+import pytest
+
+from app import changes
+from app.importer import InvalidTask, parse_task
+from standin import StandIn
+
+
+def import_tasks(client, headers, data, content_type='application/x-ndjson'):
+    response = client.post('/api/tasks/import', data=data,
+                           headers={**headers, 'Content-Type': content_type})
+    return response.status_code, response.get_json()
+
+
+def test_imports_valid_rows_and_reports_the_rest(client, headers, db, user):
+    status, body = import_tasks(client, headers, b'{"title": "One"}\n'
+                                                 b'{"title": ""}\n'
+                                                 b'not json\n'
+                                                 b'\n'
+                                                 b'{"title": "Two", "status": "later"}\n'
+                                                 b'{"title": "Three", "priority": "high"}\n')
+    assert status == 200
+    summary = body['data']
+    assert (summary['imported'], summary['failed']) == (2, 3)
+    assert summary['errors'] == [
+        {'row': 2, 'error': 'Missing title'},
+        {'row': 3, 'error': 'Invalid JSON'},
+        {'row': 5, 'error': 'Invalid status'},
+    ]
+    assert sorted(task['title'] for task in db.tasks.values()) == ['One', 'Three']
+
+
+def test_csv_rows_are_numbered_by_line(client, headers, db):
+    status, body = import_tasks(client, headers, b'title,status\nOne,pending\n,pending\n',
+                                'text/csv')
+    assert status == 200
+    assert body['data']['errors'] == [{'row': 3, 'error': 'Missing title'}]
+
+
+def test_error_list_is_capped(app, client, headers):
+    limit = app.config['IMPORT_MAX_ERRORS']
+    _, body = import_tasks(client, headers, b'{}\n' * (limit + 5))
+    assert body['data']['failed'] == limit + 5
+    assert len(body['data']['errors']) == limit
+
+
+def test_unsupported_format(client, headers):
+    status, _ = import_tasks(client, headers, b'<tasks/>', 'application/xml')
+    assert status == 415
+
+
+def test_ids_follow_auto_increment_step(client, headers, user, use_db, monkeypatch):
+    # With auto_increment_increment = 2 the new ids are not lastrowid + i
+    db = use_db(StandIn(id_step=2))
+    assert db.add_user('alice', 'alice@example.com', 'unused') == user
+
+    changed = []
+    monkeypatch.setattr(changes, '_commit_handlers',
+                        changes._commit_handlers + [changed.append])
+    status, _ = import_tasks(client, headers, b'{"title": "One"}\n{"title": "Two"}\n')
+    assert status == 200
+    assert sorted(db.tasks) == [1, 3]
+    assert sorted(change.task_id for change in changed[0].tasks) == [1, 3]
+
+
+def test_non_string_fields_fail_the_row_not_the_import(client, headers, db):
+    status, body = import_tasks(client, headers, b'{"title": ["x"]}\n'
+                                                 b'{"title": "One", "description": {"a": 1}}\n'
+                                                 b'{"title": "Two"}\n')
+    assert status == 200
+    assert body['data']['errors'] == [
+        {'row': 1, 'error': 'Title must be a string'},
+        {'row': 2, 'error': 'Description must be a string'},
+    ]
+    assert [task['title'] for task in db.tasks.values()] == ['Two']
+
+
+@pytest.mark.parametrize('data', [{'title': 5}, {'title': 'x', 'description': {'a': 1}}])
+def test_create_task_rejects_non_string_fields(client, headers, db, data):
+    response = client.post('/api/tasks', json=data, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['error'].endswith('must be a string')
+    assert not db.tasks
+
+
+@pytest.mark.parametrize('data, error', [
+    ([], 'Task must be an object'),
+    ({'title': 5}, 'Title must be a string'),
+    ({'title': None}, 'Missing title'),
+    ({'title': 'x', 'description': ['y']}, 'Description must be a string'),
+    ({'title': 'x' * 256}, 'Title too long'),
+    ({'title': 'x', 'priority': 'urgent'}, 'Invalid priority'),
+    ({'title': 'x', 'due_date': 'tomorrow'}, 'Invalid due_date'),
+])
+def test_parse_task_rejects(data, error):
+    with pytest.raises(InvalidTask, match=error):
+        parse_task(data)
+
+
+@pytest.mark.parametrize('path, data', [
+    ('/api/tasks/import', b'{"title": "One"}\n{"title": "Two"}\n'),
+    ('/api/tasks', b'{"title": "One"}'),
+])
+def test_task_inserts_lock_the_user_first(client, headers, db, user, monkeypatch, path, data):
+    statements = []
+    execute = db.execute
+
+    def recording(sql, params):
+        statements.append((' '.join(sql.split()), params))
+        return execute(sql, params)
+
+    monkeypatch.setattr(db, 'execute', recording)
+    content_type = 'application/x-ndjson' if path.endswith('import') else 'application/json'
+    client.post(path, data=data, headers={**headers, 'Content-Type': content_type})
+    lock = next(i for i, (sql, _) in enumerate(statements) if sql.endswith('FOR UPDATE'))
+    insert = next(i for i, (sql, _) in enumerate(statements) if sql.startswith('INSERT INTO tasks'))
+    assert statements[lock] == ('SELECT id FROM users WHERE id = %s FOR UPDATE', (user,))
+    assert lock < insert
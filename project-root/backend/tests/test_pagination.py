@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor, page_args
+
+CONFIG = {'PAGE_SIZE_DEFAULT': 50, 'PAGE_SIZE_MAX': 200}
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def tasks(db, user):
+    # Two tasks share each timestamp, so pages must break ties on id
+    return [db.add('tasks', user, title=f'Task {i}', description='', status='pending',
+                   priority='low', due_date=None, created_at=START + timedelta(minutes=i // 2))
+            for i in range(7)]
+
+
+def pages(client, headers, path, limit):
+    seen, cursor = [], None
+    while True:
+        query = f'{path}?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(query, headers=headers).get_json()
+        # Tasks nest their page under data; projects return it as data
+        rows = body['data']['tasks'] if 'tasks' in path else body['data']
+        cursor = body['data']['next_cursor'] if 'tasks' in path else body['next_cursor']
+        assert len(rows) <= limit
+        seen.append([row['id'] for row in rows])
+        if cursor is None:
+            return seen
+
+
+def test_tasks_page_newest_first_without_gaps_or_repeats(client, headers, tasks):
+    seen = pages(client, headers, '/api/tasks', 3)
+    assert seen == [[7, 6, 5], [4, 3, 2], [1]]
+
+
+def test_exact_last_page_has_no_cursor(client, headers, tasks):
+    assert pages(client, headers, '/api/tasks', 7) == [[7, 6, 5, 4, 3, 2, 1]]
+
+
+def test_projects_page_too(client, headers, db, user):
+    for i in range(5):
+        db.add('projects', user, title=f'Project {i}', description='', is_completed=False,
+               created_at=START + timedelta(minutes=i))
+    assert pages(client, headers, '/api/projects', 2) == [[5, 4], [3, 2], [1]]
+
+
+@pytest.mark.parametrize('query', ['cursor=garbage', 'limit=ten'])
+def test_bad_page_arguments(client, headers, query):
+    response = client.get(f'/api/tasks?{query}', headers=headers)
+    assert response.status_code == 400
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(START, 42)) == (START, 42)
+
+
+@pytest.mark.parametrize('args, limit', [({}, 50), ({'limit': '0'}, 1), ({'limit': '999'}, 200)])
+def test_limit_is_clamped(args, limit):
+    assert page_args(args, CONFIG) == (limit, None)
+
+
+def test_invalid_cursor():
+    with pytest.raises(InvalidCursor):
+        page_args({'cursor': encode_cursor(START, 1)[:-3]}, CONFIG)
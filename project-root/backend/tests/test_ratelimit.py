@@ -0,0 +1,67 @@
+import pytest
+
+from app.ratelimit import PROBES, SLOT, BucketTable, create_table
+
+
+@pytest.fixture
+def table():
+    return create_table(64, backend='local')
+
+
+def test_burst_then_steady_rate(table):
+    # 3 requests at once, then one per second
+    assert [table.acquire('k', 1.0, 3, 100.0) for _ in range(3)] == [0, 0, 0]
+    assert table.acquire('k', 1.0, 3, 100.0) == pytest.approx(1.0)
+    assert table.acquire('k', 1.0, 3, 100.5) == pytest.approx(0.5)
+    assert table.acquire('k', 1.0, 3, 101.0) == 0
+    assert table.acquire('k', 1.0, 3, 101.0) == pytest.approx(1.0)
+
+
+def test_rejected_requests_do_not_consume(table):
+    table.acquire('k', 1.0, 1, 100.0)
+    for _ in range(5):
+        assert table.acquire('k', 1.0, 1, 100.0) == pytest.approx(1.0)
+    assert table.acquire('k', 1.0, 1, 101.0) == 0
+
+
+def test_bucket_refills_completely(table):
+    for _ in range(3):
+        table.acquire('k', 1.0, 3, 100.0)
+    assert [table.acquire('k', 1.0, 3, 110.0) for _ in range(3)] == [0, 0, 0]
+    assert table.acquire('k', 1.0, 3, 110.0) > 0
+
+
+def test_keys_are_independent(table):
+    assert table.acquire('a', 1.0, 1, 100.0) == 0
+    assert table.acquire('a', 1.0, 1, 100.0) > 0
+    assert table.acquire('b', 1.0, 1, 100.0) == 0
+
+
+def test_full_table_evicts_oldest_bucket():
+    table = BucketTable(bytearray(PROBES * SLOT.size), PROBES)
+    for i in range(PROBES):
+        assert table.acquire(f'key{i}', 10.0, 1, 100.0 + i) == 0
+    assert table.evictions == 0
+    assert table.acquire('newcomer', 10.0, 1, 105.0) == 0
+    assert table.evictions == 1
+
+
+def test_expired_buckets_are_reused_without_eviction():
+    table = BucketTable(bytearray(PROBES * SLOT.size), PROBES)
+    for i in range(PROBES):
+        table.acquire(f'key{i}', 1.0, 1, 100.0)
+    assert table.acquire('newcomer', 1.0, 1, 200.0) == 0
+    assert table.evictions == 0
+
+
+def test_shared_table_is_seen_by_another_mapping(tmp_path):
+    path = tmp_path / 'buckets'
+    first = create_table(64, path=str(path))
+    second = create_table(64, path=str(path))
+    assert first.acquire('k', 1.0, 1, 100.0) == 0
+    assert second.acquire('k', 1.0, 1, 100.0) > 0
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_table(64, backend='memcached')
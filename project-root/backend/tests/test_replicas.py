@@ -0,0 +1,139 @@
+import os
+
+import pytest
+
+from app import changes, mysql
+from app.db import MySQL, Replica, WriteMarks, replica_lag
+from standin import Connection, Cursor, StandIn
+
+
+class ReplicaCursor(Cursor):
+    description = (('Seconds_Behind_Source',),)
+
+
+class ReplicaConnection(Connection):
+    def cursor(self, *args):
+        return ReplicaCursor(self.db)
+
+
+class ReplicaStandIn(StandIn):
+    """Second stand-in playing a replica that can fall behind or go away."""
+    lag = 0
+    down = False
+
+    def connect(self):
+        if self.down:
+            raise ConnectionError('replica is down')
+        return ReplicaConnection(self)
+
+    def execute(self, sql, params):
+        if self.down:
+            raise ConnectionError('replica is down')
+        if sql.startswith('SHOW REPLICA STATUS'):
+            return [(self.lag,)], 0, None
+        return super().execute(sql, params)
+
+
+@pytest.fixture
+def replica(app, db, user, monkeypatch):
+    standin = ReplicaStandIn()
+    standin.add_user('alice', 'alice@example.com', 'unused')
+    db.add('tasks', user, title='on primary', description='', status='pending',
+           priority='low', due_date=None)
+    standin.add('tasks', user, title='on replica', description='', status='pending',
+                priority='low', due_date=None)
+    pool = MySQL.create_pool(app.config, standin.connect)
+    monkeypatch.setattr(mysql, 'replicas', [Replica('replica0', pool)])
+    monkeypatch.setattr(mysql, '_write_marks', WriteMarks(64))
+    monkeypatch.setattr(mysql, 'read_your_writes', 60)
+    monkeypatch.setattr(mysql, 'fallbacks', 0)
+    # Idempotent, and a no-op once _write_marks is restored to None
+    changes.on_commit(mysql._record_write)
+    mysql.check_replicas()
+    return standin
+
+
+def titles(client, headers):
+    response = client.get('/api/tasks', headers=headers)
+    assert response.status_code == 200
+    return [task['title'] for task in response.get_json()['data']['tasks']]
+
+
+def test_reads_go_to_a_healthy_replica(client, headers, replica):
+    assert titles(client, headers) == ['on replica']
+    stats = mysql.replica_stats()
+    assert stats['replica0_healthy'] and stats['replica0_reads'] == 1
+    assert stats['fallbacks'] == 0
+
+
+def test_writes_go_to_the_primary(client, headers, db, replica):
+    response = client.post('/api/tasks', json={'title': 'new'}, headers=headers)
+    assert response.status_code == 201
+    assert any(task['title'] == 'new' for task in db.tasks.values())
+    assert all(task['title'] != 'new' for task in replica.tasks.values())
+
+
+def test_reads_follow_own_writes_to_the_primary(client, headers, replica, monkeypatch):
+    client.post('/api/tasks', json={'title': 'new'}, headers=headers)
+    assert titles(client, headers) == ['new', 'on primary']
+    monkeypatch.setattr(mysql, 'read_your_writes', 0)
+    assert titles(client, headers) == ['on replica']
+
+
+def test_lagging_replica_falls_back_to_primary(client, headers, replica):
+    replica.lag = mysql.max_lag + 1
+    mysql.check_replicas()
+    assert titles(client, headers) == ['on primary']
+    assert mysql.replica_stats()['replica0_lag_seconds'] == mysql.max_lag + 1
+    assert mysql.fallbacks == 1
+
+    replica.lag = 0
+    mysql.check_replicas()
+    assert titles(client, headers) == ['on replica']
+
+
+def test_stopped_replication_takes_replica_out(client, headers, replica):
+    replica.lag = None
+    mysql.check_replicas()
+    assert titles(client, headers) == ['on primary']
+
+
+def test_down_replica_falls_back_and_recovers(client, headers, replica):
+    mysql.replicas[0].pool.close()
+    replica.down = True
+    mysql.check_replicas()
+    assert titles(client, headers) == ['on primary']
+    assert mysql.replica_stats()['replica0_failures'] == 1
+
+    replica.down = False
+    mysql.check_replicas()
+    assert titles(client, headers) == ['on replica']
+
+
+def test_replica_failing_on_checkout_is_marked_down(client, headers, replica):
+    mysql.replicas[0].pool.close()
+    replica.down = True  # between health checks
+    assert titles(client, headers) == ['on primary']
+    assert mysql.replicas[0].healthy is False
+
+
+def test_replica_lag_reads_status_by_column_name():
+    standin = ReplicaStandIn()
+    standin.lag = 3
+    assert replica_lag(standin.connect().cursor()) == 3
+
+
+def test_replica_lag_is_zero_when_not_replicating():
+    assert replica_lag(StandIn().connect().cursor()) == 0
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_write_marks_are_shared_with_forked_workers():
+    marks = WriteMarks(64)
+    pid = os.fork()
+    if pid == 0:
+        marks.mark(7, 1234.5)
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert marks.last(7) == 1234.5
+    assert marks.last(8) in (0.0, 1234.5)  # another slot, or a shared one
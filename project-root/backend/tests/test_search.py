@@ -0,0 +1,83 @@
+import pytest
+
+from app.search import MemoryTermStore, query_terms, task_terms, tokenize
+
+
+def create(client, headers, title, description=''):
+    response = client.post('/api/tasks', json={'title': title, 'description': description},
+                           headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['task_id']
+
+
+def search(client, headers, query):
+    response = client.get('/api/tasks/search', query_string={'q': query}, headers=headers)
+    assert response.status_code == 200
+    return [task['id'] for task in response.get_json()['data']['tasks']]
+
+
+def test_matches_prefixes_of_every_term_ranked_by_weight(client, headers):
+    report = create(client, headers, 'Quarterly report', 'numbers for finance')
+    review = create(client, headers, 'Review', 'the report draft')
+    create(client, headers, 'Dentist')
+
+    # Title terms outweigh description terms
+    assert search(client, headers, 'rep') == [report, review]
+    assert search(client, headers, 'report fin') == [report]
+    assert search(client, headers, 'REPORT dentist') == []
+
+
+def test_updates_and_deletes_reach_the_index(client, headers):
+    task = create(client, headers, 'Call plumber')
+    response = client.put(f'/api/tasks/{task}', headers=headers, json={
+        'title': 'Call electrician', 'description': '', 'status': 'pending', 'due_date': None})
+    assert response.status_code == 200
+    assert search(client, headers, 'plumber') == []
+    assert search(client, headers, 'electrician') == [task]
+
+    assert client.delete(f'/api/tasks/{task}', headers=headers).status_code == 200
+    assert search(client, headers, 'electrician') == []
+
+
+def test_query_without_terms_lists_tasks(client, headers):
+    tasks = {create(client, headers, 'One'), create(client, headers, 'Two')}
+    assert set(search(client, headers, '  !? ')) == tasks
+
+
+def test_users_only_search_their_own_tasks():
+    store = MemoryTermStore()
+    store.replace(None, 1, 10, task_terms('Shared words', ''))
+    store.replace(None, 2, 20, task_terms('Shared words', ''))
+    assert store.search(None, 1, ['shared'], 10) == [(10, 3)]
+
+
+def test_replace_and_remove_drop_old_postings():
+    store = MemoryTermStore()
+    store.replace(None, 1, 10, task_terms('alpha', 'beta'))
+    store.replace(None, 1, 10, task_terms('gamma', ''))
+    assert store.search(None, 1, ['alpha'], 10) == []
+    assert store.search(None, 1, ['beta'], 10) == []
+    store.remove(None, [10])
+    assert store.search(None, 1, ['gamma'], 10) == []
+    assert store._terms[1] == []
+
+
+def test_limit_keeps_the_best_matches():
+    store = MemoryTermStore()
+    for task_id in range(1, 6):
+        store.replace(None, 1, task_id, task_terms('task' if task_id % 2 else '', 'task'))
+    assert [task_id for task_id, _ in store.search(None, 1, ['task'], 2)] == [5, 3]
+
+
+@pytest.mark.parametrize('text, terms', [
+    ('Hello, World!', ['hello', 'world']),
+    ('', []),
+    (None, []),
+    ('x' * 100, ['x' * 64]),
+])
+def test_tokenize(text, terms):
+    assert tokenize(text) == terms
+
+
+def test_query_terms_drop_duplicates():
+    assert query_terms('a b a') == ['a', 'b']
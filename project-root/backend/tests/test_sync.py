@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+
+from app import sync
+from app.sync import InvalidToken, decode_token, encode_token
+
+NOW = datetime(2024, 1, 1)
+
+
+class Cursor:
+    """Answers the change_log and entity SELECTs that ``delta`` issues."""
+
+    def __init__(self, log, tasks=(), projects=()):
+        self.log = log  # [(seq, entity, entity_id, deleted)]
+        self.tasks = {row[0]: row for row in tasks}
+        self.projects = {row[0]: row for row in projects}
+        self._rows = []
+
+    def execute(self, sql, params):
+        if 'FROM change_log' in sql:
+            _, since, until, limit = params
+            self._rows = [entry for entry in self.log if since < entry[0] <= until][:limit]
+        else:
+            store = self.tasks if 'FROM tasks' in sql else self.projects
+            self._rows = [store[i] for i in params[1:] if i in store]
+
+    def fetchall(self):
+        return self._rows
+
+
+def task(task_id, title='Task'):
+    return (task_id, title, '', 'pending', 'medium', None, NOW, NOW)
+
+
+def test_deleted_entities_become_tombstones():
+    cur = Cursor([(1, 'task', 10, 0), (2, 'task', 11, 0), (3, 'task', 10, 1),
+                  (4, 'project', 5, 1)],
+                 tasks=[task(11)])
+    body, last, has_more = sync.delta(cur, 1, 0, 4, 100)
+    assert [row['id'] for row in body['tasks']] == [11]
+    assert body['deleted'] == {'tasks': [10], 'projects': [5]}
+    assert (last, has_more) == (4, False)
+
+
+def test_recreated_entity_is_live_again():
+    cur = Cursor([(1, 'task', 10, 1), (2, 'task', 10, 0)], tasks=[task(10)])
+    body, _, _ = sync.delta(cur, 1, 0, 2, 100)
+    assert [row['id'] for row in body['tasks']] == [10]
+    assert body['deleted']['tasks'] == []
+
+
+def test_rows_deleted_outside_the_api_are_tombstoned():
+    cur = Cursor([(1, 'task', 10, 0), (2, 'project', 5, 0)])
+    body, _, _ = sync.delta(cur, 1, 0, 2, 100)
+    assert body['tasks'] == [] and body['projects'] == []
+    assert body['deleted'] == {'tasks': [10], 'projects': [5]}
+
+
+def test_only_changes_after_the_token():
+    cur = Cursor([(1, 'task', 10, 1), (2, 'task', 11, 0)], tasks=[task(11)])
+    body, _, _ = sync.delta(cur, 1, 1, 2, 100)
+    assert body['deleted']['tasks'] == []
+    assert [row['id'] for row in body['tasks']] == [11]
+
+
+def test_limit_pages_through_the_log():
+    cur = Cursor([(seq, 'task', seq, 1) for seq in range(1, 6)])
+    body, last, has_more = sync.delta(cur, 1, 0, 5, 2)
+    assert (body['deleted']['tasks'], last, has_more) == ([1, 2], 2, True)
+    body, last, has_more = sync.delta(cur, 1, last, 5, 2)
+    assert (body['deleted']['tasks'], last, has_more) == ([3, 4], 4, True)
+    body, last, has_more = sync.delta(cur, 1, last, 5, 2)
+    assert (body['deleted']['tasks'], last, has_more) == ([5], 5, False)
+
+
+def test_token_round_trip():
+    assert decode_token(encode_token(12345)) == 12345
+
+
+@pytest.mark.parametrize('token', ['', 'not a token', encode_token(1)[:-1] + '!'])
+def test_invalid_tokens(token):
+    with pytest.raises(InvalidToken):
+        decode_token(token)
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+from conftest import SECRET
+
+
+def listing(client, headers, path, etag=None):
+    extra = {'If-None-Match': etag} if etag else {}
+    return client.get(path, headers={**headers, **extra})
+
+
+@pytest.mark.parametrize('path', ['/api/tasks', '/api/projects'])
+def test_unchanged_collection_revalidates_with_304(client, headers, path):
+    first = listing(client, headers, path)
+    assert first.status_code == 200 and first.headers['ETag']
+    again = listing(client, headers, path, first.headers['ETag'])
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+
+def test_write_changes_the_tag(client, headers):
+    etag = listing(client, headers, '/api/tasks').headers['ETag']
+    client.post('/api/tasks', json={'title': 'New'}, headers=headers)
+    response = listing(client, headers, '/api/tasks', etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert [task['title'] for task in response.get_json()['data']['tasks']] == ['New']
+
+
+def test_collections_are_versioned_separately(client, headers):
+    etag = listing(client, headers, '/api/projects').headers['ETag']
+    client.post('/api/tasks', json={'title': 'New'}, headers=headers)
+    assert listing(client, headers, '/api/projects', etag).status_code == 304
+
+
+def test_pages_have_their_own_tags(client, headers):
+    first = listing(client, headers, '/api/tasks?limit=1').headers['ETag']
+    assert listing(client, headers, '/api/tasks?limit=2', first).status_code == 200
+
+
+def test_other_users_writes_keep_the_tag(client, headers, db):
+    etag = listing(client, headers, '/api/tasks').headers['ETag']
+    bob = db.add_user('bob', 'bob@example.com', 'unused')
+    token = jwt.encode({'user_id': bob, 'username': 'bob', 'email': 'bob@example.com',
+                        'role': 'student', 'exp': datetime.utcnow() + timedelta(hours=1)},
+                       SECRET)
+    client.post('/api/tasks', json={'title': 'Bob'}, headers={'Authorization': f'Bearer {token}'})
+    assert listing(client, headers, '/api/tasks', etag).status_code == 304